@@ -0,0 +1,159 @@
+import math
+import threading
+import time
+from collections import defaultdict, deque
+
+
+class AdmissionRejected(Exception):
+    """Raised when a call is turned away instead of being admitted."""
+
+    def __init__(self, reason, retry_after, queue_length=0):
+        super().__init__(f"Admission rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.queue_length = queue_length
+
+
+class AdmissionController:
+    """Bound the number of expensive calls in flight, per session and overall.
+
+    A session may hold at most ``max_per_session`` slots; further calls from
+    it are rejected straight away (they are almost always duplicate clicks).
+    Once ``max_global`` slots are taken, calls wait in a FIFO queue of up to
+    ``max_queue`` entries for at most ``queue_timeout`` seconds. Waiting
+    calls are told their queue position through ``on_queued`` whenever it
+    changes. Rejections carry a Retry-After estimate based on how long
+    recent calls held their slot.
+    """
+
+    SESSION_BUSY = "session_busy"
+    QUEUE_FULL = "queue_full"
+    QUEUE_TIMEOUT = "queue_timeout"
+
+    def __init__(self, max_per_session=1, max_global=8, max_queue=32,
+                 queue_timeout=60.0, clock=time.monotonic):
+        self.max_per_session = max_per_session
+        self.max_global = max_global
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        # session_id -> slots held plus queued calls
+        self._sessions = defaultdict(int)
+        self._waiting = deque()
+        # Moving average of how long a call holds its slot
+        self._average_hold = 30.0
+
+    def admit(self, session_id, on_queued=None):
+        """Return a context manager that holds a slot for session_id.
+
+        Raises AdmissionRejected if the call can't be admitted.
+        """
+        self._acquire(session_id, on_queued)
+        return _Slot(self, session_id)
+
+    def stats(self):
+        with self._condition:
+            return {
+                "in_flight": self._in_flight,
+                "queued": len(self._waiting),
+                "max_global": self.max_global,
+                "average_hold_seconds": round(self._average_hold, 1),
+            }
+
+    def _acquire(self, session_id, on_queued):
+        with self._condition:
+            # get() rather than [] so rejected sessions leave no entry behind
+            if self._sessions.get(session_id, 0) >= self.max_per_session:
+                raise AdmissionRejected(
+                    self.SESSION_BUSY, self._retry_after(0), len(self._waiting))
+            if not self._waiting and self._in_flight < self.max_global:
+                self._sessions[session_id] += 1
+                self._in_flight += 1
+                return
+            if len(self._waiting) >= self.max_queue:
+                raise AdmissionRejected(
+                    self.QUEUE_FULL,
+                    self._retry_after(len(self._waiting)),
+                    len(self._waiting),
+                )
+
+            ticket = object()
+            self._waiting.append(ticket)
+            self._sessions[session_id] += 1
+            deadline = self._clock() + self.queue_timeout
+            position = None
+            try:
+                while True:
+                    index = self._waiting.index(ticket)
+                    if index == 0 and self._in_flight < self.max_global:
+                        self._waiting.popleft()
+                        self._in_flight += 1
+                        # Let the next waiter check for a free slot too
+                        self._condition.notify_all()
+                        return
+                    if on_queued is not None and index + 1 != position:
+                        position = index + 1
+                        self._notify_queued(on_queued, position)
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self._waiting.remove(ticket)
+                        self._release_session(session_id)
+                        self._condition.notify_all()
+                        raise AdmissionRejected(
+                            self.QUEUE_TIMEOUT,
+                            self._retry_after(index),
+                            len(self._waiting),
+                        )
+                    self._condition.wait(remaining)
+            except AdmissionRejected:
+                raise
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    self._release_session(session_id)
+                    self._condition.notify_all()
+                raise
+
+    def _notify_queued(self, on_queued, position):
+        # Called without the lock so a slow callback can't stall other calls
+        self._condition.release()
+        try:
+            on_queued(position)
+        except Exception:
+            pass
+        finally:
+            self._condition.acquire()
+
+    def _release(self, session_id, held_seconds):
+        with self._condition:
+            self._in_flight -= 1
+            self._release_session(session_id)
+            self._average_hold = 0.8 * self._average_hold + 0.2 * held_seconds
+            self._condition.notify_all()
+
+    def _release_session(self, session_id):
+        self._sessions[session_id] -= 1
+        if self._sessions[session_id] <= 0:
+            del self._sessions[session_id]
+
+    def _retry_after(self, calls_ahead):
+        """Rough seconds until a slot frees up for a call behind calls_ahead others."""
+        rounds = (calls_ahead + 1) / max(1, self.max_global)
+        return max(1, int(math.ceil(self._average_hold * rounds)))
+
+
+class _Slot:
+    def __init__(self, controller, session_id):
+        self.controller = controller
+        self.session_id = session_id
+        self.started = controller._clock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.controller._release(
+            self.session_id, self.controller._clock() - self.started)
+        return False
@@ -1,17 +1,82 @@
+import gc
+import hashlib
+import io
 import logging
+import mimetypes
 import os
+import re
+import shutil
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
 
 import requests
-from flask import Flask, jsonify, redirect, render_template, request, session, url_for
-from flask_sqlalchemy import SQLAlchemy
-
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+from flask import (Flask, copy_current_request_context, g, has_app_context,
+                   jsonify, redirect, render_template, request, session,
+                   url_for)
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from requests.adapters import HTTPAdapter
+from sqlalchemy import text
+from werkzeug.security import safe_join
+
+from admission_control import AdmissionController, AdmissionRejected
+from artifact_janitor import ArtifactJanitor
+from artifact_storage import storage_from_env
+from assets import asset_urls, load_manifest
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from client_disconnect import (CancellableSession, call_unless_disconnected,
+                               client_socket)
+from compression import compress_response
+from database import db
+from design_channel import DesignChannel
+from health import CachedCheck, RequestGauge
+from idempotency import (IdempotencyKeyMismatch, IdempotencyStore,
+                         SharedIdempotencyKeys)
+from json_codec import CODEC, FastJSONProvider, dumps_bytes, loads, loads_response
+from model_cache import ModelCache
+from model_metadata import metadata_available, parse_stl, stl_metadata
+from models import IdempotencyRecord, OutboxMessage, UserSession, WaitlistEntry
+from template_cache import TemplateCache
+from thumbnail_renderer import render_thumbnail, thumbnails_available
+from outbox import OutboxWorker, enqueue
+from structured_logging import configure_logging
+
+try:
+    from flask_sock import Sock
+except ImportError:  # Optional: the frontend falls back to plain HTTP
+    Sock = None
+
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def log_context():
+    """Return the (request id, session id prefix) to tag log records with."""
+    if not has_app_context():
+        return None, None
+    session_id = g.get("session_id")
+    return g.get("request_id"), session_id[:8] if session_id else None
+
+
+def setup_logging():
+    """Configure logging: level and format from the environment, written by
+    a background thread (see structured_logging.py)."""
+    configure_logging(
+        level=os.environ.get("LOG_LEVEL", "INFO"),
+        log_format=os.environ.get("LOG_FORMAT", "json"),
+        context=log_context,
+        max_chars=int(os.environ.get("LOG_MAX_MESSAGE_CHARS", "4000")),
+    )
 
 
 app = Flask(__name__)
+# jsonify/request.json use orjson when installed (see json_codec.py)
+app.json = FastJSONProvider(app)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY") or "your-secret-key-here"
 
 # Session configuration for authentication requirements
@@ -19,50 +84,124 @@ app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)  # 1 hour timeout
 # Use session cookies (expire on browser close)
 app.config['SESSION_PERMANENT'] = False
 
-# Configure database
-database_url = os.environ.get("DATABASE_URL")
-if database_url:
-    # Fix Heroku postgres:// URL for SQLAlchemy compatibility
-    if database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql://", 1)
-    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
-else:
-    # Use SQLite for local development
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///local_dev.db"
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = True
-
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
 
-# Initialize SQLAlchemy if needed for other features
-db = SQLAlchemy(app)
+def configure_database():
+    """Bind SQLAlchemy to the app. Called by create_app(), which also creates
+    the tables; connections are only opened when first used."""
+    database_url = os.environ.get("DATABASE_URL")
+    if database_url:
+        # Fix Heroku postgres:// URL for SQLAlchemy compatibility
+        if database_url.startswith("postgres://"):
+            database_url = database_url.replace(
+                "postgres://", "postgresql://", 1)
+        app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    else:
+        # Use SQLite for local development
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///local_dev.db"
+        app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = True
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+    db.init_app(app)
+
+# Response compression. Disable with COMPRESS_RESPONSES=false when a reverse
+# proxy (e.g. the nginx in docker-compose.prod.yml) already compresses.
+COMPRESS_RESPONSES = os.environ.get(
+    "COMPRESS_RESPONSES", "true").lower() == "true"
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", "500"))
+
+
+@app.after_request
+def compress(response):
+    """Compress JSON, HTML and other text responses for capable clients."""
+    if not COMPRESS_RESPONSES:
+        return response
+    return compress_response(
+        response, request.accept_encodings, request.method, COMPRESS_MIN_BYTES
+    )
+
+
+@app.before_request
+def assign_request_id():
+    """Tag the request with an id for log records, reusing the proxy's if valid."""
+    request_id = request.headers.get("X-Request-ID", "")
+    g.request_id = (
+        request_id if REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+    )
+
+
+@app.after_request
+def add_request_id_header(response):
+    if g.get("request_id"):
+        response.headers["X-Request-ID"] = g.request_id
+    return response
+
+
+# Requests this worker process is handling, for the saturation check in /readyz
+request_gauge = RequestGauge()
+# Open design chat channels. They hold a thread while their tab is open but
+# are mostly idle, so they are counted here instead of in request_gauge.
+channel_gauge = RequestGauge()
+
+
+@app.before_request
+def count_request():
+    if request.endpoint == "chat_channel":
+        return
+    request_gauge.enter()
+    g.counted_request = True
+
+
+@app.teardown_request
+def uncount_request(error=None):
+    if g.get("counted_request"):
+        request_gauge.exit()
+
+
+def copy_request_context(func):
+    """copy_current_request_context that keeps the ids used in log records."""
+    request_id = g.get("request_id")
+    session_id = g.get("session_id")
+
+    @copy_current_request_context
+    def run(*args, **kwargs):
+        g.request_id = request_id
+        g.session_id = session_id
+        return func(*args, **kwargs)
+
+    return run
+
 
 # Password protection configuration
 SITE_PASSWORD = os.environ.get("SITE_PASSWORD", "morfis2025")
+# A login lasts this long without activity
+LOGIN_TIMEOUT = timedelta(hours=1)
+
+
+def login_expired(login_time):
+    """Return True if an ISO login_time is invalid or older than LOGIN_TIMEOUT."""
+    try:
+        return datetime.utcnow() - datetime.fromisoformat(login_time) > LOGIN_TIMEOUT
+    except (ValueError, TypeError):
+        return True
 
 
 # Authentication middleware
 @app.before_request
 def check_password_protection():
     """Check if user is authenticated before allowing access to protected routes."""
-    # Allow access to login route, logout route, and static files
-    if request.endpoint in ["login", "logout", "static"]:
+    # Allow access to login route, logout route, static files and probes
+    if request.endpoint in ["login", "logout", "static", "healthz", "readyz"]:
         return
 
     # Check session timeout (1 hour of inactivity)
     if session.get("authenticated"):
         login_time = session.get("login_time")
         if login_time:
-            try:
-                login_dt = datetime.fromisoformat(login_time)
-                if datetime.utcnow() - login_dt > timedelta(hours=1):
-                    # Session expired, clear it
-                    session.pop("authenticated", None)
-                    session.pop("login_time", None)
-            except (ValueError, TypeError):
-                # Invalid login_time, clear session
+            if login_expired(login_time):
+                # Session expired (or invalid login_time), clear it
                 session.pop("authenticated", None)
                 session.pop("login_time", None)
         else:
@@ -94,6 +233,7 @@ def check_password_protection():
             "get_trajectory_html",
             "get_app_config",
             "get_session_stats",
+            "chat_channel",
         ]
         if request.endpoint in protected_endpoints:
             return jsonify({"error": "Authentication required"}), 401
@@ -157,6 +297,131 @@ DEFAULT_DESIGN_TYPES = [
     },
 ]
 
+# Subsystems with clients, threads or pools are built on first use (or by
+# create_app()), never at import, by the get_*() functions below.
+subsystems_lock = threading.RLock()
+
+# Circuit breaker around the backend client. When the backend keeps failing
+# (or answering too slowly) calls fail fast instead of tying up workers.
+backend_breaker = None
+
+
+def get_backend_breaker():
+    """Return this process's circuit breaker for backend calls."""
+    global backend_breaker
+    if backend_breaker is None:
+        with subsystems_lock:
+            if backend_breaker is None:
+                backend_breaker = CircuitBreaker(
+                    "backend",
+                    failure_rate_threshold=float(
+                        os.environ.get("BACKEND_CB_FAILURE_RATE", "0.5")),
+                    slow_call_rate_threshold=float(
+                        os.environ.get("BACKEND_CB_SLOW_CALL_RATE", "0.8")),
+                    window_size=int(os.environ.get("BACKEND_CB_WINDOW", "20")),
+                    minimum_calls=int(
+                        os.environ.get("BACKEND_CB_MIN_CALLS", "5")),
+                    open_seconds=float(
+                        os.environ.get("BACKEND_CB_OPEN_SECONDS", "30")),
+                )
+    return backend_breaker
+
+# Calls slower than this count as "slow" for the breaker. Generation
+# endpoints legitimately take minutes, so they are exempt.
+BACKEND_SLOW_CALL_SECONDS = float(
+    os.environ.get("BACKEND_SLOW_CALL_SECONDS", "10"))
+SLOW_CALL_EXEMPT_ENDPOINTS = {"process-prompt", "reset", "rollback", "save_design"}
+
+# Per-endpoint backend timeouts in seconds. Connecting should always be
+# quick; the read timeout depends on how much work the endpoint does.
+# Each read timeout can be overridden with BACKEND_TIMEOUT_<ENDPOINT>,
+# e.g. BACKEND_TIMEOUT_PROCESS_PROMPT=600.
+BACKEND_CONNECT_TIMEOUT = float(os.environ.get("BACKEND_CONNECT_TIMEOUT", "5"))
+DEFAULT_BACKEND_READ_TIMEOUT = 60.0
+BACKEND_READ_TIMEOUTS = {
+    "init": 15.0,
+    "trajectory": 15.0,
+    "feedback": 10.0,
+    "waitlist": 10.0,
+    "save_design": 60.0,
+    "reset": 120.0,
+    "rollback": 120.0,
+    "process-prompt": 360.0,
+}
+for _endpoint in BACKEND_READ_TIMEOUTS:
+    _override = os.environ.get(
+        "BACKEND_TIMEOUT_" + _endpoint.upper().replace("-", "_"))
+    if _override:
+        BACKEND_READ_TIMEOUTS[_endpoint] = float(_override)
+
+# Backend calls that may run at least this long get their own connection,
+# which is closed when the client disconnects so neither the worker nor the
+# backend keeps working on a result nobody will receive
+DISCONNECT_WATCH_MIN_SECONDS = 30.0
+
+# Last-known-good responses for read-only endpoints, served while the
+# backend is unavailable
+LAST_KNOWN_GOOD_MAX_ENTRIES = 512
+last_known_good = OrderedDict()
+last_known_good_lock = threading.Lock()
+
+
+def remember_backend_response(key, data):
+    """Store the latest successful response for a read-only backend endpoint."""
+    with last_known_good_lock:
+        last_known_good[key] = data
+        last_known_good.move_to_end(key)
+        while len(last_known_good) > LAST_KNOWN_GOOD_MAX_ENTRIES:
+            last_known_good.popitem(last=False)
+
+
+def recall_backend_response(key):
+    """Return the last successful response stored for key, or None."""
+    with last_known_good_lock:
+        return last_known_good.get(key)
+
+
+def backend_unavailable_response(error, payload):
+    """Build a 503 response telling the client when to retry."""
+    response = jsonify(payload)
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
+# Admission control for expensive backend calls (prompts and uncached
+# rollbacks), which hold a worker thread and a backend slot for minutes.
+# Limits are per worker process: size ADMISSION_MAX_GLOBAL to the backend's
+# capacity divided by the number of gunicorn workers.
+heavy_calls = AdmissionController(
+    max_per_session=int(os.environ.get("ADMISSION_MAX_PER_SESSION", "1")),
+    max_global=int(os.environ.get("ADMISSION_MAX_GLOBAL", "8")),
+    max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", "32")),
+    queue_timeout=float(
+        os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "60")),
+)
+
+
+def admission_rejected_body(error):
+    if error.reason == AdmissionController.SESSION_BUSY:
+        message = "Your previous design request is still running. Please wait for it to finish."
+    else:
+        message = "The design service is busy right now. Please try again shortly."
+    return {
+        "error": message,
+        "reason": error.reason,
+        "retry_after": error.retry_after,
+        "queue_length": error.queue_length,
+    }
+
+
+def admission_rejected_response(error):
+    """Build a 429 response telling the client when to retry."""
+    response = jsonify(admission_rejected_body(error))
+    response.status_code = 429
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
 
 def get_session_id():
     """Get or create a unique session ID for the current user."""
@@ -171,8 +436,6 @@ def get_session_id():
 
             # Store session info in database for tracking (optional for debugging)
             try:
-                from models import UserSession
-
                 user_session = UserSession(
                     session_id=session[session_key],
                     user_ip=request.remote_addr,
@@ -191,6 +454,7 @@ def get_session_id():
                     f"Created new tab session (no DB): {session[session_key]} for tab: {tab_id}"
                 )
 
+        g.session_id = session[session_key]
         return session[session_key]
     else:
         # Use browser-wide session (default behavior)
@@ -199,8 +463,6 @@ def get_session_id():
 
             # Store session info in database for tracking (optional for debugging)
             try:
-                from models import UserSession
-
                 user_session = UserSession(
                     session_id=session["session_id"],
                     user_ip=request.remote_addr,
@@ -219,6 +481,7 @@ def get_session_id():
                     f"{session['session_id']}"
                 )
 
+        g.session_id = session["session_id"]
         return session["session_id"]
 
 
@@ -231,43 +494,579 @@ def update_session_activity():
 
         session_id = session.get("session_id")
         if session_id:
-            from models import UserSession
-
-            user_session = UserSession.query.filter_by(
-                session_id=session_id).first()
-            if user_session:
-                user_session.update_activity()
+            touch_session_record(session_id)
     except Exception as e:
         # Gracefully handle database errors for debugging
         logging.debug(
             f"Database not available for session activity update: {str(e)}")
 
 
+def touch_session_record(session_id):
+    """Update a session's last activity timestamp in the database."""
+    try:
+        user_session = UserSession.query.filter_by(
+            session_id=session_id).first()
+        if user_session:
+            user_session.update_activity()
+    except Exception as e:
+        logging.debug(
+            f"Database not available for session activity update: {str(e)}")
+
+
+def client_deadline():
+    """Return the client's own deadline (epoch seconds), or None.
+
+    Clients send how long they will wait in X-Request-Timeout (ms).
+    """
+    client_timeout = request.headers.get("X-Request-Timeout")
+    if client_timeout:
+        try:
+            return time.time() + float(client_timeout) / 1000.0
+        except ValueError:
+            pass
+    return None
+
+
+def request_deadline(read_timeout):
+    """Return the absolute deadline (epoch seconds) for a backend call.
+
+    The deadline is the endpoint's read timeout, shortened to the client's
+    own deadline when it sent one.
+    """
+    deadline = time.time() + read_timeout
+    client = client_deadline()
+    if client is not None:
+        deadline = min(deadline, client)
+    return deadline
+
+
+# Keep-alive connections to the backend, pooled per process: a pool
+# inherited through fork() would share its sockets with the parent, so
+# reinit_after_fork() drops it and the next call builds a fresh one.
+BACKEND_POOL_SIZE = int(os.environ.get("BACKEND_POOL_SIZE", "16"))
+backend_http = None
+backend_http_lock = threading.Lock()
+
+
+def get_backend_http():
+    """Return this process's pooled HTTP session for backend calls."""
+    global backend_http
+    if backend_http is None:
+        with backend_http_lock:
+            if backend_http is None:
+                http = requests.Session()
+                # Shared by every user, so never carry cookies between calls
+                http.cookies.set_policy(
+                    DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=BACKEND_POOL_SIZE)
+                http.mount("http://", adapter)
+                http.mount("https://", adapter)
+                backend_http = http
+    return backend_http
+
+
+def send_backend_request(session_id, endpoint, method="GET", data=None,
+                         deadline=None, http=None):
+    """Send a request to the backend on behalf of session_id.
+
+    The deadline is forwarded in X-Request-Deadline so the backend can
+    abandon work whose result nobody will receive; it is never later than
+    the endpoint's read timeout. Raises CircuitOpenError without contacting
+    the backend while the circuit breaker is open. http is the session to
+    send it with (default: the pooled one).
+    """
+    read_timeout = BACKEND_READ_TIMEOUTS.get(
+        endpoint, DEFAULT_BACKEND_READ_TIMEOUT)
+    now = time.time()
+    if deadline is None:
+        deadline = now + read_timeout
+    else:
+        deadline = min(deadline, now + read_timeout)
+        read_timeout = max(1.0, deadline - now)
+
+    breaker = get_backend_breaker()
+    if not breaker.allow_request():
+        raise CircuitOpenError(breaker.name, breaker.retry_after())
+
+    url = f"{backend_url}/{endpoint}"
+
+    headers = {
+        "Content-Type": "application/json",
+        "X-Session-ID": session_id,
+        "X-Request-Deadline": f"{deadline:.3f}",
+    }
+    timeout = (BACKEND_CONNECT_TIMEOUT, read_timeout)
+    if http is None:
+        http = get_backend_http()
+
+    started = time.monotonic()
+    try:
+        if method == "POST":
+            if data is None:
+                data = {}
+            data["session_id"] = session_id
+            response = http.post(
+                url, data=dumps_bytes(data), headers=headers, timeout=timeout)
+        else:
+            params = {"session_id": session_id}
+            response = http.get(
+                url, params=params, headers=headers, timeout=timeout)
+    except requests.RequestException:
+        if getattr(http, "cancelled", False):
+            # We closed the connection; says nothing about the backend
+            breaker.release()
+        else:
+            breaker.record_failure()
+        raise
+
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        slow_call_seconds = (
+            None if endpoint in SLOW_CALL_EXEMPT_ENDPOINTS
+            else BACKEND_SLOW_CALL_SECONDS
+        )
+        breaker.record_success(
+            time.monotonic() - started, slow_call_seconds)
+    return response
+
+
+# Backend state changes acknowledged to the client before the backend
+# confirmed them (e.g. rollbacks served from the model cache), per session.
+# Later backend calls for the session wait for them to land first.
+BACKEND_SYNC_WORKERS = 4
+background_backend_calls = None
+pending_backend_syncs = {}
+pending_backend_syncs_lock = threading.Lock()
+
+
+def get_background_backend_calls():
+    """Return this process's pool for background backend calls."""
+    global background_backend_calls
+    if background_backend_calls is None:
+        with subsystems_lock:
+            if background_backend_calls is None:
+                background_backend_calls = ThreadPoolExecutor(
+                    max_workers=BACKEND_SYNC_WORKERS,
+                    thread_name_prefix="backend-sync")
+    return background_backend_calls
+
+# The pending marker above lives in this process only. A call that lands on
+# another worker would not wait for it and could run against the state
+# before the change (and then be undone by it), so background syncs are
+# only used when one worker serves every request. gunicorn reads
+# WEB_CONCURRENCY as its number of workers.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
+BACKGROUND_BACKEND_SYNC = os.environ.get(
+    "BACKGROUND_BACKEND_SYNC", "true" if WEB_CONCURRENCY <= 1 else "false"
+).lower() == "true"
+
+
+def schedule_backend_sync(session_id, endpoint, data):
+    """Send a state-changing backend call in the background."""
+    with pending_backend_syncs_lock:
+        previous = pending_backend_syncs.get(session_id)
+        future = get_background_backend_calls().submit(
+            run_backend_sync, previous, session_id, endpoint, data)
+        pending_backend_syncs[session_id] = (future, endpoint, data)
+
+
+def run_backend_sync(previous, session_id, endpoint, data):
+    """Run a background backend call after the one scheduled before it."""
+    if previous is not None:
+        try:
+            previous[0].result()
+        except Exception:
+            pass
+    response = send_backend_request(session_id, endpoint, "POST", dict(data))
+    if not response.ok:
+        raise RuntimeError(
+            f"Backend {endpoint} returned {response.status_code}")
+
+
+def wait_for_backend_sync(session_id):
+    """Block until background state changes for a session reached the backend.
+
+    A change that failed in the background is replayed synchronously so
+    the next call never runs against stale backend state.
+    """
+    with pending_backend_syncs_lock:
+        entry = pending_backend_syncs.pop(session_id, None)
+    if entry is None:
+        return
+    future, endpoint, data = entry
+    try:
+        future.result(timeout=BACKEND_READ_TIMEOUTS.get(
+            endpoint, DEFAULT_BACKEND_READ_TIMEOUT))
+    except Exception as e:
+        logging.warning(
+            f"Background {endpoint} failed, retrying before next call: {str(e)}")
+        response = send_backend_request(
+            session_id, endpoint, "POST", dict(data))
+        if not response.ok:
+            raise RuntimeError(
+                f"Backend {endpoint} returned {response.status_code}")
+
+
 def make_backend_request(endpoint, method="GET", data=None):
-    """Make a request to the backend with session ID included."""
+    """Make a request to the backend with session ID included.
+
+    Long-running calls are cancelled (their backend connection is closed
+    and ClientDisconnected is raised) if the client disconnects before the
+    backend answers.
+    """
     session_id = get_session_id()
 
     # Update session activity
     update_session_activity()
 
-    url = f"{backend_url}/{endpoint}"
+    if method == "POST":
+        wait_for_backend_sync(session_id)
+
+    read_timeout = BACKEND_READ_TIMEOUTS.get(
+        endpoint, DEFAULT_BACKEND_READ_TIMEOUT)
+    deadline = request_deadline(read_timeout)
+
+    if (read_timeout >= DISCONNECT_WATCH_MIN_SECONDS
+            and client_socket(request.environ) is not None):
+        with CancellableSession() as http:
+            return call_unless_disconnected(
+                lambda: send_backend_request(
+                    session_id, endpoint, method, data, deadline, http),
+                request.environ,
+                cancel=http.cancel,
+            )
+    return send_backend_request(session_id, endpoint, method, data, deadline)
+
 
-    headers = {"Content-Type": "application/json", "X-Session-ID": session_id}
+def detached_backend_request(session_id, endpoint, method="GET", data=None,
+                             deadline=None):
+    """Make a backend request that isn't tied to the client's HTTP request.
 
+    Used for channel messages and idempotent calls, which must run to
+    completion even if the client disconnects. deadline, if given, is the
+    client's own deadline (see client_deadline).
+    """
     if method == "POST":
-        if data is None:
-            data = {}
-        data["session_id"] = session_id
-        # 6 minutes timeout
-        return requests.post(url, json=data, headers=headers, timeout=360)
-    else:
-        params = {"session_id": session_id}
-        # 6 minutes timeout
-        return requests.get(url, params=params, headers=headers, timeout=360)
+        wait_for_backend_sync(session_id)
+    return send_backend_request(session_id, endpoint, method, data, deadline)
+
+
+# Idempotency-Key support for the mutating routes. A keyed call runs on its
+# own thread, so it keeps going when the client disconnects (until the
+# client's deadline); a retry with the same key attaches to it while it
+# runs and gets its stored result for IDEMPOTENCY_TTL_SECONDS after. Keys
+# are claimed in the database so a retry that lands on another worker
+# process finds the call too; within a process the store below lets
+# retries share the running call without polling the database.
+IDEMPOTENCY_TTL_SECONDS = float(
+    os.environ.get("IDEMPOTENCY_TTL_SECONDS", "600"))
+idempotency_store = IdempotencyStore(
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    max_entries=int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "2048")),
+)
+shared_idempotency_keys = SharedIdempotencyKeys(
+    db,
+    IdempotencyRecord,
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    # Longer than any keyed call: an admission wait plus the longest
+    # backend timeout. A claim older than this belongs to a dead process.
+    lease_seconds=float(
+        os.environ.get("IDEMPOTENCY_LEASE_SECONDS", "900")),
+)
+
+
+def idempotency_fingerprint(fields):
+    """Identify the parameters a key was first used with."""
+    return hashlib.sha1(dumps_bytes(fields, sort_keys=True)).hexdigest()
+
+
+def submit_idempotent(scope, session_id, key, fields, func, keep=None,
+                      deadline=None):
+    """Start func(backend_request) once per key and return its Future.
+
+    fields are the request parameters; reusing a key with different ones
+    raises IdempotencyKeyMismatch. Backend calls are sent with deadline
+    (the client's, if any).
+    """
+    fingerprint = idempotency_fingerprint(fields)
+    record_key = hashlib.sha1(
+        dumps_bytes([session_id, scope, key])).hexdigest()
+    backend_request = partial(
+        detached_backend_request, session_id, deadline=deadline)
+    return idempotency_store.submit(
+        (session_id, scope, key),
+        fingerprint,
+        copy_request_context(partial(
+            shared_idempotency_keys.run,
+            record_key,
+            fingerprint,
+            partial(func, backend_request),
+            keep,
+        )),
+        keep,
+    )
+
+
+def run_idempotent(scope, session_id, fields, func, keep=None):
+    """Run func(backend_request) for a route, honouring an Idempotency-Key header."""
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        return func(make_backend_request)
+    update_session_activity()
+    future = submit_idempotent(scope, session_id, key, fields, func, keep,
+                               deadline=client_deadline())
+    return call_unless_disconnected(future.result, request.environ)
+
+
+def idempotency_mismatch_body(error):
+    return {"error": "This Idempotency-Key was already used for a different request."}
+
+
+# Model artifacts are served under this URL path. Where they are stored is
+# configured by ARTIFACT_STORAGE (see artifact_storage.storage_from_env);
+# with the default local storage this is also the directory on disk.
+CAD_MODELS_DIR = "static/cadmodels"
+artifact_storage = None
+
+
+def get_artifact_storage():
+    """Return the artifact storage (with S3, this builds its client)."""
+    global artifact_storage
+    if artifact_storage is None:
+        with subsystems_lock:
+            if artifact_storage is None:
+                artifact_storage = storage_from_env(CAD_MODELS_DIR)
+    return artifact_storage
+
+
+def artifact_name(path):
+    """Return the storage name of a model artifact from its URL path."""
+    return path.rsplit("/", 1)[-1]
+
+
+def metadata_name(name):
+    """Return the storage name of the metadata sidecar of an artifact."""
+    return f"{name}.meta.json"
+
+
+def thumbnail_name(name):
+    """Return the storage name of the PNG thumbnail of an artifact."""
+    return f"{name}.thumb.png"
+
+
+def remove_model_file(path):
+    """Delete a model artifact (and its sidecars) that is no longer referenced."""
+    name = artifact_name(path)
+    # Session-less files (template starter models) are shared by sessions
+    # in every worker, so only the janitor may remove them
+    if artifact_session(name) is None:
+        return
+    try:
+        get_artifact_storage().delete(name)
+        get_artifact_storage().delete(metadata_name(name))
+        get_artifact_storage().delete(thumbnail_name(name))
+    except Exception as e:
+        logging.warning(f"Could not remove model file {path}: {str(e)}")
+
+
+def get_model_metadata(name, model_binary_data):
+    """Return geometry metadata for an STL artifact, cached in a sidecar file."""
+    if not metadata_available():
+        return None
+    sidecar = metadata_name(name)
+    try:
+        if get_artifact_storage().exists(sidecar):
+            return loads(get_artifact_storage().read(sidecar))
+    except Exception as e:
+        logging.warning(f"Could not read model metadata {sidecar}: {str(e)}")
+
+    try:
+        started = time.monotonic()
+        metadata = stl_metadata(model_binary_data)
+        logging.debug(
+            f"Computed metadata for {name} in "
+            f"{(time.monotonic() - started) * 1000:.1f} ms"
+        )
+    except Exception as e:
+        logging.warning(f"Could not compute model metadata for {name}: {str(e)}")
+        return None
+    try:
+        get_artifact_storage().save(sidecar, dumps_bytes(metadata))
+    except Exception as e:
+        logging.warning(f"Could not store model metadata {sidecar}: {str(e)}")
+    return metadata
+
+
+# Thumbnails of STL models for the trajectory view, rendered on a small
+# background pool so responses don't wait for them
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", "2"))
+thumbnail_pool = None
+thumbnails_in_flight = set()
+thumbnails_lock = threading.Lock()
+
+
+def get_thumbnail_pool():
+    """Return this process's thumbnail rendering pool."""
+    global thumbnail_pool
+    if thumbnail_pool is None:
+        with subsystems_lock:
+            if thumbnail_pool is None:
+                thumbnail_pool = ThreadPoolExecutor(
+                    max_workers=THUMBNAIL_WORKERS,
+                    thread_name_prefix="thumbnail")
+    return thumbnail_pool
+
+
+def render_model_thumbnail(name, model_binary_data):
+    """Render and store the thumbnail of an STL artifact."""
+    try:
+        started = time.monotonic()
+        png = render_thumbnail(parse_stl(model_binary_data))
+        get_artifact_storage().save(thumbnail_name(name), png)
+        logging.debug(
+            f"Rendered thumbnail for {name} in "
+            f"{(time.monotonic() - started) * 1000:.1f} ms"
+        )
+    except Exception as e:
+        logging.warning(f"Could not render thumbnail for {name}: {str(e)}")
+    finally:
+        with thumbnails_lock:
+            thumbnails_in_flight.discard(name)
+
+
+def schedule_thumbnail(name, model_binary_data):
+    """Queue a thumbnail render for an STL artifact unless one exists."""
+    if not thumbnails_available():
+        return
+    with thumbnails_lock:
+        if name in thumbnails_in_flight:
+            return
+        thumbnails_in_flight.add(name)
+    try:
+        if get_artifact_storage().exists(thumbnail_name(name)):
+            with thumbnails_lock:
+                thumbnails_in_flight.discard(name)
+            return
+        get_thumbnail_pool().submit(
+            render_model_thumbnail, name, model_binary_data)
+    except Exception as e:
+        with thumbnails_lock:
+            thumbnails_in_flight.discard(name)
+        logging.warning(f"Could not schedule thumbnail for {name}: {str(e)}")
+
+
+def session_thumbnails(session_id):
+    """Return the thumbnails rendered so far for the cached steps of a session."""
+    thumbnails = []
+    for index, model_info in model_cache.steps(session_id):
+        if model_info.get("type") != "stl":
+            continue
+        name = thumbnail_name(artifact_name(model_info["path"]))
+        try:
+            if get_artifact_storage().exists(name):
+                thumbnails.append(
+                    {"index": index, "url": f"/{CAD_MODELS_DIR}/{name}"})
+        except Exception as e:
+            logging.warning(f"Could not look up thumbnail {name}: {str(e)}")
+    return thumbnails
+
+
+def thumbnail_gallery_html(thumbnails):
+    """Render a strip of step thumbnails for the top of the trajectory view."""
+    if not thumbnails:
+        return ""
+    html = "<div class='trajectory-thumbnails'>"
+    for thumbnail in thumbnails:
+        html += (
+            f"<figure class='trajectory-thumbnail' data-message-index='{thumbnail['index']}'>"
+            f"<img src='{thumbnail['url']}' alt='Step {thumbnail['index']}' loading='lazy'>"
+            f"<figcaption>Step {thumbnail['index']}</figcaption></figure>"
+        )
+    html += "</div>"
+    return html
+
+
+# Starter responses for well-known design types, shared across sessions.
+# TEMPLATE_PREWARM=true fetches them in the background once the design
+# types are known instead of on first use.
+template_cache = TemplateCache(
+    design_types=[design_type["id"] for design_type in DEFAULT_DESIGN_TYPES],
+    ttl_seconds=float(os.environ.get("TEMPLATE_CACHE_TTL_SECONDS", "3600")),
+)
+TEMPLATE_PREWARM = os.environ.get("TEMPLATE_PREWARM", "false").lower() == "true"
+
+
+# Disk budget for generated artifacts. A background janitor evicts the least
+# recently served files, first from sessions over their quota and then
+# globally, until usage fits ARTIFACT_DISK_BUDGET_MB.
+SESSION_ARTIFACT_PATTERN = re.compile(r"^model-([0-9a-f]{8})-[0-9a-f]{16}\.")
+
+
+def artifact_session(name):
+    """Return the session prefix encoded in an artifact file name, if any."""
+    match = SESSION_ARTIFACT_PATTERN.match(name)
+    return match.group(1) if match else None
+
+
+def is_pinned_artifact(path):
+    """Template artifacts are shared by every session and must be kept."""
+    pinned = {artifact_name(p) for p in template_cache.pinned_paths()}
+    return os.path.basename(path) in pinned
+
+
+artifact_janitor = None
+
+
+def get_artifact_janitor():
+    """Return the artifact janitor (its thread is started in each worker
+    by start_artifact_janitor)."""
+    global artifact_janitor
+    if artifact_janitor is None:
+        with subsystems_lock:
+            if artifact_janitor is None:
+                directories = [("static/saved_designs", ""),
+                               ("static/trajectories", "")]
+                local_directory = get_artifact_storage().local_directory()
+                if local_directory:
+                    directories.insert(0, (local_directory, "model-"))
+                artifact_janitor = ArtifactJanitor(
+                    directories,
+                    max_total_bytes=int(os.environ.get(
+                        "ARTIFACT_DISK_BUDGET_MB", "2048")) * 1024 * 1024,
+                    max_session_bytes=int(os.environ.get(
+                        "ARTIFACT_SESSION_QUOTA_MB", "200")) * 1024 * 1024,
+                    interval_seconds=float(os.environ.get(
+                        "ARTIFACT_JANITOR_INTERVAL_SECONDS", "300")),
+                    session_of=artifact_session,
+                    is_protected=is_pinned_artifact,
+                )
+    return artifact_janitor
 
 
-def process_model_data(response_data):
-    """Process model data from backend response (new format with 'data' and 'format')."""
+@app.before_request
+def start_artifact_janitor():
+    """Make sure the janitor runs in this worker process."""
+    get_artifact_janitor().start()
+
+
+# Models already sent to each session, keyed by trajectory (message) index,
+# so rollbacks can be answered without re-downloading the geometry
+model_cache = ModelCache(
+    max_bytes=int(os.environ.get("MODEL_CACHE_MAX_MB", "512")) * 1024 * 1024,
+    max_sessions=int(os.environ.get("MODEL_CACHE_MAX_SESSIONS", "1000")),
+    max_steps_per_session=int(os.environ.get("MODEL_CACHE_MAX_STEPS", "50")),
+    on_evict=remove_model_file,
+)
+
+
+def process_model_data(response_data, session_id=None):
+    """Process model data from backend response (new format with 'data' and 'format').
+
+    Models are written to content-addressed files (per session when a
+    session_id is given), so every step of a design keeps its own artifact.
+    """
     model_data_hex = response_data.get("data")
 
     # Handle format field - if it's None or empty, default to "stl"
@@ -284,29 +1083,131 @@ def process_model_data(response_data):
         # Convert hex back to binary
         model_binary_data = bytes.fromhex(model_data_hex)
 
-        save_dir = "static/cadmodels"
-
         # Determine file extension based on format
         if model_format == "step":
             file_extension = ".step"
         else:
             file_extension = ".stl"  # Default to STL
 
-        model_file_path = os.path.join(save_dir, f"model{file_extension}")
-
-        with open(model_file_path, "wb") as model_file:
-            model_file.write(model_binary_data)
-
-        if not os.path.exists(model_file_path):
-            logging.error(f"Model file not found at path: {model_file_path}")
-            return None
-
-        return {"type": model_format, "path": model_file_path}
+        digest = hashlib.sha1(model_binary_data).hexdigest()[:16]
+        if session_id:
+            filename = f"model-{session_id[:8]}-{digest}{file_extension}"
+        else:
+            filename = f"model-{digest}{file_extension}"
+        model_file_path = f"{CAD_MODELS_DIR}/{filename}"
+
+        # Identical geometry was already stored for this session
+        if not get_artifact_storage().exists(filename):
+            get_artifact_storage().save(filename, model_binary_data)
+
+        model_info = {"type": model_format, "path": model_file_path}
+        if file_extension == ".stl":
+            # Bounds, counts, area, volume and centroid for the client
+            metadata = get_model_metadata(filename, model_binary_data)
+            if metadata is not None:
+                model_info["metadata"] = metadata
+            schedule_thumbnail(filename, model_binary_data)
+        return model_info
     except Exception as e:
         logging.error(f"Error processing model data: {str(e)}")
         return None
 
 
+def cache_model(session_id, index, model_info, new_design=False):
+    """Remember the model shown at a trajectory index for later rollbacks.
+
+    The step at index becomes the session's latest: later steps are
+    forgotten, and with new_design every earlier one as well.
+    """
+    if not isinstance(index, int):
+        return
+    size = None
+    if model_info is not None:
+        try:
+            size = get_artifact_storage().size(artifact_name(model_info["path"]))
+        except Exception:
+            pass
+    if size is None:
+        if new_design:
+            model_cache.clear_session(session_id)
+        else:
+            model_cache.truncate(session_id, index - 1)
+        return
+    model_cache.put(session_id, index, model_info, size,
+                    truncate=True, clear=new_design)
+
+
+# Background forwarding of fire-and-forget submissions (feedback, waitlist)
+outbox_worker = None
+outbox_worker_lock = threading.Lock()
+
+
+def forward_outbox_message(message, payload):
+    """Send a queued outbox message to its backend endpoint."""
+    return send_backend_request(
+        message.session_id or "outbox", message.endpoint, "POST", payload
+    )
+
+
+def get_outbox_worker():
+    """Return the outbox worker, creating tables and starting it on first use."""
+    global outbox_worker
+    if outbox_worker is None:
+        with outbox_worker_lock:
+            if outbox_worker is None:
+                try:
+                    db.create_all()
+                except Exception as e:
+                    logging.debug(
+                        f"Database not available for outbox: {str(e)}")
+                outbox_worker = OutboxWorker(
+                    app,
+                    db,
+                    OutboxMessage,
+                    forward_outbox_message,
+                    batch_size=int(os.environ.get("OUTBOX_BATCH_SIZE", "50")),
+                    poll_interval=float(
+                        os.environ.get("OUTBOX_POLL_SECONDS", "5")),
+                )
+    outbox_worker.start()
+    return outbox_worker
+
+
+def enqueue_outbox_message(endpoint, dedupe_key, payload, records=(),
+                           session_id=None):
+    """Accept a submission into the durable outbox and wake the worker.
+
+    Returns False if it duplicates an earlier submission. Raises if the
+    database is unavailable, in which case callers forward synchronously.
+    """
+    worker = get_outbox_worker()
+    accepted = enqueue(
+        db,
+        OutboxMessage,
+        endpoint,
+        dedupe_key,
+        payload,
+        session_id=session_id or get_session_id(),
+        records=records,
+    )
+    if accepted:
+        worker.wake()
+    return accepted
+
+
+# Fingerprinted asset manifest written by build_assets.py (empty in local dev)
+asset_manifest = load_manifest(app.static_folder)
+
+
+@app.context_processor
+def inject_asset_helpers():
+    """Expose asset_url/asset_urls so templates reference fingerprinted files."""
+    return {
+        "asset_urls": lambda path: asset_urls(asset_manifest, path),
+        "asset_url": lambda path: asset_urls(asset_manifest, path)[0],
+    }
+
+
 @app.route("/")
 def index():
     is_authenticated = session.get("authenticated", False)
@@ -324,9 +1225,27 @@ def step_viewer():
 @app.route("/static/cadmodels/<filename>")
 def serve_cad_file(filename):
     """Serve CAD files with proper CORS headers for 3D viewer"""
-    from flask import send_from_directory
+    from flask import abort, send_file, send_from_directory
 
-    response = send_from_directory("static/cadmodels", filename)
+    try:
+        local_path = get_artifact_storage().local_path(filename)
+    except ValueError:
+        abort(404)
+
+    if local_path:
+        get_artifact_janitor().touch(local_path)
+        response = send_from_directory(
+            os.path.dirname(os.path.abspath(local_path)), filename)
+    elif get_artifact_storage().exists(filename):
+        # Remote storage without a local cache
+        response = send_file(
+            io.BytesIO(get_artifact_storage().read(filename)),
+            mimetype="application/octet-stream",
+            download_name=filename,
+        )
+    else:
+        # Files shipped with the app (e.g. the step viewer demo model)
+        response = send_from_directory(CAD_MODELS_DIR, filename)
 
     # Add CORS headers to allow the 3D viewer to access the file
     response.headers["Access-Control-Allow-Origin"] = "*"
@@ -338,6 +1257,9 @@ def serve_cad_file(filename):
         response.headers["Content-Type"] = "application/step"
     elif filename.lower().endswith(".stl"):
         response.headers["Content-Type"] = "application/sla"
+    elif filename.lower().endswith(".png"):
+        # Step thumbnails rendered by thumbnail_renderer
+        response.headers["Content-Type"] = "image/png"
     else:
         # Default to binary for unknown CAD file types
         response.headers["Content-Type"] = "application/octet-stream"
@@ -345,42 +1267,109 @@ def serve_cad_file(filename):
     return response
 
 
-@app.route("/generate", methods=["POST"])
-def generate_cad():
-    try:
-        command = request.json.get("command", "")
+@app.route("/static/dist/<path:filename>")
+def serve_dist_asset(filename):
+    """Serve fingerprinted assets, preferring precompressed siblings."""
+    from flask import send_from_directory
 
-        # Store the user's command in the current trajectory
-        # This is for displaying in the trajectory view
-        update_trajectory_with_user_command(command)
+    dist_dir = os.path.join(app.static_folder, "dist")
+    served_name = filename
+    encoding = None
+    for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if candidate in request.accept_encodings:
+            compressed_path = safe_join(dist_dir, filename + suffix)
+            if compressed_path and os.path.isfile(compressed_path):
+                served_name = filename + suffix
+                encoding = candidate
+                break
+
+    response = send_from_directory(
+        dist_dir, served_name, mimetype=mimetypes.guess_type(filename)[0]
+    )
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    # File names change with their content, so they can be cached forever
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
 
-        response = make_backend_request(
-            "process-prompt", "POST", {"prompt": command})
-        response_data = response.json()
 
-        # Extract response text and model data
-        answer_text = response_data.get(
-            "response", "There was an error processing your request."
-        )
+def run_generate(session_id, command, message_index,
+                 backend_request=make_backend_request, on_model_ready=None,
+                 on_queued=None):
+    """Send a prompt to the backend and store the resulting model.
 
-        # Update trajectory with the AI's response
-        update_trajectory_with_ai_response(answer_text)
+    Returns the response body for the client. on_model_ready, if given, is
+    called with the model as soon as its file is stored; on_queued is called
+    with the queue position while waiting for admission. Raises
+    AdmissionRejected when the call can't be admitted.
+    """
+    with heavy_calls.admit(session_id, on_queued):
+        return generate_model(session_id, command, message_index,
+                              backend_request, on_model_ready)
 
-        # Process model data using new format (data + format)
-        model_info = process_model_data(response_data)
 
-        if not model_info:
-            logging.info("No model data received from backend")
-            response = {
-                "message": answer_text,
-                "reset_viewer": True,  # Signal to the frontend to reset/clear the 3D viewer
-            }
-        else:
-            response = {
-                "message": answer_text,
-                "model": model_info,
-            }
-        return jsonify(response)
+def generate_model(session_id, command, message_index, backend_request,
+                   on_model_ready):
+    """Send a prompt to the backend and store the resulting model."""
+    # Store the user's command in the current trajectory
+    # This is for displaying in the trajectory view
+    update_trajectory_with_user_command(command)
+
+    response = backend_request("process-prompt", "POST", {"prompt": command})
+    response_data = loads_response(response)
+
+    # Extract response text and model data
+    answer_text = response_data.get(
+        "response", "There was an error processing your request."
+    )
+
+    # Update trajectory with the AI's response
+    update_trajectory_with_ai_response(answer_text)
+
+    # Process model data using new format (data + format)
+    model_info = process_model_data(response_data, session_id)
+    if model_info and on_model_ready is not None:
+        on_model_ready(model_info)
+    cache_model(session_id, message_index, model_info)
+
+    if not model_info:
+        logging.info("No model data received from backend")
+        return {
+            "message": answer_text,
+            "reset_viewer": True,  # Signal to the frontend to reset/clear the 3D viewer
+        }
+    return {
+        "message": answer_text,
+        "model": model_info,
+    }
+
+
+@app.route("/generate", methods=["POST"])
+def generate_cad():
+    try:
+        command = request.json.get("command", "")
+        # Index the client will give this response, used to key the model cache
+        message_index = request.json.get("message_index")
+
+        session_id = get_session_id()
+        return jsonify(run_idempotent(
+            "generate",
+            session_id,
+            {"command": command, "message_index": message_index},
+            lambda backend_request: run_generate(
+                session_id, command, message_index, backend_request),
+        ))
+    except IdempotencyKeyMismatch as e:
+        return jsonify(idempotency_mismatch_body(e)), 422
+    except AdmissionRejected as e:
+        logging.info(f"Rejecting command: {str(e)}")
+        return admission_rejected_response(e)
+    except CircuitOpenError as e:
+        logging.warning(f"Backend unavailable, rejecting command: {str(e)}")
+        return backend_unavailable_response(
+            e, {"error": "The design service is temporarily unavailable. Please try again shortly."}
+        )
     except Exception as e:
         logging.error(f"Error processing command: {str(e)}")
         return jsonify({"error": "Failed to process command"}), 500
@@ -407,6 +1396,44 @@ def update_trajectory_with_ai_response(response):
     )
 
 
+def build_new_design_response(design_type, response_data):
+    """Build the new_design response body from the backend reset response."""
+    formatted_type = design_type.replace("_", " ")
+
+    # Get the response message from the backend
+    answer_text = response_data.get("response")
+
+    # Use the backend's message if available, otherwise generate a fallback message
+    if not answer_text or answer_text == "Completed":
+        # Generate a fallback welcome message
+        if design_type == "empty":
+            answer_text = (
+                "Starting with a blank canvas. What would you like to create?"
+            )
+        else:
+            # Format the design type for display (e.g., coffee_table -> coffee table)
+            answer_text = f"Starting with a {formatted_type} design. You can modify it or add features."
+
+    # Check if we need an early return (no model data or special cases)
+    if response_data and response_data.get("response") == "Completed":
+        return {"status": "success", "message": answer_text}
+
+    # Starter geometry is the same for every user, so it is stored once
+    # rather than per session
+    model_info = process_model_data(response_data)
+    if model_info:
+        return {"status": "success", "message": answer_text, "model": model_info}
+    return {"status": "success", "message": answer_text}
+
+
+def start_design_history(session_id, body):
+    """Record a new design's first step in the trajectory and model cache."""
+    update_trajectory_with_ai_response(body["message"])
+
+    # A new design starts a fresh history; its first message is index 0
+    cache_model(session_id, 0, body.get("model"), new_design=True)
+
+
 @app.route("/new_design", methods=["POST"])
 def new_design():
     try:
@@ -424,6 +1451,25 @@ def new_design():
         # Store this command in the trajectory
         update_trajectory_with_user_command(command)
 
+        # Serve the starter response from the template cache; the backend
+        # only has to reset its state. With a single worker that happens in
+        # the background and later calls for this session wait for it (see
+        # BACKGROUND_BACKEND_SYNC).
+        template = template_cache.get(design_type)
+        if template:
+            session_id = get_session_id()
+            sync_data = {"prompt": design_type, "include_model": False}
+            if BACKGROUND_BACKEND_SYNC:
+                update_session_activity()
+                schedule_backend_sync(session_id, "reset", sync_data)
+            else:
+                response = make_backend_request("reset", "POST", sync_data)
+                if not response.ok:
+                    raise RuntimeError(
+                        f"Backend reset returned {response.status_code}")
+            start_design_history(session_id, template)
+            return jsonify(template)
+
         # Call the backend API
         response = make_backend_request(
             "reset", "POST", {"prompt": design_type})
@@ -442,78 +1488,153 @@ def new_design():
                 500,
             )
 
-        response_data = response.json()
-
-        # Get the response message from the backend
-        answer_text = response_data.get("response")
+        body = build_new_design_response(design_type, loads_response(response))
+        start_design_history(get_session_id(), body)
+        template_cache.put(design_type, body)
+        return jsonify(body)
 
-        # Use the backend's message if available, otherwise generate a fallback message
-        if not answer_text or answer_text == "Completed":
-            # Generate a fallback welcome message
-            if design_type == "empty":
-                answer_text = (
-                    "Starting with a blank canvas. What would you like to create?"
-                )
-            else:
-                # Format the design type for display (e.g., coffee_table -> coffee table)
-                answer_text = f"Starting with a {formatted_type} design. You can modify it or add features."
+    except CircuitOpenError as e:
+        logging.warning(f"Backend unavailable, rejecting new design: {str(e)}")
+        return backend_unavailable_response(
+            e, {"error": "The design service is temporarily unavailable. Please try again shortly."}
+        )
+    except Exception as e:
+        logging.error(f"Error starting new design: {str(e)}")
+        return jsonify({"error": "Failed to start new design"}), 500
 
-        # Store the response in the trajectory
-        update_trajectory_with_ai_response(answer_text)
 
-        # Check if we need an early return (no model data or special cases)
-        if response_data and response_data.get("response") == "Completed":
-            return jsonify({"status": "success", "message": answer_text})
+# Template prewarming uses its own backend session so no user's state is touched
+TEMPLATE_PREWARM_SESSION_ID = "template-prewarm"
+template_prewarm_in_flight = set()
+template_prewarm_lock = threading.Lock()
 
-        # Process model data using new format (data + format)
-        model_info = process_model_data(response_data)
 
-        if model_info:
-            return jsonify(
-                {
-                    "status": "success",
-                    "message": answer_text,
-                    "model": model_info,
-                }
+def prewarm_template(design_type):
+    """Fetch and cache the starter response for a design type."""
+    try:
+        response = send_backend_request(
+            TEMPLATE_PREWARM_SESSION_ID, "reset", "POST", {"prompt": design_type}
+        )
+        if response.ok:
+            template_cache.put(
+                design_type, build_new_design_response(
+                    design_type, loads_response(response))
             )
+            logging.info(f"Prewarmed template for design type: {design_type}")
+    except Exception as e:
+        logging.warning(
+            f"Could not prewarm template for {design_type}: {str(e)}")
+    finally:
+        with template_prewarm_lock:
+            template_prewarm_in_flight.discard(design_type)
+
+
+def prewarm_templates():
+    """Prewarm every known design type that has no cached template yet."""
+    for design_type in template_cache.missing():
+        with template_prewarm_lock:
+            if design_type in template_prewarm_in_flight:
+                continue
+            template_prewarm_in_flight.add(design_type)
+        get_background_backend_calls().submit(prewarm_template, design_type)
+
+
+def format_design_types(backend_design_types):
+    """Format the backend's design types in the structure expected by the frontend."""
+    formatted_design_types = []
+    for design_type in backend_design_types:
+        # Format the name for display (e.g., "coffee_table" -> "Coffee Table")
+        display_name = design_type.replace("_", " ").title()
+        formatted_design_types.append(
+            {
+                "id": design_type,
+                "name": display_name,
+                "description": f"Start with a {design_type.replace('_', ' ')} design",
+            }
+        )
+    return formatted_design_types
 
-        return jsonify({"status": "success", "message": answer_text})
 
-    except Exception as e:
-        logging.error(f"Error starting new design: {str(e)}")
-        return jsonify({"error": "Failed to start new design"}), 500
+def prime_app_config():
+    """Fetch the design types once so the fallback config and template
+    cache are ready before the first user asks for them."""
+    response = send_backend_request(TEMPLATE_PREWARM_SESSION_ID, "init")
+    if not response.ok:
+        logging.warning(
+            f"Could not prime app config: backend returned {response.status_code}")
+        return
+    response_data = loads_response(response)
+    backend_design_types = response_data.get("design_types", [])
+    if backend_design_types:
+        template_cache.sync_design_types(backend_design_types)
+    remember_backend_response(
+        "init",
+        {
+            "design_types": format_design_types(backend_design_types),
+            "welcome_message": response_data.get(
+                "message", "Welcome to Morfis - AI CAD Agent"),
+        },
+    )
 
 
-@app.route("/api/config", methods=["GET"])
-def get_app_config():
-    """Return app configuration data like available design types"""
+def fallback_app_config():
+    """Return the last known good configuration, or the defaults."""
+    config = {
+        "design_types": DEFAULT_DESIGN_TYPES,
+        "welcome_message": "Welcome to Morfis - AI CAD Agent",
+    }
+    cached = recall_backend_response("init")
+    if cached:
+        config.update(cached)
+    config["advanced_viewer"] = (
+        os.environ.get("ADVANCED_VIEWER", "true").lower() == "true"
+    )
+    return config
+
+
+def app_config(session_id):
+    """Return app configuration data like available design types.
+
+    Also loads the session's initial model from the backend. Falls back to
+    the last known good configuration when the backend can't be reached.
+    """
     try:
         # Fetch design types from backend
         response = make_backend_request("init")
         if response.ok:
-            response_data = response.json()
+            response_data = loads_response(response)
             # The backend returns a list of design types, welcome message, and possibly model data
             backend_design_types = response_data.get("design_types", [])
             welcome_message = response_data.get(
                 "message", "Welcome to Morfis - AI CAD Agent"
             )
 
-            logging.debug(f"Backend init response: {response_data}")
+            # Only a summary: the response can carry megabytes of model data
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(
+                    f"Backend init response: {len(backend_design_types)} design "
+                    f"types, model format {response_data.get('format')!r}, "
+                    f"{len(response_data.get('data') or '') // 2} model bytes"
+                )
 
             # Format design types in the structure expected by the frontend
-            formatted_design_types = []
-
-            # Add each design from the backend with proper formatting
-            for design_type in backend_design_types:
-                # Format the name for display (e.g., "coffee_table" -> "Coffee Table")
-                display_name = design_type.replace("_", " ").title()
-                formatted_design_types.append(
-                    {
-                        "id": design_type,
-                        "name": display_name,
-                        "description": f"Start with a {design_type.replace('_', ' ')} design",
-                    }
-                )
+            formatted_design_types = format_design_types(backend_design_types)
+
+            # The starter templates depend on the backend's design types
+            if backend_design_types and template_cache.sync_design_types(
+                    backend_design_types):
+                logging.info("Design types changed, template cache cleared")
+            if TEMPLATE_PREWARM:
+                prewarm_templates()
+
+            # Remember the session-independent part for when the backend is down
+            remember_backend_response(
+                "init",
+                {
+                    "design_types": formatted_design_types,
+                    "welcome_message": welcome_message,
+                },
+            )
 
             # Create the base configuration structure
             config = {
@@ -525,61 +1646,77 @@ def get_app_config():
             }
 
             # Process model data using new format (data + format)
-            model_info = process_model_data(response_data)
+            model_info = process_model_data(response_data, session_id)
+
+            # The welcome message is index 0 of a fresh history
+            cache_model(session_id, 0, model_info, new_design=True)
             if model_info:
                 # Add the model information to the configuration
                 config["model"] = model_info
 
-            return jsonify(config)
+            return config
         else:
-            # Fallback to default if backend request fails
-            config = {
-                "design_types": DEFAULT_DESIGN_TYPES,
-                "welcome_message": "Welcome to Morfis - AI CAD Agent",
-                "advanced_viewer": (
-                    os.environ.get("ADVANCED_VIEWER", "true").lower() == "true"
-                ),
-            }
-            return jsonify(config)
+            # Fallback to cached or default config if backend request fails
+            return fallback_app_config()
+    except CircuitOpenError:
+        logging.warning("Backend circuit open, serving cached configuration")
+        return fallback_app_config()
     except Exception as e:
         logging.error(f"Error fetching app configuration: {str(e)}")
-        # Return default design types as fallback
-        return jsonify(
-            {
-                "design_types": DEFAULT_DESIGN_TYPES,
-                "welcome_message": "Welcome to Morfis - AI CAD Agent",
-                "advanced_viewer": (
-                    os.environ.get("ADVANCED_VIEWER", "true").lower() == "true"
-                ),
-            }
-        )
+        # Return cached or default design types as fallback
+        return fallback_app_config()
+
+
+@app.route("/api/config", methods=["GET"])
+def get_app_config():
+    """Return app configuration data like available design types"""
+    return jsonify(app_config(get_session_id()))
 
 
 # Route removed - trajectory is now handled via the API endpoint and modal UI
 
 
-@app.route("/api/trajectory-html")
-def get_trajectory_html():
-    """Return trajectory data as HTML for direct embedding."""
+def trajectory_html(session_id, backend_request=make_backend_request):
+    """Return the trajectory of a session as HTML, falling back to cached data.
+
+    Thumbnails of the session's cached steps are shown above the messages.
+    """
+    return (thumbnail_gallery_html(session_thumbnails(session_id))
+            + (trajectory_messages_html(session_id, backend_request) or ""))
+
+
+def trajectory_messages_html(session_id, backend_request=make_backend_request):
+    """Return the trajectory messages of a session as HTML."""
+    # Try to get trajectory data from the backend
+    cache_key = ("trajectory", session_id)
     try:
-        # Try to get trajectory data from the backend
-        backend_data = None
-        try:
-            response = make_backend_request("trajectory")
-            if response.ok:
-                # Backend directly returns HTML content
-                response_data = response.json()
-                return response_data.get("html_content")
-        except Exception as e:
-            logging.warning(f"Error fetching from backend: {str(e)}")
+        response = backend_request("trajectory")
+        if response.ok:
+            # Backend directly returns HTML content
+            response_data = loads_response(response)
+            remember_backend_response(cache_key, response_data)
+            return response_data.get("html_content")
+    except Exception as e:
+        logging.warning(f"Error fetching from backend: {str(e)}")
 
-        # Fallback: Use local trajectory data if backend fails
-        if current_trajectory["messages"]:
-            return generate_trajectory_html(current_trajectory)
+    # Fallback: Serve the last known good trajectory for this session
+    cached = recall_backend_response(cache_key)
+    if cached and cached.get("html_content"):
+        return cached.get("html_content")
 
-        # If no data is available
-        return "<div class='no-data'>No trajectory data available yet.</div>"
+    # Fallback: Use local trajectory data if backend fails
+    if current_trajectory["messages"]:
+        return generate_trajectory_html(current_trajectory)
 
+    # If no data is available
+    return "<div class='no-data'>No trajectory data available yet.</div>"
+
+
+@app.route("/api/trajectory-html")
+def get_trajectory_html():
+    """Return trajectory data as HTML for direct embedding."""
+    try:
+        return trajectory_html(get_session_id())
     except Exception as e:
         logging.error(f"Error generating trajectory HTML: {str(e)}")
         return "<div class='error-message'><i class='fas fa-exclamation-circle'></i><p>Error generating trajectory view</p></div>"
@@ -633,91 +1770,132 @@ def get_trajectory():
     """Return trajectory data as JSON."""
     try:
         # Try to get trajectory data from the backend
-        url = f"{backend_url}/trajectory"
-
+        session_id = get_session_id()
+        cache_key = ("trajectory", session_id)
         try:
             response = make_backend_request("trajectory")
             if response.ok:
-                return response.json()
+                response_data = loads_response(response)
+                remember_backend_response(cache_key, response_data)
+                if isinstance(response_data, dict):
+                    return {**response_data,
+                            "thumbnails": session_thumbnails(session_id)}
+                return response_data
         except Exception as e:
             logging.warning(f"Error fetching from backend: {str(e)}")
 
+        # Fallback: Serve the last known good trajectory for this session
+        thumbnails = session_thumbnails(session_id)
+        cached = recall_backend_response(cache_key)
+        if cached:
+            return jsonify({**cached, "thumbnails": thumbnails})
+
         # Fallback: Use local trajectory data if backend connection fails
         if current_trajectory["messages"]:
-            return jsonify(current_trajectory)
+            return jsonify({**current_trajectory, "thumbnails": thumbnails})
 
         # If no data is available
-        return jsonify({"messages": []})
+        return jsonify({"messages": [], "thumbnails": thumbnails})
 
     except Exception as e:
         logging.error(f"Error preparing trajectory data: {str(e)}")
         return jsonify({"error": f"Error preparing trajectory data: {str(e)}"})
 
 
-@app.route("/save_design", methods=["POST"])
-def save_design():
+def run_save_design(design_name, backend_request=make_backend_request):
+    """Save the current design in the backend under design_name.
+
+    Returns (response body, status code).
+    """
+    # Send design name to backend
     try:
-        design_name = request.json.get("name", "")
-        if not design_name:
+        response = backend_request(
+            "save_design",
+            "POST",
+            {
+                "prompt": design_name,
+            },
+        )
+
+        if response.ok:
+            logging.info(f"Design saved to backend: {design_name}")
             return (
-                jsonify({"status": "error", "message": "Design name is required"}),
-                400,
+                {
+                    "status": "success",
+                    "message": f'Design "{design_name}" saved successfully',
+                },
+                200,
             )
+        else:
+            error_message = f"Backend returned error: {response.status_code}"
+            if response.text:
+                try:
+                    error_data = loads_response(response)
+                    if "message" in error_data:
+                        error_message = error_data["message"]
+                except:
+                    error_message = response.text[
+                        :100
+                    ]  # Truncate long error messages
 
-        # Send design name to backend
-        try:
-            response = make_backend_request(
-                "save_design",
-                "POST",
+            logging.error(
+                f"Error saving design to backend: {error_message}")
+            return (
                 {
-                    "prompt": design_name,
+                    "status": "error",
+                    "message": f"Failed to save design: {error_message}",
                 },
+                response.status_code,
             )
 
-            if response.ok:
-                logging.info(f"Design saved to backend: {design_name}")
-                return jsonify(
-                    {
-                        "status": "success",
-                        "message": f'Design "{design_name}" saved successfully',
-                    }
-                )
-            else:
-                error_message = f"Backend returned error: {response.status_code}"
-                if response.text:
-                    try:
-                        error_data = response.json()
-                        if "message" in error_data:
-                            error_message = error_data["message"]
-                    except:
-                        error_message = response.text[
-                            :100
-                        ]  # Truncate long error messages
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        logging.error(f"Error connecting to backend: {str(e)}")
+        return (
+            {
+                "status": "error",
+                "message": f"Failed to connect to backend: {str(e)}",
+            },
+            500,
+        )
 
-                logging.error(
-                    f"Error saving design to backend: {error_message}")
-                return (
-                    jsonify(
-                        {
-                            "status": "error",
-                            "message": f"Failed to save design: {error_message}",
-                        }
-                    ),
-                    response.status_code,
-                )
 
-        except Exception as e:
-            logging.error(f"Error connecting to backend: {str(e)}")
+@app.route("/save_design", methods=["POST"])
+def save_design():
+    try:
+        design_name = request.json.get("name", "")
+        if not design_name:
             return (
-                jsonify(
-                    {
-                        "status": "error",
-                        "message": f"Failed to connect to backend: {str(e)}",
-                    }
-                ),
-                500,
+                jsonify({"status": "error", "message": "Design name is required"}),
+                400,
             )
 
+        body, status = run_idempotent(
+            "save_design",
+            get_session_id(),
+            {"name": design_name},
+            partial(run_save_design, design_name),
+            # Failed saves are not stored, so a retry tries again
+            keep=lambda result: result[1] < 500,
+        )
+        return jsonify(body), status
+
+    except IdempotencyKeyMismatch as e:
+        return (
+            jsonify({"status": "error",
+                     "message": idempotency_mismatch_body(e)["error"]}),
+            422,
+        )
+    except CircuitOpenError as e:
+        logging.warning(f"Backend unavailable, rejecting save: {str(e)}")
+        return backend_unavailable_response(
+            e,
+            {
+                "status": "error",
+                "message": "The design service is temporarily unavailable. Please try again shortly.",
+            },
+        )
     except Exception as e:
         logging.error(f"Error processing save design request: {str(e)}")
         return (
@@ -729,12 +1907,12 @@ def save_design():
 
 @app.route("/api/waitlist", methods=["POST"])
 def submit_waitlist():
-    """Handle waitlist submission by forwarding to backend."""
-    print("Waitlist submission received!")
+    """Handle waitlist submission by queueing it for the backend."""
     try:
 
         data = request.json
-        print(f"Waitlist data: {data}")
+        # Field names only: the values are personal data
+        logging.info(f"Waitlist submission received with fields: {sorted(data or {})}")
         # Validate required fields
         required_fields = ["firstName", "lastName", "email", "consent"]
         for field in required_fields:
@@ -761,8 +1939,37 @@ def submit_waitlist():
                 400,
             )
 
+        # Accept into the local outbox; the worker forwards it to the backend.
+        # A repeated email hits the unique constraint and is acknowledged as-is.
+        try:
+            email = data["email"].strip().lower()
+            entry = WaitlistEntry(
+                first_name=data["firstName"],
+                last_name=data["lastName"],
+                email=email,
+                organization=data.get("organization") or None,
+                consent=True,
+            )
+            if not enqueue_outbox_message(
+                "waitlist", f"waitlist:{email}", data, records=[entry]
+            ):
+                logging.info("Duplicate waitlist submission ignored")
+            return (
+                jsonify(
+                    {
+                        "success": True,
+                        "message": "Thank you for joining our waitlist!",
+                    }
+                ),
+                201,
+            )
+        except Exception as e:
+            logging.warning(
+                f"Outbox unavailable, forwarding waitlist entry directly: {str(e)}")
+            db.session.rollback()
+
         # Forward the data to backend
-        print(f"Sending waitlist data to backend with session")
+        logging.info("Forwarding waitlist submission to backend")
         try:
             response = make_backend_request("waitlist", "POST", data)
 
@@ -780,7 +1987,7 @@ def submit_waitlist():
                 error_message = "Failed to add to waitlist"
                 if response.text:
                     try:
-                        error_data = response.json()
+                        error_data = loads_response(response)
                         if "message" in error_data:
                             error_message = error_data["message"]
                     except:
@@ -809,161 +2016,235 @@ def submit_waitlist():
         )
 
 
+def run_rollback(session_id, message_index, backend_request=make_backend_request,
+                 record_activity=update_session_activity, on_queued=None):
+    """Roll a session back to the model at message_index.
+
+    Returns the response body for the client. Rollbacks that have to go to
+    the backend are subject to admission control (see run_generate).
+    """
+    # Serve the model from the cache; the backend only has to reset its
+    # state. With a single worker that happens in the background and later
+    # calls for this session wait for it to land (see BACKGROUND_BACKEND_SYNC).
+    cached_model = (
+        model_cache.get(session_id, message_index)
+        if isinstance(message_index, int)
+        else None
+    )
+    if cached_model and get_artifact_storage().exists(
+            artifact_name(cached_model["path"])):
+        record_activity()
+        sync_data = {"prompt": str(message_index), "include_model": False}
+        if BACKGROUND_BACKEND_SYNC:
+            schedule_backend_sync(session_id, "rollback", sync_data)
+        else:
+            response = backend_request("rollback", "POST", sync_data)
+            if not response.ok:
+                raise RuntimeError(
+                    f"Backend rollback returned {response.status_code}")
+        model_cache.truncate(session_id, message_index)
+        return {
+            "status": "success",
+            "message": "Rolled back to previous state",
+            "model": cached_model,
+        }
+
+    with heavy_calls.admit(session_id, on_queued):
+        return rollback_from_backend(session_id, message_index, backend_request)
+
+
+def rollback_from_backend(session_id, message_index, backend_request):
+    """Roll back through the backend, which sends the model of that step."""
+    response = backend_request(
+        "rollback", "POST", {"prompt": str(message_index)}
+    )
+    response_data = loads_response(response)
+
+    # Get the response message if available
+    response_message = response_data.get(
+        "response", "Rolled back to previous state"
+    )
+
+    # Create basic response with at least a status and message
+    result = {"status": "success", "message": response_message}
+
+    # Process model data using new format (data + format)
+    model_info = process_model_data(response_data, session_id)
+    cache_model(session_id, message_index, model_info)
+
+    if model_info:
+        # Add model information to the response
+        result["model"] = model_info
+    else:
+        # No model data, but this is not an error - just add a note to the result
+        logging.info(
+            "No model data in rollback response - will reset 3D view")
+        result["reset_viewer"] = True
+
+    return result
+
+
 @app.route("/rollback", methods=["POST"])
 def rollback():
     try:
         message_index = request.json.get("message_index")
-        print(message_index)
-        response = make_backend_request(
-            "rollback", "POST", {"prompt": str(message_index)}
-        )
-        response_data = response.json()
+        logging.debug(f"Rollback requested to message {message_index}")
 
-        # Get the response message if available
-        response_message = response_data.get(
-            "response", "Rolled back to previous state"
+        session_id = get_session_id()
+        return jsonify(run_idempotent(
+            "rollback",
+            session_id,
+            {"message_index": message_index},
+            lambda backend_request: run_rollback(
+                session_id, message_index, backend_request),
+        ))
+    except IdempotencyKeyMismatch as e:
+        return jsonify(idempotency_mismatch_body(e)), 422
+    except AdmissionRejected as e:
+        logging.info(f"Rejecting rollback: {str(e)}")
+        return admission_rejected_response(e)
+    except CircuitOpenError as e:
+        logging.warning(f"Backend unavailable, rejecting rollback: {str(e)}")
+        return backend_unavailable_response(
+            e, {"error": "The design service is temporarily unavailable. Please try again shortly."}
         )
-
-        # Create basic response with at least a status and message
-        result = {"status": "success", "message": response_message}
-
-        # Process model data using new format (data + format)
-        model_info = process_model_data(response_data)
-
-        if model_info:
-            # Add model information to the response
-            result["model"] = model_info
-        else:
-            # No model data, but this is not an error - just add a note to the result
-            logging.info(
-                "No model data in rollback response - will reset 3D view")
-            result["reset_viewer"] = True
-
-        return jsonify(result)
     except Exception as e:
         logging.error(f"Error processing rollback: {str(e)}")
         return jsonify({"error": "Failed to process rollback"}), 500
 
 
-@app.route("/api/sessions", methods=["GET"])
-def get_session_stats():
+def session_stats(current_session_id, tab_id):
     """Return session statistics and current session info."""
+    # Get total active sessions
     try:
-        from datetime import timedelta
+        active_sessions = UserSession.query.filter_by(
+            is_active=True).count()
+    except:
+        db.session.rollback()
+        active_sessions = 0
 
-        from models import UserSession
+    # Get recent sessions (last 24 hours)
+    try:
+        cutoff_time = datetime.utcnow() - timedelta(hours=24)
+        recent_sessions = UserSession.query.filter(
+            UserSession.last_activity >= cutoff_time
+        ).count()
+    except:
+        db.session.rollback()
+        recent_sessions = 0
+
+    return {
+        "current_session_id": current_session_id[:8]
+        + "...",  # Partial ID for privacy
+        "tab_id": tab_id,
+        "session_type": "tab-specific" if tab_id else "browser-wide",
+        "active_sessions": active_sessions,
+        "recent_sessions": recent_sessions,
+        "message": f"Session management working - {'tab-specific' if tab_id else 'browser-wide'} session active",
+    }
 
-        # Get current session details
-        current_session_id = get_session_id()
-        tab_id = request.headers.get("X-Tab-ID")
 
-        # Get total active sessions
-        try:
-            active_sessions = UserSession.query.filter_by(
-                is_active=True).count()
-        except:
-            active_sessions = 0
-
-        # Get recent sessions (last 24 hours)
-        try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=24)
-            recent_sessions = UserSession.query.filter(
-                UserSession.last_activity >= cutoff_time
-            ).count()
-        except:
-            recent_sessions = 0
-
-        return jsonify(
-            {
-                "current_session_id": current_session_id[:8]
-                + "...",  # Partial ID for privacy
-                "tab_id": tab_id,
-                "session_type": "tab-specific" if tab_id else "browser-wide",
-                "active_sessions": active_sessions,
-                "recent_sessions": recent_sessions,
-                "message": f"Session management working - {'tab-specific' if tab_id else 'browser-wide'} session active",
-            }
-        )
+@app.route("/api/sessions", methods=["GET"])
+def get_session_stats():
+    """Return session statistics and current session info."""
+    try:
+        return jsonify(session_stats(
+            get_session_id(), request.headers.get("X-Tab-ID")))
     except Exception as e:
         logging.error(f"Error getting session stats: {str(e)}")
         return jsonify({"error": "Failed to get session statistics"}), 500
 
 
-@app.route("/api/feedback", methods=["POST"])
-def submit_feedback():
-    """Handle feedback submission for AI responses."""
-    try:
-        data = request.json
+def handle_feedback(session_id, data, backend_request=make_backend_request):
+    """Validate a feedback submission and pass it on to the backend.
 
-        # Validate required fields
-        message_index = data.get("message_index")
-        # "thumbs_up" or "thumbs_down"
-        feedback_type = data.get("feedback_type")
+    Returns (response body, status code).
+    """
+    # Validate required fields
+    message_index = data.get("message_index")
+    # "thumbs_up" or "thumbs_down"
+    feedback_type = data.get("feedback_type")
 
-        if message_index is None:
-            return (
-                jsonify(
-                    {"status": "error", "message": "Message index is required"}),
-                400,
-            )
+    if message_index is None:
+        return {"status": "error", "message": "Message index is required"}, 400
 
-        if feedback_type not in ["thumbs_up", "thumbs_down"]:
-            return jsonify({"status": "error", "message": "Invalid feedback type"}), 400
+    if feedback_type not in ["thumbs_up", "thumbs_down"]:
+        return {"status": "error", "message": "Invalid feedback type"}, 400
 
-        # Send feedback to backend
-        try:
-            response = make_backend_request(
-                "feedback",
-                "POST",
-                {
-                    "message_index": message_index,
-                    "feedback_type": feedback_type,
-                    "timestamp": datetime.now().isoformat(),
-                },
-            )
+    feedback_data = {
+        "message_index": message_index,
+        "feedback_type": feedback_type,
+        "timestamp": datetime.now().isoformat(),
+    }
 
-            if response.ok:
-                logging.info(
-                    f"Feedback submitted: {feedback_type} for message {message_index}"
-                )
-                return jsonify(
-                    {"status": "success", "message": "Feedback submitted successfully"}
-                )
-            else:
-                error_message = f"Backend returned error: {response.status_code}"
-                if response.text:
-                    try:
-                        error_data = response.json()
-                        if "message" in error_data:
-                            error_message = error_data["message"]
-                    except:
-                        error_message = response.text[:100]
+    # One key per click: a retry of the same click carries the same
+    # feedback_id and is dropped, while a later click (a toggle, or the same
+    # message index in a new design) is a new submission
+    feedback_id = str(data.get("feedback_id") or "")
+    if not REQUEST_ID_PATTERN.match(feedback_id):
+        feedback_id = uuid.uuid4().hex
 
-                logging.error(
-                    f"Error submitting feedback to backend: {error_message}")
-                return (
-                    jsonify(
-                        {
-                            "status": "error",
-                            "message": f"Failed to submit feedback: {error_message}",
-                        }
-                    ),
-                    response.status_code,
-                )
+    # Accept into the local outbox; the worker forwards it to the backend
+    try:
+        dedupe_key = f"feedback:{session_id}:{feedback_id}"
+        enqueue_outbox_message(
+            "feedback", dedupe_key, feedback_data, session_id=session_id)
+        logging.info(
+            f"Feedback queued: {feedback_type} for message {message_index}"
+        )
+        return {"status": "success", "message": "Feedback submitted successfully"}, 200
+    except Exception as e:
+        logging.warning(
+            f"Outbox unavailable, forwarding feedback directly: {str(e)}")
+        db.session.rollback()
+
+    # Send feedback to backend
+    try:
+        response = backend_request("feedback", "POST", feedback_data)
+
+        if response.ok:
+            logging.info(
+                f"Feedback submitted: {feedback_type} for message {message_index}"
+            )
+            return {"status": "success", "message": "Feedback submitted successfully"}, 200
+        else:
+            error_message = f"Backend returned error: {response.status_code}"
+            if response.text:
+                try:
+                    error_data = loads_response(response)
+                    if "message" in error_data:
+                        error_message = error_data["message"]
+                except:
+                    error_message = response.text[:100]
 
-        except Exception as e:
             logging.error(
-                f"Error connecting to backend for feedback: {str(e)}")
+                f"Error submitting feedback to backend: {error_message}")
             return (
-                jsonify(
-                    {
-                        "status": "error",
-                        "message": f"Failed to connect to backend: {str(e)}",
-                    }
-                ),
-                500,
+                {
+                    "status": "error",
+                    "message": f"Failed to submit feedback: {error_message}",
+                },
+                response.status_code,
             )
 
+    except Exception as e:
+        logging.error(
+            f"Error connecting to backend for feedback: {str(e)}")
+        return (
+            {
+                "status": "error",
+                "message": f"Failed to connect to backend: {str(e)}",
+            },
+            500,
+        )
+
+
+@app.route("/api/feedback", methods=["POST"])
+def submit_feedback():
+    """Handle feedback submission for AI responses."""
+    try:
+        body, status = handle_feedback(get_session_id(), request.json)
+        return jsonify(body), status
     except Exception as e:
         logging.error(f"Error processing feedback request: {str(e)}")
         return (
@@ -975,8 +2256,367 @@ def submit_feedback():
         )
 
 
-if __name__ == "__main__":
-    # Try to create database tables, but don't fail if DB is unavailable
+# Liveness and readiness probes. They skip authentication and never wait
+# on I/O: the database is probed in the background at most every
+# READY_DB_CHECK_SECONDS and disk usage comes from the artifact janitor.
+WORKER_THREADS = int(os.environ.get("WORKER_THREADS", "16"))
+READY_MIN_FREE_DISK_MB = int(os.environ.get("READY_MIN_FREE_DISK_MB", "512"))
+
+
+def check_database():
+    with app.app_context():
+        db.session.execute(text("SELECT 1"))
+
+
+database_check = CachedCheck(
+    "database",
+    check_database,
+    interval_seconds=float(os.environ.get("READY_DB_CHECK_SECONDS", "30")),
+)
+
+
+def worker_status():
+    """Request threads in use and heavy call slots of this worker process."""
+    active = request_gauge.active
+    channels = channel_gauge.active
+    heavy = heavy_calls.stats()
+    return {
+        # Includes the probe itself, so equal to the threads the open
+        # channels leave means every thread is busy
+        "active_requests": active,
+        "open_channels": channels,
+        "threads": WORKER_THREADS,
+        "heavy_calls": heavy,
+        "saturated": active >= WORKER_THREADS - channels or heavy["queued"] > 0,
+    }
+
+
+def disk_status():
+    """Artifact disk usage against the janitor's budget and free space."""
+    stats = get_artifact_janitor().stats()
+    status = {
+        "usage_bytes": stats["usage_bytes"],
+        "budget_bytes": stats["budget_bytes"],
+        "last_sweep": stats["last_run"],
+    }
+    if stats["usage_bytes"] is not None:
+        status["headroom_bytes"] = stats["budget_bytes"] - stats["usage_bytes"]
+    try:
+        status["free_bytes"] = shutil.disk_usage(
+            get_artifact_storage().local_directory() or CAD_MODELS_DIR).free
+    except OSError:
+        status["free_bytes"] = None
+    status["ok"] = (
+        status["free_bytes"] is None
+        or status["free_bytes"] >= READY_MIN_FREE_DISK_MB * 1024 * 1024
+    )
+    return status
+
+
+@app.route("/healthz")
+def healthz():
+    """Liveness: the worker is up and answering requests."""
+    return "ok\n", 200, {"Content-Type": "text/plain", "Cache-Control": "no-store"}
+
+
+@app.route("/readyz")
+def readyz():
+    """Readiness: whether this instance should be sent new work.
+
+    Not ready when all request threads are busy, heavy calls are queueing
+    or the artifact disk is nearly full. Backend circuit state and database
+    reachability are reported but don't fail the check: every instance
+    shares the backend, and the app runs without a database.
+    """
+    workers = worker_status()
+    disk = disk_status()
+    ready = not workers["saturated"] and disk["ok"]
+    breaker = get_backend_breaker()
+    backend = breaker.snapshot()
+    backend["retry_after"] = breaker.retry_after()
+    response = jsonify({
+        "ready": ready,
+        "backend": backend,
+        "database": database_check.status(),
+        "workers": workers,
+        "disk": disk,
+    })
+    response.status_code = 200 if ready else 503
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+# Persistent WebSocket channel for the design chat (one per tab). It is
+# authenticated once when it opens and multiplexes prompts, rollbacks,
+# feedback and trajectory requests; progress, trajectory updates and
+# finished models are pushed as soon as they are ready.
+CHANNEL_MAX_IN_FLIGHT = int(os.environ.get("CHANNEL_MAX_IN_FLIGHT", "8"))
+# Each open channel holds one of the worker's request threads for as long
+# as its tab is open. Channels beyond CHANNEL_MAX_OPEN are refused (those
+# tabs use HTTP) so threads stay free for page loads, HTTP calls and probes.
+CHANNEL_MAX_OPEN = int(os.environ.get(
+    "CHANNEL_MAX_OPEN", str(max(1, WORKER_THREADS // 2))))
+open_channels = threading.BoundedSemaphore(CHANNEL_MAX_OPEN)
+# Minimum time between session activity updates for a channel
+CHANNEL_ACTIVITY_SECONDS = 60.0
+# How long a token from /api/ping can be used to extend a channel's login
+CHANNEL_REAUTH_MAX_AGE = 300
+channel_login_tokens = URLSafeTimedSerializer(app.secret_key, salt="channel-login")
+# How often trajectory updates are pushed while a prompt is running
+CHANNEL_TRAJECTORY_PUSH_SECONDS = 5.0
+
+
+def record_channel_activity(channel):
+    """Update the session record at most once per CHANNEL_ACTIVITY_SECONDS.
+
+    This can't extend the login: the cookie can't be updated over the
+    channel. The client calls /api/ping for that (see handle_channel_reauth).
+    """
+    now = time.monotonic()
+    if now - channel.last_activity >= CHANNEL_ACTIVITY_SECONDS:
+        channel.last_activity = now
+        touch_session_record(channel.session_id)
+
+
+def channel_login_valid(channel, message):
+    """Checked for every channel message: is the channel's login still current?"""
+    return not login_expired(channel.login_time)
+
+
+@app.route("/api/ping", methods=["POST"])
+def ping():
+    """Extend the login, and return a token that extends an open channel's too."""
+    update_session_activity()
+    return jsonify({"token": channel_login_tokens.dumps(session["login_time"])})
+
+
+def push_trajectory_updates(channel, done):
+    """Push trajectory changes to a subscribed client until done is set."""
+    backend_request = partial(detached_backend_request, channel.session_id)
+    last_html = None
+    while not channel.closed.is_set():
+        finished = done.wait(CHANNEL_TRAJECTORY_PUSH_SECONDS)
+        if "trajectory" in channel.subscriptions:
+            html = trajectory_html(channel.session_id, backend_request)
+            if html != last_html:
+                channel.push("trajectory", html=html)
+                last_html = html
+        if finished:
+            return
+
+
+def channel_unavailable(error):
+    return 503, {
+        "error": "The design service is temporarily unavailable. Please try again shortly.",
+        "retry_after": error.retry_after,
+    }
+
+
+def channel_rejected(error):
+    return 429, admission_rejected_body(error)
+
+
+def push_queue_position(channel, request_id, position):
+    channel.push("progress", request_id, stage="queued", position=position)
+
+
+def run_channel_call(channel, scope, message, fields, func):
+    """Run func(backend_request) for a channel message, honouring its idempotency_key."""
+    key = message.get("idempotency_key")
+    if not key:
+        return func(partial(detached_backend_request, channel.session_id))
+    return submit_idempotent(
+        scope, channel.session_id, key, fields, func).result()
+
+
+def handle_channel_prompt(channel, request_id, message):
+    record_channel_activity(channel)
+    channel.push("progress", request_id, stage="processing")
+    done = threading.Event()
+    threading.Thread(
+        target=push_trajectory_updates, args=(channel, done), daemon=True
+    ).start()
+    command = message.get("command", "")
+    message_index = message.get("message_index")
+    try:
+        return 200, run_channel_call(
+            channel,
+            "generate",
+            message,
+            {"command": command, "message_index": message_index},
+            lambda backend_request: run_generate(
+                channel.session_id,
+                command,
+                message_index,
+                backend_request=backend_request,
+                on_model_ready=lambda model: channel.push(
+                    "model_ready", request_id, model=model),
+                on_queued=partial(push_queue_position, channel, request_id),
+            ),
+        )
+    except IdempotencyKeyMismatch as e:
+        return 422, idempotency_mismatch_body(e)
+    except AdmissionRejected as e:
+        logging.info(f"Rejecting command: {str(e)}")
+        return channel_rejected(e)
+    except CircuitOpenError as e:
+        logging.warning(f"Backend unavailable, rejecting command: {str(e)}")
+        return channel_unavailable(e)
+    finally:
+        done.set()
+
+
+def handle_channel_rollback(channel, request_id, message):
+    message_index = message.get("message_index")
+    try:
+        return 200, run_channel_call(
+            channel,
+            "rollback",
+            message,
+            {"message_index": message_index},
+            lambda backend_request: run_rollback(
+                channel.session_id,
+                message_index,
+                backend_request=backend_request,
+                record_activity=lambda: record_channel_activity(channel),
+                on_queued=partial(push_queue_position, channel, request_id),
+            ),
+        )
+    except IdempotencyKeyMismatch as e:
+        return 422, idempotency_mismatch_body(e)
+    except AdmissionRejected as e:
+        logging.info(f"Rejecting rollback: {str(e)}")
+        return channel_rejected(e)
+    except CircuitOpenError as e:
+        logging.warning(f"Backend unavailable, rejecting rollback: {str(e)}")
+        return channel_unavailable(e)
+
+
+def handle_channel_feedback(channel, request_id, message):
+    record_channel_activity(channel)
+    body, status = handle_feedback(
+        channel.session_id,
+        message,
+        backend_request=partial(detached_backend_request, channel.session_id),
+    )
+    return status, body
+
+
+def handle_channel_trajectory(channel, request_id, message):
+    html = trajectory_html(
+        channel.session_id, partial(detached_backend_request, channel.session_id))
+    return 200, {"html": html}
+
+
+def handle_channel_reauth(channel, request_id, message):
+    """Extend the channel's login to the one a fresh /api/ping token carries."""
+    try:
+        login_time = channel_login_tokens.loads(
+            message.get("token"), max_age=CHANNEL_REAUTH_MAX_AGE)
+    except (BadSignature, TypeError):
+        return 401, {"error": "Invalid login token"}
+    if login_expired(login_time):
+        return 401, {"error": "Login expired"}
+    channel.login_time = login_time
+    return 200, {"status": "ok"}
+
+
+def handle_channel_subscribe(channel, request_id, message):
+    topic = message.get("topic")
+    if topic != "trajectory":
+        return 400, {"error": f"Unknown topic: {topic}"}
+    if message.get("enabled", True):
+        channel.subscriptions.add(topic)
+    else:
+        channel.subscriptions.discard(topic)
+    return 200, {"topic": topic, "enabled": topic in channel.subscriptions}
+
+
+CHANNEL_HANDLERS = {
+    "prompt": handle_channel_prompt,
+    "rollback": handle_channel_rollback,
+    "feedback": handle_channel_feedback,
+    "trajectory": handle_channel_trajectory,
+    "subscribe": handle_channel_subscribe,
+    "reauth": handle_channel_reauth,
+}
+
+
+@app.before_request
+def check_channel_origin():
+    """Refuse cross-site upgrades to the design channel.
+
+    The upgrade is authenticated by the session cookie alone, which the
+    browser also sends when another site opens the WebSocket, so its
+    Origin must be this host.
+    """
+    if request.endpoint != "chat_channel":
+        return
+    origin = request.headers.get("Origin")
+    if origin and urlsplit(origin).netloc != request.host:
+        logging.warning(f"Refusing design channel from origin {origin}")
+        return jsonify({"error": "Origin not allowed"}), 403
+
+
+if Sock is not None:
+    # Protocol-level pings keep idle connections open through proxies
+    app.config.setdefault("SOCK_SERVER_OPTIONS", {"ping_interval": 25})
+    sock = Sock(app)
+
+    @sock.route("/ws")
+    def chat_channel(ws):
+        """Design chat channel. Authentication is checked by check_password_protection."""
+        # Browsers can't set headers on WebSocket requests, so the tab ID
+        # comes in the query string. The session must already exist: the
+        # cookie can't be updated once the connection is upgraded.
+        tab_id = request.args.get("tab_id")
+        session_id = session.get(
+            f"tab_session_{tab_id}" if tab_id else "session_id")
+        if not session_id:
+            ws.close(reason=1008, message="Session not initialised")
+            return
+        g.session_id = session_id
+        if not open_channels.acquire(blocking=False):
+            logging.warning(
+                f"Refusing design channel: {CHANNEL_MAX_OPEN} already open")
+            ws.close(reason=1008, message="Too many open channels")
+            return
+
+        channel_gauge.enter()
+        try:
+            channel = DesignChannel(
+                ws,
+                session_id,
+                CHANNEL_HANDLERS,
+                wrap=copy_request_context,
+                max_in_flight=CHANNEL_MAX_IN_FLIGHT,
+                authorize=channel_login_valid,
+            )
+            # The login as of the upgrade; check_password_protection has
+            # made sure it is set and not expired
+            channel.login_time = session["login_time"]
+            logging.info(f"Design channel opened for session {session_id}")
+            channel.push("ready")
+            try:
+                channel.serve()
+            finally:
+                logging.info(f"Design channel closed for session {session_id}")
+        finally:
+            channel_gauge.exit()
+            open_channels.release()
+
+
+# Startup. create_app() does the one-off work (tables, optional warm-up)
+# that used to wait for the first request or for `python app.py`. Under
+# gunicorn --preload it runs once in the master and every worker forks
+# from the result; reinit_after_fork() then gives each worker its own
+# threads, connections and pools.
+WARM_UP = os.environ.get("WARM_UP", "false").lower() == "true"
+app_created = False
+
+
+def init_database():
+    """Create the database tables, continuing without them if the DB is unavailable."""
     try:
         with app.app_context():
             db.create_all()
@@ -985,5 +2625,80 @@ if __name__ == "__main__":
         logging.warning(
             f"Database not available, continuing without it: {str(e)}")
 
+
+def warm_up_app():
+    """Do the work of the first requests ahead of time."""
+    started = time.monotonic()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    mimetypes.init()
+    try:
+        prime_app_config()
+    except Exception as e:
+        logging.warning(f"Could not prime app config: {str(e)}")
+    logging.info(f"Warm-up finished in {time.monotonic() - started:.2f}s")
+
+
+def create_app(warm_up=None):
+    """Finish initialising the app and return it.
+
+    Importing app only defines the routes; this configures logging and the
+    database, builds the subsystems (storage client, pools, janitor,
+    breaker) and installs the fork hooks. warm_up defaults to the WARM_UP
+    setting. Only the first call does any work, so importing wsgi/main more
+    than once is harmless.
+    """
+    global app_created
+    if not app_created:
+        app_created = True
+        setup_logging()
+        logging.info(f"Using {CODEC} for JSON encoding")
+        configure_database()
+        init_database()
+        # Built here rather than on first use so workers forked from a
+        # preloaded master share them
+        get_artifact_janitor()
+        get_backend_breaker()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(
+                before=freeze_before_fork, after_in_child=reinit_after_fork)
+        if WARM_UP if warm_up is None else warm_up:
+            warm_up_app()
+    return app
+
+
+def freeze_before_fork():
+    """Move everything allocated so far out of the collector's reach, so
+    garbage collection in a worker doesn't copy the shared pages."""
+    gc.collect()
+    gc.freeze()
+
+
+def reinit_after_fork():
+    """Replace state a forked worker must not share with its parent."""
+    global background_backend_calls, thumbnail_pool
+    global backend_http
+    # The parent's logging thread did not survive the fork
+    setup_logging()
+    backend_http = None
+    # Rebuilt on first use; the parent's pool threads did not survive
+    background_backend_calls = None
+    thumbnail_pool = None
+    pending_backend_syncs.clear()
+    thumbnails_in_flight.clear()
+    template_prewarm_in_flight.clear()
+    try:
+        with app.app_context():
+            for engine in db.engines.values():
+                # Leave the parent's connections open for the parent
+                engine.dispose(close=False)
+    except Exception as e:
+        logging.warning(f"Could not reset database pool after fork: {str(e)}")
+    logging.info(f"Worker {os.getpid()} initialised after fork")
+
+
+if __name__ == "__main__":
+    create_app()
+
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=True)
@@ -0,0 +1,180 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+Artifact = namedtuple("Artifact", "path name size last_used modified session")
+
+
+class ArtifactJanitor:
+    """Keep generated artifact directories within a disk budget.
+
+    A background sweep evicts the least recently served files, first from
+    sessions over their per-session quota and then globally until the total
+    size fits the budget. "Recently served" is the file's access time, which
+    ``touch`` sets explicitly when a file is served, so it works across
+    worker processes and on noatime mounts.
+    """
+
+    def __init__(self, directories, max_total_bytes, max_session_bytes=None,
+                 interval_seconds=300.0, grace_seconds=120.0,
+                 session_of=None, is_protected=None, touch_interval=60.0):
+        # (directory, filename prefix) pairs; only matching files are managed
+        self.directories = directories
+        self.max_total_bytes = max_total_bytes
+        self.max_session_bytes = max_session_bytes
+        self.interval_seconds = interval_seconds
+        # Files younger than this are never evicted (they are about to be served)
+        self.grace_seconds = grace_seconds
+        self.session_of = session_of or (lambda name: None)
+        self.is_protected = is_protected or (lambda path: False)
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            "usage_bytes": None,
+            "files": None,
+            "budget_bytes": max_total_bytes,
+            "reclaimed_bytes_total": 0,
+            "evicted_files_total": 0,
+            "last_reclaimed_bytes": 0,
+            "last_run": None,
+        }
+
+    def touch(self, path):
+        """Record that a file was just served."""
+        try:
+            st = os.stat(path)
+            now = time.time()
+            if now - st.st_atime >= self.touch_interval:
+                os.utime(path, (now, st.st_mtime))
+        except OSError:
+            pass
+
+    def start(self):
+        """Start the sweep thread if it isn't running in this process."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="artifact-janitor", daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.warning(f"Artifact janitor error: {str(e)}")
+            time.sleep(self.interval_seconds)
+
+    def scan(self):
+        artifacts = []
+        for directory, prefix in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if not entry.name.startswith(prefix) or entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                artifacts.append(Artifact(
+                    path=entry.path,
+                    name=entry.name,
+                    size=st.st_size,
+                    last_used=max(st.st_atime, st.st_mtime),
+                    modified=st.st_mtime,
+                    session=self.session_of(entry.name),
+                ))
+        return artifacts
+
+    def select_evictions(self, artifacts, now=None):
+        """Return the artifacts to delete to satisfy the quotas and budget."""
+        now = time.time() if now is None else now
+
+        def evictable(artifact):
+            return (
+                now - artifact.modified >= self.grace_seconds
+                and not self.is_protected(artifact.path)
+            )
+
+        evict = {}
+        if self.max_session_bytes is not None:
+            by_session = defaultdict(list)
+            for artifact in artifacts:
+                if artifact.session:
+                    by_session[artifact.session].append(artifact)
+            for items in by_session.values():
+                total = sum(artifact.size for artifact in items)
+                for artifact in sorted(items, key=lambda a: a.last_used):
+                    if total <= self.max_session_bytes:
+                        break
+                    if evictable(artifact):
+                        evict[artifact.path] = artifact
+                        total -= artifact.size
+
+        remaining = sum(artifact.size for artifact in artifacts) - sum(
+            artifact.size for artifact in evict.values())
+        for artifact in sorted(artifacts, key=lambda a: a.last_used):
+            if remaining <= self.max_total_bytes:
+                break
+            if artifact.path not in evict and evictable(artifact):
+                evict[artifact.path] = artifact
+                remaining -= artifact.size
+        return list(evict.values())
+
+    def run_once(self):
+        """Sweep once. Returns a report with reclaimed bytes and current usage."""
+        artifacts = self.scan()
+        usage = sum(artifact.size for artifact in artifacts)
+        reclaimed = 0
+        evicted = 0
+        for artifact in self.select_evictions(artifacts):
+            try:
+                os.remove(artifact.path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logging.warning(
+                    f"Could not evict artifact {artifact.path}: {str(e)}")
+                continue
+            reclaimed += artifact.size
+            evicted += 1
+
+        report = {
+            "usage_bytes": usage - reclaimed,
+            "files": len(artifacts) - evicted,
+            "reclaimed_bytes": reclaimed,
+            "evicted_files": evicted,
+        }
+        with self._lock:
+            self._stats.update(
+                usage_bytes=report["usage_bytes"],
+                files=report["files"],
+                last_reclaimed_bytes=reclaimed,
+                last_run=time.time(),
+            )
+            self._stats["reclaimed_bytes_total"] += reclaimed
+            self._stats["evicted_files_total"] += evicted
+        if evicted:
+            logging.info(
+                f"Artifact janitor evicted {evicted} files, reclaimed "
+                f"{reclaimed} bytes; usage now {report['usage_bytes']} of "
+                f"{self.max_total_bytes} bytes"
+            )
+        return report
@@ -0,0 +1,235 @@
+"""Storage backends for generated model artifacts.
+
+Artifacts are addressed by a flat name (e.g. ``model-1a2b3c4d-<digest>.stl``).
+``LocalArtifactStorage`` keeps them in a directory on disk, which only works
+for a single web replica. ``S3ArtifactStorage`` keeps them in an
+S3-compatible bucket shared by every replica; point ``endpoint_url`` at a
+local stand-in such as MinIO for development and testing. Wrap a remote
+store in ``CachedArtifactStorage`` to keep a local read-through copy.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+
+
+class ArtifactStorage(ABC):
+    """Interface shared by the artifact storage backends."""
+
+    @abstractmethod
+    def save(self, name, data):
+        """Store an artifact, replacing any previous one with that name."""
+
+    @abstractmethod
+    def read(self, name):
+        """Return the artifact bytes; raises FileNotFoundError if missing."""
+
+    @abstractmethod
+    def exists(self, name):
+        """Return whether the artifact is stored."""
+
+    @abstractmethod
+    def size(self, name):
+        """Return the artifact size in bytes; raises FileNotFoundError if missing."""
+
+    @abstractmethod
+    def delete(self, name):
+        """Delete an artifact; deleting a missing artifact is not an error."""
+
+    def local_path(self, name):
+        """Return a local file path for the artifact, or None if there isn't one."""
+        return None
+
+    def local_directory(self):
+        """Return the local directory holding artifacts (or copies), if any."""
+        return None
+
+
+class LocalArtifactStorage(ArtifactStorage):
+    """Artifacts stored as files in a local directory."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name):
+        if os.path.basename(name) != name or name in ("", ".", ".."):
+            raise ValueError(f"Invalid artifact name: {name!r}")
+        return os.path.join(self.root, name)
+
+    def save(self, name, data):
+        path = self._path(name)
+        # Write to a temporary file first so readers never see partial files
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def read(self, name):
+        with open(self._path(name), "rb") as f:
+            return f.read()
+
+    def exists(self, name):
+        return os.path.isfile(self._path(name))
+
+    def size(self, name):
+        return os.path.getsize(self._path(name))
+
+    def delete(self, name):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, name):
+        path = self._path(name)
+        return path if os.path.isfile(path) else None
+
+    def local_directory(self):
+        return self.root
+
+
+class S3ArtifactStorage(ArtifactStorage):
+    """Artifacts stored in an S3-compatible bucket (requires boto3)."""
+
+    def __init__(self, bucket, prefix="", client=None, endpoint_url=None,
+                 region_name=None):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError(
+                    "S3 artifact storage requires boto3 (pip install boto3)"
+                ) from e
+            client = boto3.client(
+                "s3", endpoint_url=endpoint_url, region_name=region_name)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+
+    def _key(self, name):
+        return self.prefix + name
+
+    @staticmethod
+    def _is_missing(error):
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def save(self, name, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(name), Body=data)
+
+    def read(self, name):
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self._key(name))
+        except Exception as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(name) from e
+            raise
+        return obj["Body"].read()
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+        except Exception as e:
+            if self._is_missing(e):
+                return None
+            raise
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def size(self, name):
+        head = self._head(name)
+        if head is None:
+            raise FileNotFoundError(name)
+        return head["ContentLength"]
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+
+
+class CachedArtifactStorage(ArtifactStorage):
+    """Read-through local disk cache in front of another storage backend.
+
+    Writes go to both the backend and the cache, reads are served from the
+    cache and fetched from the backend on a miss.
+    """
+
+    def __init__(self, backend, cache_dir):
+        self.backend = backend
+        self.cache = LocalArtifactStorage(cache_dir)
+        self._lock = threading.Lock()
+
+    def save(self, name, data):
+        self.backend.save(name, data)
+        self.cache.save(name, data)
+
+    def _fill(self, name):
+        with self._lock:
+            if not self.cache.exists(name):
+                self.cache.save(name, self.backend.read(name))
+
+    def read(self, name):
+        self._fill(name)
+        return self.cache.read(name)
+
+    def exists(self, name):
+        return self.cache.exists(name) or self.backend.exists(name)
+
+    def size(self, name):
+        if self.cache.exists(name):
+            return self.cache.size(name)
+        return self.backend.size(name)
+
+    def delete(self, name):
+        self.backend.delete(name)
+        self.cache.delete(name)
+
+    def evict_local(self, name):
+        """Drop the local copy only; the artifact stays in the backend."""
+        self.cache.delete(name)
+
+    def local_path(self, name):
+        try:
+            self._fill(name)
+        except FileNotFoundError:
+            return None
+        return self.cache.local_path(name)
+
+    def local_directory(self):
+        return self.cache.root
+
+
+def storage_from_env(local_root, environ=os.environ):
+    """Build the artifact storage configured by environment variables.
+
+    ARTIFACT_STORAGE selects ``local`` (default) or ``s3``. For S3 set
+    ARTIFACT_S3_BUCKET and optionally ARTIFACT_S3_PREFIX,
+    ARTIFACT_S3_ENDPOINT_URL (e.g. a local MinIO) and ARTIFACT_S3_REGION.
+    ARTIFACT_CACHE_DIR adds a local read-through cache (defaults to
+    local_root for S3; set it to an empty string to disable).
+    """
+    kind = environ.get("ARTIFACT_STORAGE", "local").lower()
+    if kind == "local":
+        return LocalArtifactStorage(local_root)
+    if kind != "s3":
+        raise ValueError(f"Unknown ARTIFACT_STORAGE: {kind}")
+
+    storage = S3ArtifactStorage(
+        environ["ARTIFACT_S3_BUCKET"],
+        prefix=environ.get("ARTIFACT_S3_PREFIX", ""),
+        endpoint_url=environ.get("ARTIFACT_S3_ENDPOINT_URL") or None,
+        region_name=environ.get("ARTIFACT_S3_REGION") or None,
+    )
+    cache_dir = environ.get("ARTIFACT_CACHE_DIR", local_root)
+    if cache_dir:
+        logging.info(f"Using S3 artifact storage with local cache in {cache_dir}")
+        return CachedArtifactStorage(storage, cache_dir)
+    return storage
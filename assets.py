@@ -0,0 +1,177 @@
+"""Build fingerprinted, minified and precompressed static assets.
+
+``build_assets`` writes content-hashed copies of the JS/CSS sources (and the
+page bundles below) to ``static/dist`` together with ``.gz`` and, when the
+``brotli`` package is installed, ``.br`` siblings, and records the mapping
+in ``static/dist/manifest.json``. Templates resolve asset URLs through the
+manifest and fall back to the unversioned files when no build exists (local
+development).
+
+Minification uses ``rjsmin``/``rcssmin`` when installed. Without them CSS
+gets a conservative whitespace/comment pass and JS is copied unchanged.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz siblings are written without it
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Source files (relative to the static directory) that get fingerprinted
+ASSET_PATTERNS = [
+    (os.path.join("js"), ".js"),
+    (os.path.join("js", "libs"), ".js"),
+    (os.path.join("css"), ".css"),
+]
+
+# Bundles concatenate scripts that are always loaded together, in order
+BUNDLES = {
+    "js/app.bundle.js": [
+        "js/fetch_timeout.js",
+        "js/integrated_viewer.js",
+        "js/design_channel.js",
+        "js/main.js",
+        "js/trajectory.js",
+        "js/save_design.js",
+        "js/color_selector.js",
+        "js/waitlist.js",
+        "js/step_preview.js",
+        "js/download_handler.js",
+        "js/mobile_input.js",
+    ],
+}
+
+# Don't bother compressing files smaller than this
+MIN_COMPRESS_BYTES = 512
+
+
+def minify_css(source):
+    """Strip comments and redundant whitespace from a stylesheet."""
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    source = re.sub(r"/\*.*?\*/", "", source, flags=re.S)
+    source = re.sub(r"\s+", " ", source)
+    source = re.sub(r"\s*([{};,])\s*", r"\1", source)
+    return source.replace(";}", "}").strip()
+
+
+def minify_js(source):
+    """Minify a script when rjsmin is available; otherwise return it unchanged."""
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    return source
+
+
+def minify(logical_path, source):
+    if logical_path.endswith(".min.js"):
+        # Already minified upstream
+        return source
+    if logical_path.endswith(".css"):
+        return minify_css(source)
+    return minify_js(source)
+
+
+def fingerprint_path(logical_path, content):
+    """Return dist/<dir>/<name>.<hash>.<ext> for the given content."""
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    base, ext = os.path.splitext(logical_path)
+    return f"{DIST_DIR}/{base}.{digest}{ext}"
+
+
+def write_compressed(path, content):
+    """Write path plus precompressed .gz/.br siblings."""
+    with open(path, "wb") as f:
+        f.write(content)
+    if len(content) < MIN_COMPRESS_BYTES:
+        return
+    # mtime=0 keeps the .gz output reproducible between builds
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(content, quality=11))
+
+
+def source_files(static_dir):
+    """Yield logical paths (with forward slashes) of the files to fingerprint."""
+    for directory, extension in ASSET_PATTERNS:
+        full_dir = os.path.join(static_dir, directory)
+        if not os.path.isdir(full_dir):
+            continue
+        for name in sorted(os.listdir(full_dir)):
+            if name.endswith(extension):
+                yield f"{directory.replace(os.sep, '/')}/{name}"
+
+
+def build_assets(static_dir="static"):
+    """Build static/dist and its manifest. Returns the manifest dict."""
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+
+    minified = {}
+    for logical_path in source_files(static_dir):
+        with open(os.path.join(static_dir, logical_path), encoding="utf-8") as f:
+            minified[logical_path] = minify(logical_path, f.read())
+
+    for bundle, members in BUNDLES.items():
+        # A newline plus ';' keeps scripts without trailing semicolons apart
+        minified[bundle] = "\n;".join(minified[member] for member in members)
+
+    manifest = {}
+    for logical_path, text in minified.items():
+        content = text.encode("utf-8")
+        dist_path = fingerprint_path(logical_path, content)
+        output_path = os.path.join(static_dir, dist_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        write_compressed(output_path, content)
+        manifest[logical_path] = dist_path
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_dir="static"):
+    """Load the asset manifest, or return an empty one if no build exists."""
+    path = os.path.join(static_dir, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not read asset manifest {path}: {str(e)}")
+        return {}
+
+
+def asset_urls(manifest, logical_path, static_url="/static"):
+    """Return the URLs to load for a logical asset path.
+
+    A built asset resolves to its single fingerprinted file. Without a
+    build, a bundle expands to its unversioned member files.
+    """
+    if logical_path in manifest:
+        return [f"{static_url}/{manifest[logical_path]}"]
+    members = BUNDLES.get(logical_path, [logical_path])
+    return [f"{static_url}/{member}" for member in members]
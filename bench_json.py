@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Microbenchmark for the JSON codecs on realistic payloads.
+
+Compares stdlib json with orjson (when installed) on backend model
+responses (hex encoded STL data) and trajectories, the largest payloads
+the app parses and serializes. Run: python bench_json.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import struct
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def stl_bytes(triangles):
+    """Binary STL with the given number of (random) triangles."""
+    header = b"\0" * 80 + struct.pack("<I", triangles)
+    return header + os.urandom(50 * triangles)
+
+
+def backend_model_response(triangles):
+    return {
+        "response": "I've added four legs to the table. " * 10,
+        "data": stl_bytes(triangles).hex(),
+        "format": "stl",
+    }
+
+
+def trajectory(messages):
+    items = []
+    for i in range(messages):
+        items.append({
+            "type": "user" if i % 2 == 0 else "system",
+            "content": f"Step {i}: " + "result = box(10, 20, 5).fillet(0.5)\n" * 40,
+            "timestamp": "2025-06-01T12:00:00.000000",
+        })
+    return {"messages": items}
+
+
+PAYLOADS = [
+    ("model response, 20k triangles (2 MB hex)", backend_model_response(20_000)),
+    ("model response, 160k triangles (16 MB hex)", backend_model_response(160_000)),
+    ("trajectory, 50 messages", trajectory(50)),
+    ("trajectory, 400 messages", trajectory(400)),
+]
+
+
+def codecs():
+    result = [(
+        "json",
+        lambda obj: json.dumps(obj, separators=(",", ":")).encode("utf-8"),
+        json.loads,
+    )]
+    if orjson is not None:
+        result.append(("orjson", orjson.dumps, orjson.loads))
+    return result
+
+
+def measure(func, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(arg)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson is not installed; only stdlib json is measured\n")
+
+    print(f"{'payload':<44} {'codec':<7} {'size':>9} {'parse ms':>9} {'dump ms':>9}")
+    for name, payload in PAYLOADS:
+        encoded = json.dumps(payload).encode("utf-8")
+        for codec, dumps, loads in codecs():
+            parse_ms = measure(loads, encoded, args.repeat)
+            dump_ms = measure(dumps, payload, args.repeat)
+            size = f"{len(encoded) / 1e6:.1f} MB"
+            print(f"{name:<44} {codec:<7} {size:>9} {parse_ms:>9.2f} {dump_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Benchmark cold start to first request, with and without warm-up.
+
+Each run starts a fresh interpreter that imports the app, calls
+create_app() and then serves the page (and, with --config, the
+/api/config call) twice through the test client, so the first request
+pays for whatever startup left undone. With --gunicorn it also times a
+real gunicorn server, with and without --preload, from launch until the
+first page is answered. Run: python bench_startup.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.create_app(warm_up={warm_up})
+created = time.perf_counter()
+client = app.test_client()
+with client.session_transaction() as session:
+    session["authenticated"] = True
+timings = {{"import": imported - started, "create_app": created - imported}}
+for label in ("first", "second"):
+    begin = time.perf_counter()
+    for path in {paths!r}:
+        client.get(path)
+    timings[label] = time.perf_counter() - begin
+timings["total"] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+
+def run_in_process(warm_up, paths):
+    env = dict(os.environ, LOG_LEVEL="WARNING")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD.format(warm_up=warm_up, paths=paths)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_gunicorn(preload, workers, warm_up):
+    port = free_port()
+    command = [
+        sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers), "--worker-class", "gthread",
+        "--threads", "4", "main:app",
+    ]
+    if preload:
+        command.insert(-1, "--preload")
+    env = dict(os.environ, LOG_LEVEL="WARNING",
+               WARM_UP="true" if warm_up else "false")
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5)
+                break
+            except urllib.error.HTTPError:
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError("gunicorn exited during startup")
+                time.sleep(0.02)
+        return time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def median_ms(values):
+    return statistics.median(values) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--config", action="store_true",
+                        help="also request /api/config (needs a backend)")
+    parser.add_argument("--gunicorn", action="store_true",
+                        help="also time a gunicorn server until its first response")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    paths = ["/"] + (["/api/config"] if args.config else [])
+    columns = ("import", "create_app", "first", "second", "total")
+    print(f"{'mode':<12} " + " ".join(f"{c + ' ms':>14}" for c in columns))
+    for warm_up in (False, True):
+        runs = [run_in_process(warm_up, paths) for _ in range(args.repeat)]
+        mode = "warm-up" if warm_up else "cold"
+        print(f"{mode:<12} " + " ".join(
+            f"{median_ms([run[c] for run in runs]):>14.1f}" for c in columns))
+
+    if args.gunicorn:
+        print(f"\n{'gunicorn':<24} {'first response ms':>18}")
+        for preload in (False, True):
+            for warm_up in (False, True):
+                timings = [run_gunicorn(preload, args.workers, warm_up)
+                           for _ in range(args.repeat)]
+                mode = ("preload" if preload else "no preload") + (
+                    ", warm-up" if warm_up else "")
+                print(f"{mode:<24} {median_ms(timings):>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""Build fingerprinted, minified and precompressed static assets into static/dist."""
+
+from assets import build_assets
+
+if __name__ == "__main__":
+    manifest = build_assets("static")
+    for logical_path, dist_path in sorted(manifest.items()):
+        print(f"{logical_path} -> {dist_path}")
+    print(f"Built {len(manifest)} assets")
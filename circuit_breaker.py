@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import deque
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit '{name}' is open")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Track backend call outcomes and fail fast while the backend is unhealthy.
+
+    The breaker keeps a rolling window of recent calls. When the failure rate
+    or the slow-call rate in that window crosses its threshold the circuit
+    opens and calls are rejected immediately. After ``open_seconds`` a limited
+    number of probe calls are let through (half-open); a successful probe
+    closes the circuit again, a failed one re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name,
+        failure_rate_threshold=0.5,
+        slow_call_rate_threshold=0.8,
+        window_size=20,
+        minimum_calls=5,
+        open_seconds=30.0,
+        half_open_max_calls=1,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Each entry is a (failed, slow) tuple for one completed call
+        self._calls = deque(maxlen=window_size)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed (0 when not open)."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0
+            remaining = self.open_seconds - (self._clock() - self._opened_at)
+            return max(0, int(remaining + 0.999))
+
+    def allow_request(self):
+        """Return True if a call may proceed, reserving a probe slot if half-open."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN:
+                if self._half_open_in_flight < self.half_open_max_calls:
+                    self._half_open_in_flight += 1
+                    return True
+            return False
+
+    def record_success(self, duration=None, slow_call_seconds=None):
+        """Record a completed call; calls slower than the threshold count as slow."""
+        slow = (
+            duration is not None
+            and slow_call_seconds is not None
+            and duration >= slow_call_seconds
+        )
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if slow:
+                    self._trip()
+                else:
+                    self._reset()
+                return
+            self._calls.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self):
+        """Record a failed call (connection error, timeout or 5xx)."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                self._trip()
+                return
+            self._calls.append((True, False))
+            self._evaluate()
+
+    def release(self):
+        """Forget a call whose outcome says nothing about the backend (e.g.
+        cancelled by us), giving back its probe slot if half-open."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def snapshot(self):
+        """Return a dict describing the current breaker state."""
+        with self._lock:
+            self._maybe_half_open()
+            total = len(self._calls)
+            failures = sum(1 for failed, _ in self._calls if failed)
+            slow = sum(1 for _, is_slow in self._calls if is_slow)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "calls": total,
+                "failure_rate": failures / total if total else 0.0,
+                "slow_call_rate": slow / total if total else 0.0,
+            }
+
+    def _maybe_half_open(self):
+        if (
+            self._state == self.OPEN
+            and self._clock() - self._opened_at >= self.open_seconds
+        ):
+            self._state = self.HALF_OPEN
+            self._half_open_in_flight = 0
+
+    def _evaluate(self):
+        total = len(self._calls)
+        if self._state != self.CLOSED or total < self.minimum_calls:
+            return
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        if (
+            failures / total >= self.failure_rate_threshold
+            or slow / total >= self.slow_call_rate_threshold
+        ):
+            self._trip()
+
+    def _trip(self):
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._half_open_in_flight = 0
+        self._calls.clear()
+
+    def _reset(self):
+        self._state = self.CLOSED
+        self._half_open_in_flight = 0
+        self._calls.clear()
@@ -0,0 +1,137 @@
+import logging
+import socket
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away while we were waiting on the backend."""
+
+    def __init__(self):
+        super().__init__("Client disconnected before the backend responded")
+
+
+def client_socket(environ):
+    """Return the client connection socket exposed by the WSGI server, if any."""
+    return environ.get("gunicorn.socket") or environ.get("werkzeug.socket")
+
+
+def client_disconnected(sock):
+    """Return True if the peer has closed the connection.
+
+    Peeks at the socket without consuming data: an orderly shutdown reads as
+    an empty buffer, while a live idle connection would block.
+    """
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except (BlockingIOError, InterruptedError):
+        return False
+    except (ConnectionResetError, BrokenPipeError):
+        return True
+    except (OSError, ValueError):
+        # TLS sockets don't support peeking; assume the client is still there
+        return False
+
+
+class CancellableSession(requests.Session):
+    """HTTP session for one long backend call that can be cancelled.
+
+    It has its own connection (never shared with the pooled session), so
+    cancel() can shut that connection down from another thread: the call
+    fails right away and the backend sees the connection close instead of
+    working on until its read timeout.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cancelled = False
+        self._connections = []
+        self._lock = threading.Lock()
+        # Never carry cookies between calls
+        self.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        manager = adapter.poolmanager
+        manager.pool_classes_by_scheme = {
+            scheme: self._tracking_pool(pool_class)
+            for scheme, pool_class in manager.pool_classes_by_scheme.items()
+        }
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def _tracking_pool(self, pool_class):
+        """Subclass pool_class so every connection it opens is recorded."""
+        session = self
+
+        class TrackedConnection(pool_class.ConnectionCls):
+            def connect(self):
+                super().connect()
+                with session._lock:
+                    session._connections.append(self)
+                    cancelled = session.cancelled
+                if cancelled:
+                    session._shutdown(self)
+
+        return type(pool_class.__name__, (pool_class,),
+                    {"ConnectionCls": TrackedConnection})
+
+    def cancel(self):
+        """Shut down the session's connections, failing the call in flight."""
+        with self._lock:
+            self.cancelled = True
+            connections = list(self._connections)
+        for connection in connections:
+            self._shutdown(connection)
+
+    @staticmethod
+    def _shutdown(connection):
+        sock = getattr(connection, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def call_unless_disconnected(func, environ, cancel=None, poll_interval=0.5):
+    """Run func in a helper thread and cancel it if the client disconnects.
+
+    The result (or exception) of func is returned (or re-raised) when it
+    finishes. If the client disconnects first, cancel() is called (it must
+    make func return promptly, e.g. CancellableSession.cancel) and
+    ClientDisconnected is raised once func has returned, so whatever the
+    caller holds for the call (an admission slot) is held until it ends.
+    Without cancel, func must hold nothing (e.g. wait on a Future that runs
+    on regardless) and is left to finish on its own.
+    """
+    sock = client_socket(environ)
+    if sock is None:
+        return func()
+
+    outcome = {}
+    done = threading.Event()
+
+    def run():
+        try:
+            outcome["result"] = func()
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    while not done.wait(poll_interval):
+        if client_disconnected(sock):
+            if cancel is None:
+                logging.info("Client disconnected, no longer waiting")
+                raise ClientDisconnected()
+            logging.info("Client disconnected, cancelling backend call")
+            cancel()
+            done.wait()
+            raise ClientDisconnected()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
@@ -0,0 +1,148 @@
+"""On-the-fly compression of dynamic responses.
+
+Used when no reverse proxy compresses for us (Heroku, ``run_prod.py``).
+Buffered responses are compressed in one go once they pass a size
+threshold; streamed responses (``send_file``, generators) are compressed
+chunk by chunk and flushed after every chunk so clients still see data as
+soon as it is produced.
+"""
+
+import zlib
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only without it
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+}
+# STL/STEP artifacts are left alone: they are multi-MB, content-addressed
+# downloads the browser caches, so compressing them on every request would
+# spend worker CPU on each download.
+
+GZIP_LEVEL = 6
+# Brotli's high qualities are too slow for per-request compression
+BROTLI_QUALITY = 4
+
+
+def available_encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encodings):
+    """Pick the best supported encoding from a werkzeug Accept header, or None."""
+    return accept_encodings.best_match(available_encodings())
+
+
+class _Compressor:
+    """Streaming compressor producing either a gzip or a brotli stream."""
+
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._zlib = None
+        else:
+            self._brotli = None
+            # wbits=31 selects the gzip container
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        if self._brotli is not None:
+            return self._brotli.process(data)
+        return self._zlib.compress(data)
+
+    def flush(self):
+        """Emit everything buffered so far without ending the stream."""
+        if self._brotli is not None:
+            return self._brotli.flush()
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def _compress_stream(chunks, encoding):
+    compressor = _Compressor(encoding)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush()
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def _add_vary(response):
+    vary = response.headers.get("Vary", "")
+    values = [value.strip() for value in vary.split(",") if value.strip()]
+    if "accept-encoding" not in {value.lower() for value in values}:
+        values.append("Accept-Encoding")
+    response.headers["Vary"] = ", ".join(values)
+
+
+def _weaken_etag(response):
+    """Compressed bytes differ from the original, so a strong entity tag
+    no longer applies; the weak form still matches If-None-Match (which
+    uses weak comparison) against the original tag."""
+    etag = response.headers.get("ETag")
+    if etag and etag.startswith('"'):
+        response.headers["ETag"] = f"W/{etag}"
+
+
+def compress_response(response, accept_encodings, method="GET", min_size=500):
+    """Compress a Flask response in place if the client and content allow it."""
+    if (
+        response.status_code == 304
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and choose_encoding(accept_encodings) is not None
+    ):
+        # Carry the same entity tag as the compressed response it validates
+        _weaken_etag(response)
+        return response
+    if (
+        method == "HEAD"
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    # Streamed responses of unknown length are always worth compressing
+    if response.content_length is not None and response.content_length < min_size:
+        return response
+    streamed = response.is_streamed or response.direct_passthrough
+
+    # The representation depends on Accept-Encoding from here on
+    _add_vary(response)
+
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    if streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.direct_passthrough = False
+        response.headers.pop("Content-Length", None)
+    else:
+        compressor = _Compressor(encoding)
+        response.set_data(
+            compressor.compress(response.get_data()) + compressor.finish())
+
+    response.headers["Content-Encoding"] = encoding
+    _weaken_etag(response)
+    return response
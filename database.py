@@ -0,0 +1,5 @@
+from flask_sqlalchemy import SQLAlchemy
+
+# Unbound so models.py can import it without importing the app;
+# app.py binds it with db.init_app(app)
+db = SQLAlchemy()
@@ -182,7 +182,8 @@ docker run -d \
     --network morfis-network \
     -p 5000:5000 \
     -e BACKEND_URL=https://morfis.ngrok.app \
-    $DOCKER_IMAGE_NAME gunicorn --bind 0.0.0.0:5000 --timeout 420 --workers 4 main:app
+    -e WEB_CONCURRENCY=4 \
+    $DOCKER_IMAGE_NAME gunicorn --bind 0.0.0.0:5000 --timeout 420 --preload --worker-class gthread --threads 16 main:app
 
 echo "🌐 Setting up Nginx reverse proxy..."
 
@@ -226,6 +227,22 @@ http {
             proxy_read_timeout          360s;
         }
         
+        # Design chat WebSocket channel (see chat_channel in app.py)
+        location /ws {
+            proxy_pass http://morfis-frontend:5000;
+            proxy_http_version 1.1;
+            proxy_set_header Upgrade \$http_upgrade;
+            proxy_set_header Connection "upgrade";
+            proxy_set_header Host \$host;
+            proxy_set_header X-Real-IP \$remote_addr;
+            proxy_set_header X-Forwarded-For \$proxy_add_x_forwarded_for;
+            proxy_set_header X-Forwarded-Proto \$scheme;
+
+            # The app pings every 25s; idle connections are closed after this
+            proxy_read_timeout 3600s;
+            proxy_send_timeout 3600s;
+        }
+
         # Direct backend access (for debugging)
         location /backend/ {
             proxy_pass https://morfis.ngrok.app/;
@@ -240,11 +257,18 @@ http {
             proxy_read_timeout          360s;
         }
         
-        # Static files optimization
+        # Fingerprinted bundles: the URL changes whenever the content does
+        location /static/dist/ {
+            proxy_pass http://morfis-frontend:5000/static/dist/;
+            expires 1y;
+            add_header Cache-Control "public, immutable";
+        }
+
+        # Other static files keep their URL when they change, so browsers
+        # revalidate them (Flask answers 304 when unchanged)
         location /static/ {
             proxy_pass http://morfis-frontend:5000/static/;
-            expires 1d;
-            add_header Cache-Control "public, immutable";
+            expires 1h;
         }
     }
 }
@@ -264,10 +288,10 @@ sleep 5
 
 # Test local endpoints
 echo "Testing Flask app..."
-curl -f http://localhost:5000/init || echo "⚠️ Flask app test failed"
+curl -f http://localhost:5000/healthz || echo "⚠️ Flask app test failed"
 
 echo "Testing Nginx proxy..."
-curl -f http://localhost/init || echo "⚠️ Nginx proxy test failed"
+curl -f http://localhost/healthz || echo "⚠️ Nginx proxy test failed"
 
 echo "✅ Docker-based deployment complete!"
 echo "🌐 Frontend should be available at: http://$INSTANCE_IP"
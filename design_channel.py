@@ -0,0 +1,130 @@
+"""Multiplexed request/response channel over a WebSocket.
+
+Clients send JSON text frames ``{"id": ..., "type": ..., ...}``. Each
+request runs on its own thread, so a long prompt doesn't hold up feedback
+or trajectory requests on the same connection, and is answered with
+``{"type": "result", "id": ..., "status": ..., "body": ...}``. Handlers can
+push events (progress, trajectory updates, ...) at any time with ``push``.
+
+The cookie can't change once the connection is upgraded, so the login is
+checked again (``authorize``) for every message. Once it fails the message
+is answered with 401, a ``reauth`` event is pushed and the connection is
+closed with 1008; the client logs in again over HTTP and reconnects.
+"""
+
+import logging
+import threading
+
+from json_codec import dumps, loads
+
+
+class DesignChannel:
+    """One client connection, bound to a session for its whole lifetime."""
+
+    def __init__(self, ws, session_id, handlers, wrap=None, max_in_flight=8,
+                 authorize=None):
+        self.ws = ws
+        self.session_id = session_id
+        # message type -> handler(channel, request_id, message) -> (status, body)
+        self.handlers = handlers
+        # Applied to every handler thread target (e.g. to copy request context)
+        self.wrap = wrap or (lambda func: func)
+        self.max_in_flight = max_in_flight
+        # authorize(channel, message) -> False once the login has expired
+        self.authorize = authorize or (lambda channel, message: True)
+        # Topics the client asked to receive pushes for (e.g. "trajectory")
+        self.subscriptions = set()
+        self.closed = threading.Event()
+        self.last_activity = 0.0
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def send(self, message):
+        """Send a JSON message. Returns False once the connection is gone."""
+        if self.closed.is_set():
+            return False
+        try:
+            with self._send_lock:
+                self.ws.send(dumps(message))
+            return True
+        except Exception:
+            self.closed.set()
+            return False
+
+    def push(self, event_type, request_id=None, **fields):
+        """Send an event, tied to a request when request_id is given."""
+        message = {"type": event_type, **fields}
+        if request_id is not None:
+            message["id"] = request_id
+        return self.send(message)
+
+    def reply(self, request_id, status, body):
+        return self.push("result", request_id, status=status, body=body)
+
+    def close(self, code, reason):
+        """Close the connection with a WebSocket close code and reason."""
+        self.closed.set()
+        try:
+            with self._send_lock:
+                self.ws.close(reason=code, message=reason)
+        except Exception:
+            pass
+
+    def serve(self):
+        """Read and dispatch messages until the client disconnects."""
+        try:
+            while not self.closed.is_set():
+                data = self.ws.receive()
+                if data is not None:
+                    self._dispatch(data)
+        finally:
+            self.closed.set()
+
+    def _dispatch(self, data):
+        try:
+            message = loads(data)
+            request_id = message.get("id")
+            message_type = message.get("type")
+        except (ValueError, AttributeError):
+            self.push("error", error="Invalid message")
+            return
+
+        if not self.authorize(self, message):
+            self.reply(request_id, 401, {"error": "Login expired"})
+            self.push("reauth")
+            self.close(1008, "Login expired")
+            return
+
+        handler = self.handlers.get(message_type)
+        if handler is None:
+            self.reply(request_id, 400,
+                       {"error": f"Unknown message type: {message_type}"})
+            return
+
+        with self._lock:
+            busy = self._in_flight >= self.max_in_flight
+            if not busy:
+                self._in_flight += 1
+        if busy:
+            self.reply(request_id, 429, {"error": "Too many requests in flight"})
+            return
+
+        threading.Thread(
+            target=self.wrap(self._run),
+            args=(handler, request_id, message),
+            name=f"channel-{message_type}",
+            daemon=True,
+        ).start()
+
+    def _run(self, handler, request_id, message):
+        try:
+            status, body = handler(self, request_id, message)
+        except Exception as e:
+            logging.error(
+                f"Error handling {message.get('type')} message: {str(e)}")
+            status, body = 500, {"error": "Failed to process request"}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        self.reply(request_id, status, body)
@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+
+
+class CachedCheck:
+    """Serve the last result of a probe, refreshing it in the background.
+
+    ``status`` never waits for the probe: when the last result is older
+    than ``interval_seconds`` a refresh is started on a helper thread and
+    the previous result is returned. Until the first probe finishes the
+    result is unknown (``ok`` is None).
+    """
+
+    def __init__(self, name, probe, interval_seconds=30.0, clock=time.monotonic):
+        self.name = name
+        # Returns normally when healthy, raises otherwise
+        self.probe = probe
+        self.interval_seconds = interval_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._ok = None
+        self._error = None
+        self._checked_at = None
+        self._refreshing = False
+
+    def status(self):
+        with self._lock:
+            now = self._clock()
+            stale = (self._checked_at is None
+                     or now - self._checked_at >= self.interval_seconds)
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(
+                    target=self._refresh, name=f"check-{self.name}", daemon=True
+                ).start()
+            result = {"ok": self._ok}
+            if self._checked_at is not None:
+                result["age_seconds"] = round(now - self._checked_at, 1)
+            if self._error:
+                result["error"] = self._error
+            return result
+
+    def _refresh(self):
+        try:
+            self.probe()
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+            logging.warning(f"Health check {self.name} failed: {error}")
+        with self._lock:
+            self._ok = ok
+            self._error = error
+            self._checked_at = self._clock()
+            self._refreshing = False
+
+
+class RequestGauge:
+    """Count the requests this process is currently handling."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def enter(self):
+        with self._lock:
+            self._active += 1
+
+    def exit(self):
+        with self._lock:
+            self._active -= 1
+
+    @property
+    def active(self):
+        with self._lock:
+            return self._active
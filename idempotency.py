@@ -0,0 +1,219 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+# Shared idempotency record states
+RUNNING = "running"
+DONE = "done"
+
+
+class IdempotencyKeyMismatch(Exception):
+    """Raised when a key is reused for a different request."""
+
+    def __init__(self, key):
+        super().__init__("Idempotency key was already used for a different request")
+        self.key = key
+
+
+class IdempotencyStore:
+    """Run each keyed call once and share its outcome with retries.
+
+    ``submit`` starts the call on its own thread and returns a Future. A
+    retry with the same key attaches to the call while it is in flight and
+    gets the stored result for ``ttl_seconds`` after it completed. Calls
+    that raise, or whose result ``keep`` rejects, are forgotten as soon as
+    they finish so a retry runs them again. Each key is bound to a request
+    fingerprint; reusing it for a different request raises
+    IdempotencyKeyMismatch.
+    """
+
+    def __init__(self, ttl_seconds=600.0, max_entries=2048, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (fingerprint, future, completed_at or None while in flight)
+        self._entries = OrderedDict()
+
+    def submit(self, key, fingerprint, func, keep=None):
+        """Return the Future of the call for key, starting func if there is none."""
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] != fingerprint:
+                    raise IdempotencyKeyMismatch(key)
+                return entry[1]
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._entries[key] = (fingerprint, future, None)
+
+        threading.Thread(
+            target=self._run,
+            args=(key, fingerprint, future, func, keep),
+            name="idempotent-call",
+            daemon=True,
+        ).start()
+        return future
+
+    def stats(self):
+        with self._lock:
+            in_flight = sum(1 for entry in self._entries.values() if entry[2] is None)
+            return {"in_flight": in_flight, "stored": len(self._entries) - in_flight}
+
+    def _run(self, key, fingerprint, future, func, keep):
+        try:
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                self._entries.pop(key, None)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            if keep is None or keep(result):
+                self._entries[key] = (fingerprint, future, self._clock())
+                self._entries.move_to_end(key)
+            else:
+                self._entries.pop(key, None)
+        future.set_result(result)
+
+    def _expire(self):
+        now = self._clock()
+        completed = [
+            key for key, (_, _, completed_at) in self._entries.items()
+            if completed_at is not None and now - completed_at >= self.ttl_seconds
+        ]
+        for key in completed:
+            del self._entries[key]
+        # Drop the oldest completed results when there are too many keys;
+        # calls still in flight are always kept
+        if len(self._entries) >= self.max_entries:
+            for key in [key for key, entry in self._entries.items()
+                        if entry[2] is not None]:
+                del self._entries[key]
+                if len(self._entries) < self.max_entries:
+                    break
+
+
+class SharedIdempotencyKeys:
+    """Share keyed calls between worker processes through the database.
+
+    ``run`` claims the key with a ``running`` record before calling func and
+    stores the result in the record when it is kept, so a retry that lands
+    on another process waits for the call (polling the record) or replays
+    its result for ``ttl_seconds`` instead of running it again. Failed or
+    unkept calls delete the record so a retry runs them again. A claim
+    expires after ``lease_seconds``, so the key of a process that died is
+    taken over. Results must be JSON serializable. Without a database the
+    call just runs, deduplicated only within the process.
+    """
+
+    def __init__(self, db, model, ttl_seconds=600.0, lease_seconds=900.0,
+                 poll_interval=0.5, sleep=time.sleep):
+        self.db = db
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self._sleep = sleep
+
+    def run(self, key, fingerprint, func, keep=None):
+        """Return the result of the call for key, running func if nobody has."""
+        try:
+            while True:
+                claimed, status, result = self._claim(key, fingerprint)
+                if claimed:
+                    break
+                if status == DONE:
+                    return result
+                # Running in another process
+                self._sleep(self.poll_interval)
+        except SQLAlchemyError as e:
+            self.db.session.rollback()
+            logging.warning(
+                f"Database not available for idempotency keys: {str(e)}")
+            return func()
+
+        try:
+            result = func()
+        except BaseException:
+            self._finish(key, None)
+            raise
+        self._finish(key, result if keep is None or keep(result) else None)
+        return result
+
+    def _claim(self, key, fingerprint):
+        """Claim key. Returns (claimed, status, result) of its record."""
+        model = self.model
+        session = self.db.session
+        while True:
+            now = datetime.utcnow()
+            session.add(model(
+                record_key=key,
+                fingerprint=fingerprint,
+                status=RUNNING,
+                expires_at=now + timedelta(seconds=self.lease_seconds),
+            ))
+            try:
+                session.commit()
+                return True, RUNNING, None
+            except IntegrityError:
+                session.rollback()
+
+            record = model.query.filter_by(record_key=key).first()
+            if record is None:
+                # Deleted since the insert failed; try again
+                continue
+            if record.expires_at <= now:
+                # Expired result or abandoned claim: take it over unless
+                # another process just did
+                taken = model.query.filter(
+                    model.id == record.id, model.expires_at <= now
+                ).update({
+                    "fingerprint": fingerprint,
+                    "status": RUNNING,
+                    "result": None,
+                    "expires_at": now + timedelta(seconds=self.lease_seconds),
+                }, synchronize_session=False)
+                session.commit()
+                if taken:
+                    return True, RUNNING, None
+                continue
+            if record.fingerprint != fingerprint:
+                session.rollback()
+                raise IdempotencyKeyMismatch(key)
+            status = record.status
+            result = json.loads(record.result) if status == DONE else None
+            # End the transaction so the next poll reads fresh state
+            session.rollback()
+            return False, status, result
+
+    def _finish(self, key, result):
+        """Store a kept result for key, or forget it (result None)."""
+        model = self.model
+        now = datetime.utcnow()
+        try:
+            query = model.query.filter_by(record_key=key)
+            if result is None:
+                query.delete(synchronize_session=False)
+            else:
+                query.update({
+                    "status": DONE,
+                    "result": json.dumps(result),
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                }, synchronize_session=False)
+            # Drop expired results of other keys while we are here
+            model.query.filter(
+                model.status == DONE, model.expires_at <= now
+            ).delete(synchronize_session=False)
+            self.db.session.commit()
+        except SQLAlchemyError as e:
+            self.db.session.rollback()
+            logging.warning(f"Could not record idempotency key: {str(e)}")
@@ -0,0 +1,92 @@
+"""JSON encoding and decoding with the fastest available codec.
+
+Uses ``orjson`` when it is installed and the standard library otherwise.
+The hot payloads are backend responses carrying multi-megabyte hex model
+data and large trajectories, where orjson is several times faster.
+``FastJSONProvider`` plugs the same codec into Flask (``jsonify``,
+``request.json``) while keeping Flask's serialization of dates and
+dataclasses.
+"""
+
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: stdlib json is used without it
+    orjson = None
+
+CODEC = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    # Dates and dataclasses go through the default hook so the output
+    # matches Flask's own provider
+    _ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+def loads(data):
+    """Parse JSON from str or UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj, default=None, sort_keys=False, indent=False):
+    """Serialize obj to compact (or 2-space indented) UTF-8 JSON bytes."""
+    if orjson is not None:
+        option = _ORJSON_OPTIONS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits, which stdlib json handles
+            pass
+    return json.dumps(
+        obj,
+        default=default,
+        sort_keys=sort_keys,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+    ).encode("utf-8")
+
+
+def dumps(obj, default=None, sort_keys=False, indent=False):
+    """Serialize obj to a JSON string."""
+    return dumps_bytes(obj, default, sort_keys, indent).decode("utf-8")
+
+
+def loads_response(response):
+    """Parse the JSON body of a requests response."""
+    return loads(response.content)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by loads/dumps_bytes above."""
+
+    def dumps(self, obj, **kwargs):
+        indent = kwargs.pop("indent", None)
+        kwargs.pop("separators", None)
+        if kwargs:
+            # Options only stdlib json understands
+            return super().dumps(obj, indent=indent, **kwargs)
+        return dumps(obj, self.default, self.sort_keys, bool(indent))
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # Build the body as bytes directly instead of going through str
+        body = dumps_bytes(obj, self.default, self.sort_keys, indent) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,122 @@
+import threading
+from collections import Counter, OrderedDict
+
+
+class ModelCache:
+    """Per-session cache of model artifacts keyed by trajectory index.
+
+    Each session maps message indexes to the model info dict that was sent
+    to the client for that step, so a rollback can answer from the cache
+    instead of re-downloading the geometry from the backend. The cache is
+    bounded by total artifact bytes, number of sessions and steps per
+    session; least recently used sessions are evicted first. ``on_evict`` is
+    called with an artifact path once no cached step refers to it anymore.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024, max_sessions=1000,
+                 max_steps_per_session=50, on_evict=None):
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self.max_steps_per_session = max_steps_per_session
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        # session_id -> OrderedDict(index -> (model_info, size))
+        self._sessions = OrderedDict()
+        self._path_refs = Counter()
+        self._bytes = 0
+
+    def get(self, session_id, index):
+        """Return the cached model info for a step, or None."""
+        with self._lock:
+            steps = self._sessions.get(session_id)
+            if steps is None or index not in steps:
+                return None
+            self._sessions.move_to_end(session_id)
+            return dict(steps[index][0])
+
+    def put(self, session_id, index, model_info, size, truncate=False,
+            clear=False):
+        """Cache the model shown at step index, replacing any previous entry.
+
+        With truncate, steps after index are forgotten as well; with clear,
+        every other step of the session. The new entry's path is referenced
+        before any step is dropped, so a file it shares with a dropped step
+        (content-addressed paths repeat) is never evicted.
+        """
+        evicted = []
+        with self._lock:
+            steps = self._sessions.setdefault(session_id, OrderedDict())
+            self._sessions.move_to_end(session_id)
+            self._path_refs[model_info["path"]] += 1
+            self._bytes += size
+            for other in [i for i in steps
+                          if i == index or clear or (truncate and i > index)]:
+                evicted.extend(self._drop(steps, other))
+            steps[index] = (dict(model_info), size)
+            while len(steps) > self.max_steps_per_session:
+                evicted.extend(self._drop(steps, min(steps)))
+            evicted.extend(self._enforce_limits())
+        self._notify(evicted)
+
+    def steps(self, session_id):
+        """Return (index, model info) of every cached step, oldest first."""
+        with self._lock:
+            steps = self._sessions.get(session_id)
+            if steps is None:
+                return []
+            return [(index, dict(steps[index][0])) for index in sorted(steps)]
+
+    def truncate(self, session_id, index):
+        """Forget every step after index (they were rolled back)."""
+        evicted = []
+        with self._lock:
+            steps = self._sessions.get(session_id)
+            if steps is not None:
+                for later in [i for i in steps if i > index]:
+                    evicted.extend(self._drop(steps, later))
+        self._notify(evicted)
+
+    def clear_session(self, session_id):
+        """Forget every step of a session (e.g. a new design was started)."""
+        evicted = []
+        with self._lock:
+            steps = self._sessions.pop(session_id, None)
+            if steps is not None:
+                for index in list(steps):
+                    evicted.extend(self._drop(steps, index))
+        self._notify(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "steps": sum(len(steps) for steps in self._sessions.values()),
+                "bytes": self._bytes,
+            }
+
+    def _drop(self, steps, index):
+        model_info, size = steps.pop(index)
+        self._bytes -= size
+        path = model_info["path"]
+        self._path_refs[path] -= 1
+        if self._path_refs[path] <= 0:
+            del self._path_refs[path]
+            return [path]
+        return []
+
+    def _enforce_limits(self):
+        evicted = []
+        while self._sessions and (
+            self._bytes > self.max_bytes
+            or len(self._sessions) > self.max_sessions
+        ):
+            _, steps = self._sessions.popitem(last=False)
+            for index in list(steps):
+                evicted.extend(self._drop(steps, index))
+        return evicted
+
+    def _notify(self, paths):
+        if self.on_evict is None:
+            return
+        for path in paths:
+            self.on_evict(path)
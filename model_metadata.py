@@ -0,0 +1,133 @@
+"""Geometry metadata for generated STL models.
+
+Computed with numpy when a model arrives, so clients can frame the camera
+and show dimensions before the mesh itself has downloaded and been parsed.
+"""
+
+import re
+
+try:
+    import numpy as np
+except ImportError:  # Optional: models are served without metadata
+    np = None
+
+STL_HEADER_BYTES = 84
+STL_TRIANGLE_BYTES = 50
+DECIMALS = 6
+
+_ASCII_VERTEX = re.compile(
+    rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)", re.IGNORECASE)
+
+
+def metadata_available():
+    return np is not None
+
+
+def parse_stl(data):
+    """Return the triangles of a binary or ASCII STL as an (n, 3, 3) float32 array."""
+    if len(data) >= STL_HEADER_BYTES:
+        count = int.from_bytes(data[80:STL_HEADER_BYTES], "little")
+        expected = STL_HEADER_BYTES + STL_TRIANGLE_BYTES * count
+        # ASCII files start with "solid", but so do some binary headers,
+        # so an exact size match wins
+        if len(data) == expected or (
+            len(data) > expected and not data.lstrip().startswith(b"solid")
+        ):
+            records = np.frombuffer(
+                data,
+                dtype=np.dtype([
+                    ("normal", "<f4", (3,)),
+                    ("vertices", "<f4", (3, 3)),
+                    ("attribute", "<u2"),
+                ]),
+                count=count,
+                offset=STL_HEADER_BYTES,
+            )
+            return np.ascontiguousarray(records["vertices"])
+
+    values = _ASCII_VERTEX.findall(data)
+    if len(values) % 3:
+        raise ValueError("STL has an incomplete triangle")
+    return np.array(values, dtype=np.float32).reshape(-1, 3, 3)
+
+
+def _vertex_ids(points):
+    """Return (unique vertex count, vertex id of every point)."""
+    # Comparing the raw 12 bytes of each point is much faster than
+    # np.unique(axis=0); adding zero turns -0.0 into 0.0 so they compare equal
+    points = np.ascontiguousarray(points + np.float32(0.0))
+    keys = points.view(np.dtype((np.void, 12))).ravel()
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return len(unique), inverse.ravel()
+
+
+def _is_closed(vertex_ids, vertex_count):
+    """A mesh is closed when every edge is shared by exactly two triangles."""
+    faces = vertex_ids.reshape(-1, 3).astype(np.int64)
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    edges.sort(axis=1)
+    _, counts = np.unique(edges[:, 0] * vertex_count + edges[:, 1],
+                          return_counts=True)
+    return bool((counts == 2).all())
+
+
+def _rounded(values):
+    return [round(float(value), DECIMALS) for value in values]
+
+
+def stl_metadata(data):
+    """Return bounding box, counts, surface area, volume and centroid of an STL.
+
+    Volume and centroid are those of the enclosed solid and are only given
+    for closed meshes; for open meshes volume is None and the centroid is
+    the area-weighted centroid of the surface.
+    """
+    triangles = parse_stl(data)
+    # Degenerate files with NaN/inf coordinates would poison every sum
+    triangles = triangles[np.isfinite(triangles).all(axis=(1, 2))]
+    if len(triangles) == 0:
+        return {"triangles": 0, "vertices": 0}
+
+    vertex_count, vertex_ids = _vertex_ids(triangles.reshape(-1, 3))
+    closed = _is_closed(vertex_ids, vertex_count)
+
+    points = triangles.reshape(-1, 3)
+    lower = points.min(axis=0).astype(np.float64)
+    upper = points.max(axis=0).astype(np.float64)
+
+    # Sums are done in float64 relative to the box center, which keeps
+    # precision for models far from the origin
+    center = (lower + upper) / 2.0
+    local = triangles.astype(np.float64) - center
+    v0, v1, v2 = local[:, 0], local[:, 1], local[:, 2]
+    doubled_areas = np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1)
+    surface_area = 0.5 * doubled_areas.sum()
+    corner_sums = v0 + v1 + v2
+
+    volume = None
+    centroid = center
+    if closed:
+        # Signed volumes of the tetrahedra spanned by the center and each face
+        signed_volumes = np.einsum("ij,ij->i", v0, np.cross(v1, v2)) / 6.0
+        volume = signed_volumes.sum()
+        if volume != 0:
+            centroid = center + (signed_volumes[:, None] * corner_sums).sum(
+                axis=0) / (4.0 * volume)
+        volume = round(abs(float(volume)), DECIMALS)
+    elif surface_area > 0:
+        centroid = center + (doubled_areas[:, None] * corner_sums).sum(
+            axis=0) / (3.0 * doubled_areas.sum())
+
+    return {
+        "bbox": {
+            "min": _rounded(lower),
+            "max": _rounded(upper),
+            "size": _rounded(upper - lower),
+        },
+        "triangles": int(len(triangles)),
+        "vertices": int(vertex_count),
+        "closed": closed,
+        "surface_area": round(float(surface_area), DECIMALS),
+        "volume": volume,
+        "centroid": _rounded(centroid),
+    }
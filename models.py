@@ -1,6 +1,5 @@
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
-from app import db
+from database import db
 
 class WaitlistEntry(db.Model):
     __tablename__ = 'waitlist_entries'
@@ -33,4 +32,38 @@ class UserSession(db.Model):
     def update_activity(self):
         """Update last activity timestamp"""
         self.last_activity = datetime.utcnow()
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
+
+class OutboxMessage(db.Model):
+    """A submission accepted locally and waiting to be forwarded to the backend."""
+    __tablename__ = 'outbox_messages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    endpoint = db.Column(db.String(64), nullable=False)  # Backend endpoint, e.g. 'waitlist'
+    dedupe_key = db.Column(db.String(255), unique=True, nullable=False)
+    session_id = db.Column(db.String(36), nullable=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON request body
+    status = db.Column(db.String(16), default='pending', nullable=False, index=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<OutboxMessage {self.dedupe_key} {self.status}>'
+
+class IdempotencyRecord(db.Model):
+    """A keyed call claimed by one worker process, and its result once done."""
+    __tablename__ = 'idempotency_records'
+
+    id = db.Column(db.Integer, primary_key=True)
+    record_key = db.Column(db.String(64), unique=True, nullable=False)  # Hash of session, scope and key
+    fingerprint = db.Column(db.String(64), nullable=False)  # Hash of the request parameters
+    status = db.Column(db.String(16), nullable=False)  # 'running' or 'done'
+    result = db.Column(db.Text, nullable=True)  # JSON result once done
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # Claim lease, then result TTL
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<IdempotencyRecord {self.record_key} {self.status}>'
@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+# Outbox message states
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+REJECTED = "rejected"  # Backend refused the message (4xx); not retried
+DEAD = "dead"  # Gave up after max_attempts
+
+
+def enqueue(db, model, endpoint, dedupe_key, payload, session_id=None,
+            records=()):
+    """Store a submission in the outbox, together with any extra records.
+
+    Everything is committed in one transaction. Returns False if a message
+    with the same dedupe key (or a conflicting record) already exists.
+    Database errors other than unique-constraint violations propagate.
+    """
+    message = model(
+        endpoint=endpoint,
+        dedupe_key=dedupe_key,
+        session_id=session_id,
+        payload=json.dumps(payload),
+        status=PENDING,
+        next_attempt_at=datetime.utcnow(),
+    )
+    try:
+        for record in records:
+            db.session.add(record)
+        db.session.add(message)
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+class OutboxWorker:
+    """Forward outbox messages to the backend from a background thread.
+
+    Due messages are claimed in batches by marking them as ``sending`` with a
+    lease, so several processes can drain the same table without sending a
+    message twice; a message whose lease expires (e.g. the process died) is
+    picked up again. Failed sends are retried with exponential backoff.
+    """
+
+    def __init__(self, app, db, model, send, batch_size=50, poll_interval=5.0,
+                 max_attempts=8, base_backoff=5.0, max_backoff=900.0,
+                 lease_seconds=120.0):
+        self.app = app
+        self.db = db
+        self.model = model
+        # send(message, payload) performs the backend call and returns the response
+        self.send = send
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def start(self):
+        """Start the worker thread if it isn't running in this process."""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._wake = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, name="outbox-worker", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Ask the worker to check for due messages now."""
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    # Keep draining while full batches come back
+                    while self.run_once() >= self.batch_size:
+                        pass
+            except Exception as e:
+                logging.warning(f"Outbox worker error: {str(e)}")
+
+    def run_once(self):
+        """Claim and forward one batch of due messages. Returns the batch size."""
+        batch = self._claim_batch()
+        for message_id, payload in batch:
+            self._deliver(message_id, payload)
+        return len(batch)
+
+    def _claim_batch(self):
+        model = self.model
+        now = datetime.utcnow()
+        query = (
+            model.query.filter(
+                model.status.in_([PENDING, SENDING]),
+                model.next_attempt_at <= now,
+            )
+            .order_by(model.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        batch = []
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        for message in query.all():
+            message.status = SENDING
+            message.next_attempt_at = lease_until
+            batch.append((message.id, message.payload))
+        self.db.session.commit()
+        return batch
+
+    def _deliver(self, message_id, payload):
+        message = self.db.session.get(self.model, message_id)
+        if message is None:
+            return
+        try:
+            response = self.send(message, json.loads(payload))
+        except Exception as e:
+            self._schedule_retry(message, str(e))
+            return
+
+        if response.ok:
+            message.status = SENT
+            message.sent_at = datetime.utcnow()
+            message.last_error = None
+        elif 400 <= response.status_code < 500 and response.status_code != 429:
+            message.status = REJECTED
+            message.last_error = response.text[:500]
+            logging.warning(
+                f"Backend rejected outbox message {message.dedupe_key}: "
+                f"{response.status_code}"
+            )
+        else:
+            self._schedule_retry(
+                message, f"Backend returned {response.status_code}")
+            return
+        self.db.session.commit()
+
+    def _schedule_retry(self, message, error):
+        message.attempts += 1
+        message.last_error = error[:500]
+        if message.attempts >= self.max_attempts:
+            message.status = DEAD
+            logging.error(
+                f"Giving up on outbox message {message.dedupe_key} "
+                f"after {message.attempts} attempts: {error}"
+            )
+        else:
+            delay = min(self.max_backoff,
+                        self.base_backoff * 2 ** (message.attempts - 1))
+            # Jitter so retries from many messages don't arrive together
+            delay *= random.uniform(0.5, 1.0)
+            message.status = PENDING
+            message.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        self.db.session.commit()
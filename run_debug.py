@@ -12,7 +12,9 @@ os.environ.setdefault('FLASK_DEBUG', '1')
 
 if __name__ == '__main__':
     # Import and run the main app
-    from app import app
+    from app import create_app
+
+    app = create_app()
     
     print("Starting Flask app in debug mode...")
     print("You can now set breakpoints in app.py!")
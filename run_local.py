@@ -6,10 +6,13 @@ This script initializes the database and runs the app in debug mode.
 
 import os
 
-from app import app, db
+from app import create_app, db
 from models import UserSession, WaitlistEntry
 
 
+app = create_app()
+
+
 def init_database():
     """Initialize the database and create tables."""
     with app.app_context():
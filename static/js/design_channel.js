@@ -0,0 +1,216 @@
+// Persistent WebSocket channel for the design chat.
+// Prompts, rollbacks, feedback and trajectory requests share one connection
+// per tab; the server pushes progress, trajectory updates and finished models
+// as soon as they are ready. Callers fall back to HTTP while it isn't open.
+//
+// The login cookie can't be refreshed over the channel, so while it is in use
+// the client calls /api/ping every few minutes and passes the token it gets
+// back to the channel. Once the server finds the channel's login expired it
+// pushes 'reauth' and closes with 1008: the client pings, and reconnects if
+// the cookie is still logged in or reloads to show the login otherwise.
+
+// How often the login is refreshed while the channel is in use
+const LOGIN_REFRESH_MS = 5 * 60 * 1000;
+
+// Response-like wrapper so channel results can be handled like fetch responses
+class ChannelResponse {
+    constructor(status, body) {
+        this.status = status;
+        this.ok = status >= 200 && status < 300;
+        this.body = body;
+    }
+
+    async json() {
+        return this.body;
+    }
+}
+
+class DesignChannel {
+    constructor(tabId) {
+        this.tabId = tabId;
+        this.socket = null;
+        this.ready = false;
+        this.nextId = 1;
+        this.pending = new Map();
+        this.listeners = {};
+        this.subscriptions = new Set();
+        this.retryDelay = 1000;
+        this.failedAttempts = 0;
+        this.lastLoginRefresh = 0;
+        this.loginExpired = false;
+    }
+
+    connect() {
+        if (!('WebSocket' in window)) return;
+
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const url = `${scheme}://${window.location.host}/ws?tab_id=${encodeURIComponent(this.tabId)}`;
+        const socket = new WebSocket(url);
+        this.socket = socket;
+
+        socket.onmessage = (event) => this.handleMessage(event.data);
+        socket.onclose = (event) => {
+            const wasReady = this.ready;
+            this.ready = false;
+            this.socket = null;
+
+            // Requests sent on this connection will never be answered
+            this.pending.forEach(entry => {
+                clearTimeout(entry.timer);
+                entry.reject(new Error('Connection to the server was lost'));
+            });
+            this.pending.clear();
+
+            // 1008 after 'reauth': the login expired, renew it and reconnect
+            if (event.code === 1008 && this.loginExpired) {
+                this.loginExpired = false;
+                this.refreshLogin().then(loggedIn => {
+                    if (loggedIn) {
+                        this.connect();
+                    } else {
+                        window.location.reload();
+                    }
+                });
+                return;
+            }
+            // 1008: no session for this tab (or too many open channels),
+            // HTTP is used from here on
+            if (event.code === 1008) return;
+            this.failedAttempts = wasReady ? 0 : this.failedAttempts + 1;
+            if (this.failedAttempts >= 5) {
+                console.log('Design channel unavailable, using HTTP requests');
+                return;
+            }
+            setTimeout(() => this.connect(), this.retryDelay);
+            this.retryDelay = Math.min(this.retryDelay * 2, 30000);
+        };
+    }
+
+    isOpen() {
+        return this.ready && this.socket !== null && this.socket.readyState === WebSocket.OPEN;
+    }
+
+    on(type, callback) {
+        (this.listeners[type] = this.listeners[type] || []).push(callback);
+    }
+
+    handleMessage(data) {
+        let message;
+        try {
+            message = JSON.parse(data);
+        } catch (error) {
+            console.error('Invalid design channel message:', error);
+            return;
+        }
+
+        if (message.type === 'ready') {
+            this.ready = true;
+            this.retryDelay = 1000;
+            this.failedAttempts = 0;
+            this.lastLoginRefresh = Date.now();
+            // Restore subscriptions after a reconnect
+            this.subscriptions.forEach(topic => this.send({ type: 'subscribe', topic: topic, enabled: true }));
+            console.log('Design channel connected');
+        }
+        if (message.type === 'reauth') {
+            this.loginExpired = true;
+        }
+
+        const entry = message.id !== undefined ? this.pending.get(message.id) : undefined;
+        if (message.type === 'result') {
+            if (entry) {
+                this.pending.delete(message.id);
+                clearTimeout(entry.timer);
+                entry.resolve(new ChannelResponse(message.status, message.body));
+            }
+            return;
+        }
+
+        if (entry && entry.onEvent) {
+            entry.onEvent(message);
+        }
+        (this.listeners[message.type] || []).forEach(callback => callback(message));
+    }
+
+    send(message) {
+        if (!this.isOpen()) return false;
+        this.socket.send(JSON.stringify(message));
+        return true;
+    }
+
+    // Extend the login cookie over HTTP and pass the token to the channel so
+    // its login is extended too. Resolves with whether the user is logged in.
+    refreshLogin() {
+        this.lastLoginRefresh = Date.now();
+        return fetchWithTimeout('/api/ping', { method: 'POST' }, 10000)
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (data && data.token) {
+                    this.send({ type: 'reauth', token: data.token });
+                }
+                return data !== null;
+            })
+            .catch(() => false);
+    }
+
+    // Send a request and resolve with its ChannelResponse. onEvent receives
+    // events the server pushes for this request (progress, model_ready).
+    request(type, payload = {}, timeoutMs = 30000, onEvent = null) {
+        if (Date.now() - this.lastLoginRefresh > LOGIN_REFRESH_MS) {
+            this.refreshLogin();
+        }
+        return new Promise((resolve, reject) => {
+            const id = this.nextId++;
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error(`Request timed out after ${timeoutMs / 1000} seconds`));
+            }, timeoutMs);
+            this.pending.set(id, { resolve, reject, timer, onEvent });
+
+            if (!this.send({ ...payload, id: id, type: type })) {
+                clearTimeout(timer);
+                this.pending.delete(id);
+                reject(new Error('Design channel is not open'));
+            }
+        });
+    }
+
+    subscribe(topic, enabled) {
+        if (enabled) {
+            this.subscriptions.add(topic);
+        } else {
+            this.subscriptions.delete(topic);
+        }
+        this.send({ type: 'subscribe', topic: topic, enabled: enabled });
+    }
+}
+
+// Key identifying one user action, sent with mutating requests so a retry
+// of the same action is answered from the original call instead of
+// running it twice
+function newIdempotencyKey() {
+    if (window.crypto && window.crypto.randomUUID) {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
+// Send a design request over the channel when it is open, otherwise POST it
+function sendDesignRequest(type, url, payload, timeoutMs, onEvent = null, idempotencyKey = null) {
+    const channel = window.designChannel;
+    if (channel && channel.isOpen()) {
+        const message = idempotencyKey ? { ...payload, idempotency_key: idempotencyKey } : payload;
+        return channel.request(type, message, timeoutMs, onEvent);
+    }
+    const headers = {
+        'Content-Type': 'application/json',
+    };
+    if (idempotencyKey) {
+        headers['Idempotency-Key'] = idempotencyKey;
+    }
+    return fetchWithTimeout(url, {
+        method: 'POST',
+        headers: headers,
+        body: JSON.stringify(payload)
+    }, timeoutMs);
+}
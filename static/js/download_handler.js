@@ -1,29 +1,3 @@
-// Helper function to add timeout to fetch requests
-function fetchWithTimeout(url, options = {}, timeoutMs = 30000) {
-    const controller = new AbortController();
-    const timeoutId = setTimeout(() => {
-        controller.abort();
-    }, timeoutMs);
-
-    const fetchOptions = {
-        ...options,
-        signal: controller.signal
-    };
-
-    return fetch(url, fetchOptions)
-        .then(response => {
-            clearTimeout(timeoutId);
-            return response;
-        })
-        .catch(error => {
-            clearTimeout(timeoutId);
-            if (error.name === 'AbortError') {
-                throw new Error(`Request timed out after ${timeoutMs / 1000} seconds`);
-            }
-            throw error;
-        });
-}
-
 // Download Handler functionality
 class DownloadHandler {
     constructor() {
@@ -0,0 +1,33 @@
+// Helper function to add timeout to fetch requests. Shared by every script
+// in the app bundle: it comes first in the bundle and is the only copy, so
+// no later script can shadow it with one that drops the deadline header.
+function fetchWithTimeout(url, options = {}, timeoutMs = 30000) {
+    const controller = new AbortController();
+    const timeoutId = setTimeout(() => {
+        controller.abort();
+    }, timeoutMs);
+
+    // Tell the server how long we are willing to wait so it can pass the
+    // deadline on to the backend and stop work we will never see
+    const fetchOptions = {
+        ...options,
+        headers: {
+            ...(options.headers || {}),
+            'X-Request-Timeout': String(timeoutMs)
+        },
+        signal: controller.signal
+    };
+
+    return fetch(url, fetchOptions)
+        .then(response => {
+            clearTimeout(timeoutId);
+            return response;
+        })
+        .catch(error => {
+            clearTimeout(timeoutId);
+            if (error.name === 'AbortError') {
+                throw new Error(`Request timed out after ${timeoutMs / 1000} seconds`);
+            }
+            throw error;
+        });
+}
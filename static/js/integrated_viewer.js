@@ -233,7 +233,7 @@ class IntegratedViewer {
         return new Promise((resolve, reject) => {
             const script = document.createElement('script');
             const cdnUrls = [
-                '/static/js/libs/o3dv.min.js',
+                (window.MORFIS_ASSETS && window.MORFIS_ASSETS['js/libs/o3dv.min.js']) || '/static/js/libs/o3dv.min.js',
                 'https://unpkg.com/online-3d-viewer@0.16.0/build/engine/o3dv.min.js',
                 'https://cdn.jsdelivr.net/npm/online-3d-viewer@0.16.0/build/engine/o3dv.min.js'
             ];
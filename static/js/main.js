@@ -1,31 +1,5 @@
 // Function to initialize the main Morfis application
 
-// Helper function to add timeout to fetch requests
-function fetchWithTimeout(url, options = {}, timeoutMs = 30000) {
-    const controller = new AbortController();
-    const timeoutId = setTimeout(() => {
-        controller.abort();
-    }, timeoutMs);
-
-    const fetchOptions = {
-        ...options,
-        signal: controller.signal
-    };
-
-    return fetch(url, fetchOptions)
-        .then(response => {
-            clearTimeout(timeoutId);
-            return response;
-        })
-        .catch(error => {
-            clearTimeout(timeoutId);
-            if (error.name === 'AbortError') {
-                throw new Error(`Request timed out after ${timeoutMs / 1000} seconds`);
-            }
-            throw error;
-        });
-}
-
 async function initializeMorfisApp() {
     // Generate or retrieve tab-specific ID for independent sessions per tab
     // Use Broadcast Channel API to detect duplicate tabs
@@ -251,6 +225,11 @@ async function initializeMorfisApp() {
     const designDropdown = document.getElementById('designDropdown'); // Container for dynamic design options
     let loadingMessage = null;
     let messageIndex = 0;
+    // Prompt and rollback whose response never arrived (timeout or network
+    // error). Sending the same one again reuses its idempotency key so the
+    // server answers from the original call instead of starting another.
+    let unansweredPrompt = null;
+    let unansweredRollback = null;
     let isWaitingForResponse = false; // Track if we're waiting for a response
     window.trajectoryPollingInterval = null; // Global reference for trajectory polling
 
@@ -373,6 +352,18 @@ async function initializeMorfisApp() {
         // Fallback to default items if API fails
     }
 
+    // Open the design chat channel once the config request has set up this
+    // tab's session; requests go over plain HTTP until it is connected
+    if (typeof DesignChannel === 'function') {
+        window.designChannel = new DesignChannel(tabId);
+        window.designChannel.on('trajectory', (event) => {
+            if (typeof window.renderTrajectoryContent === 'function') {
+                window.renderTrajectoryContent(event.html);
+            }
+        });
+        window.designChannel.connect();
+    }
+
     // Handler for selecting any design type
     async function handleDesignSelection(designType) {
         // Prevent selecting a design while waiting for a response
@@ -586,13 +577,16 @@ async function initializeMorfisApp() {
             button.classList.add('loading');
             button.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Rolling back...';
 
-            const response = await fetchWithTimeout('/rollback', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ message_index: targetIndex })
-            }, 15000);
+            const onEvent = (event) => {
+                if (event.type === 'progress' && event.stage === 'queued') {
+                    button.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Queued (#${event.position})...`;
+                }
+            };
+            if (!unansweredRollback || unansweredRollback.targetIndex !== targetIndex) {
+                unansweredRollback = { targetIndex: targetIndex, key: newIdempotencyKey() };
+            }
+            const response = await sendDesignRequest('rollback', '/rollback', { message_index: targetIndex }, 15000, onEvent, unansweredRollback.key);
+            unansweredRollback = null;
 
             const data = await response.json();
 
@@ -698,15 +692,11 @@ async function initializeMorfisApp() {
             const allFeedbackButtons = messageDiv.querySelectorAll('.feedback-btn');
             allFeedbackButtons.forEach(btn => btn.disabled = true);
 
-            const response = await fetchWithTimeout('/api/feedback', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    message_index: messageIndex,
-                    feedback_type: feedbackType
-                })
+            // Identifies this click, so only a retry of it counts as a duplicate
+            const response = await sendDesignRequest('feedback', '/api/feedback', {
+                message_index: messageIndex,
+                feedback_type: feedbackType,
+                feedback_id: newIdempotencyKey()
             }, 15000);
 
             const data = await response.json();
@@ -908,8 +898,10 @@ async function initializeMorfisApp() {
         messageDiv.appendChild(loadingDiv);
         conversationContainer.appendChild(messageDiv);
 
-        // Start trajectory polling when loading begins
-        if (!window.trajectoryPollingInterval) {
+        // Start trajectory polling when loading begins, unless the design
+        // channel is open: the server pushes trajectory updates over it
+        const channelOpen = window.designChannel && window.designChannel.isOpen();
+        if (!window.trajectoryPollingInterval && !channelOpen) {
             console.log("Starting trajectory polling during model generation");
             window.trajectoryPollingInterval = setInterval(function () {
                 // Call loadTrajectoryContent if it exists
@@ -923,6 +915,19 @@ async function initializeMorfisApp() {
         return messageDiv;
     }
 
+    // Show the queue position pushed by the server while a prompt waits
+    // for a free backend slot
+    function showQueuePosition(messageDiv, position) {
+        if (!messageDiv) return;
+        let status = messageDiv.querySelector('.queue-status');
+        if (!status) {
+            status = document.createElement('div');
+            status.className = 'queue-status';
+            (messageDiv.querySelector('.loading-message') || messageDiv).appendChild(status);
+        }
+        status.textContent = `Waiting for a free slot - position ${position} in queue`;
+    }
+
     async function typeMessage(element, text) {
         console.log('Starting typeMessage with text:', text);
         const delay = 30; // Delay between each character (ms)
@@ -958,13 +963,29 @@ async function initializeMorfisApp() {
         loadingMessage = showLoadingMessage();
 
         try {
-            const response = await fetchWithTimeout('/generate', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ command: command })
-            }, 360000); // 6 minutes timeout for generation
+            // Over the channel the model is pushed as soon as it is stored,
+            // so the viewer can start loading it before the reply arrives
+            let pushedModel = null;
+            const onEvent = (event) => {
+                if (event.type === 'model_ready' && event.model) {
+                    pushedModel = event.model;
+                    updateModel(event.model);
+                } else if (event.type === 'progress' && event.stage === 'queued') {
+                    showQueuePosition(loadingMessage, event.position);
+                }
+            };
+
+            // messageIndex is the index this response will get, which lets
+            // the server cache the resulting model for later rollbacks
+            if (!unansweredPrompt || unansweredPrompt.command !== command ||
+                unansweredPrompt.messageIndex !== messageIndex) {
+                unansweredPrompt = { command: command, messageIndex: messageIndex, key: newIdempotencyKey() };
+            }
+            const response = await sendDesignRequest('prompt', '/generate', {
+                command: command,
+                message_index: messageIndex
+            }, 360000, onEvent, unansweredPrompt.key); // 6 minutes timeout for generation
+            unansweredPrompt = null;
 
             const data = await response.json();
 
@@ -987,7 +1008,9 @@ async function initializeMorfisApp() {
 
                 // Update or reset 3D model
                 if (data.model) {
-                    updateModel(data.model);
+                    if (!pushedModel || pushedModel.path !== data.model.path) {
+                        updateModel(data.model);
+                    }
                 } else if (data.reset_viewer) {
                     // If reset_viewer flag is set, reset the 3D viewer
                     if (typeof resetViewer === 'function') {
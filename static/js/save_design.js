@@ -1,29 +1,3 @@
-// Helper function to add timeout to fetch requests
-function fetchWithTimeout(url, options = {}, timeoutMs = 30000) {
-    const controller = new AbortController();
-    const timeoutId = setTimeout(() => {
-        controller.abort();
-    }, timeoutMs);
-
-    const fetchOptions = {
-        ...options,
-        signal: controller.signal
-    };
-
-    return fetch(url, fetchOptions)
-        .then(response => {
-            clearTimeout(timeoutId);
-            return response;
-        })
-        .catch(error => {
-            clearTimeout(timeoutId);
-            if (error.name === 'AbortError') {
-                throw new Error(`Request timed out after ${timeoutMs / 1000} seconds`);
-            }
-            throw error;
-        });
-}
-
 // Handle save design functionality
 document.addEventListener('DOMContentLoaded', function () {
     // Get the save design button and modal elements
@@ -33,6 +7,8 @@ document.addEventListener('DOMContentLoaded', function () {
     const designNameInput = document.getElementById('designName');
     const confirmSaveBtn = document.getElementById('confirmSaveDesign');
     const saveDesignStatus = document.getElementById('saveDesignStatus');
+    // Save whose response never arrived, see the submit handler
+    let unansweredSave = null;
 
     // Add click event listener to save design button
     if (saveDesignBtn) {
@@ -77,15 +53,23 @@ document.addEventListener('DOMContentLoaded', function () {
 
             try {
                 // Call the backend to save the design
+                // Retrying a save that got no response reuses its key, so
+                // the server doesn't save the design twice
+                const designName = designNameInput.value.trim();
+                if (!unansweredSave || unansweredSave.name !== designName) {
+                    unansweredSave = { name: designName, key: newIdempotencyKey() };
+                }
                 const response = await fetchWithTimeout('/save_design', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
+                        'Idempotency-Key': unansweredSave.key,
                     },
                     body: JSON.stringify({
-                        name: designNameInput.value.trim()
+                        name: designName
                     })
                 }, 30000); // 30 seconds timeout
+                unansweredSave = null;
 
                 const data = await response.json();
 
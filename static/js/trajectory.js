@@ -1,29 +1,3 @@
-// Helper function to add timeout to fetch requests
-function fetchWithTimeout(url, options = {}, timeoutMs = 30000) {
-    const controller = new AbortController();
-    const timeoutId = setTimeout(() => {
-        controller.abort();
-    }, timeoutMs);
-
-    const fetchOptions = {
-        ...options,
-        signal: controller.signal
-    };
-
-    return fetch(url, fetchOptions)
-        .then(response => {
-            clearTimeout(timeoutId);
-            return response;
-        })
-        .catch(error => {
-            clearTimeout(timeoutId);
-            if (error.name === 'AbortError') {
-                throw new Error(`Request timed out after ${timeoutMs / 1000} seconds`);
-            }
-            throw error;
-        });
-}
-
 // Trajectory functionality
 window.showTrajectoryModal = function () {
     const modalElement = document.getElementById('trajectoryModal');
@@ -44,6 +18,12 @@ window.showTrajectoryModal = function () {
         focus: true      // Focus on modal when opened
     });
 
+    // While the modal is open the server pushes trajectory updates over the
+    // design channel during generation
+    if (window.designChannel) {
+        window.designChannel.subscribe('trajectory', true);
+    }
+
     // When modal is hidden, ensure polling is stopped and clean up styles
     modalElement.addEventListener('hidden.bs.modal', function () {
         // Clear the polling interval if it exists
@@ -52,6 +32,9 @@ window.showTrajectoryModal = function () {
             clearInterval(window.trajectoryPollingInterval);
             window.trajectoryPollingInterval = null;
         }
+        if (window.designChannel) {
+            window.designChannel.subscribe('trajectory', false);
+        }
 
         // Remove any backdrop that might have been added
         const backdrops = document.querySelectorAll('.modal-backdrop');
@@ -122,48 +105,23 @@ document.addEventListener('DOMContentLoaded', function () {
             if (!trajectoryContent) return; // Exit if modal is closed
 
             // Fetch the HTML content dynamically from the backend
-            const response = await fetchWithTimeout('/api/trajectory-html', {}, 15000);
-            if (!response.ok) {
-                throw new Error('Failed to fetch trajectory data');
-            }
-
-            const htmlContent = await response.text();
-
-            // Update the content with the fetched HTML
-            trajectoryContent.innerHTML = htmlContent;
-
-            // Add click handlers for the message boxes after content is loaded
-            setTimeout(() => {
-                const messageBoxes = trajectoryContent.querySelectorAll('.message-box');
-
-                if (messageBoxes.length === 0) return; // No message boxes to enhance
-
-                messageBoxes.forEach(box => {
-                    // Only add indicator if it doesn't already exist
-                    if (!box.querySelector('.expand-indicator')) {
-                        // Add an expand/collapse indicator
-                        const indicator = document.createElement('div');
-                        indicator.className = 'expand-indicator';
-                        indicator.innerHTML = '<i class="fas fa-chevron-down"></i>';
-                        box.appendChild(indicator);
-                    }
-
-                    // Remove existing click handler first to avoid duplicates
-                    box.removeEventListener('click', handleMessageBoxClick);
-
-                    // Add the click event handler
-                    box.addEventListener('click', handleMessageBoxClick);
-                });
-
-                // Initialize Prism syntax highlighting for code blocks
-                if (window.Prism) {
-                    window.Prism.highlightAll();
-                    console.log('Applied Prism syntax highlighting');
+            let htmlContent;
+            const channel = window.designChannel;
+            if (channel && channel.isOpen()) {
+                const response = await channel.request('trajectory', {}, 15000);
+                if (!response.ok) {
+                    throw new Error('Failed to fetch trajectory data');
                 }
+                htmlContent = (await response.json()).html;
+            } else {
+                const response = await fetchWithTimeout('/api/trajectory-html', {}, 15000);
+                if (!response.ok) {
+                    throw new Error('Failed to fetch trajectory data');
+                }
+                htmlContent = await response.text();
+            }
 
-                console.log('Added click handlers to', messageBoxes.length, 'message boxes');
-            }, 100); // Small delay to ensure DOM is updated
-
+            window.renderTrajectoryContent(htmlContent);
         } catch (error) {
             console.error('Error loading trajectory content:', error);
             const trajectoryContent = document.getElementById('trajectoryContent');
@@ -183,6 +141,47 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
+    // Show trajectory HTML in the modal (also used for updates pushed over the design channel)
+    window.renderTrajectoryContent = function (htmlContent) {
+        const trajectoryContent = document.getElementById('trajectoryContent');
+        if (!trajectoryContent) return; // Exit if modal is closed
+
+        // Update the content with the fetched HTML
+        trajectoryContent.innerHTML = htmlContent;
+
+        // Add click handlers for the message boxes after content is loaded
+        setTimeout(() => {
+            const messageBoxes = trajectoryContent.querySelectorAll('.message-box');
+
+            if (messageBoxes.length === 0) return; // No message boxes to enhance
+
+            messageBoxes.forEach(box => {
+                // Only add indicator if it doesn't already exist
+                if (!box.querySelector('.expand-indicator')) {
+                    // Add an expand/collapse indicator
+                    const indicator = document.createElement('div');
+                    indicator.className = 'expand-indicator';
+                    indicator.innerHTML = '<i class="fas fa-chevron-down"></i>';
+                    box.appendChild(indicator);
+                }
+
+                // Remove existing click handler first to avoid duplicates
+                box.removeEventListener('click', handleMessageBoxClick);
+
+                // Add the click event handler
+                box.addEventListener('click', handleMessageBoxClick);
+            });
+
+            // Initialize Prism syntax highlighting for code blocks
+            if (window.Prism) {
+                window.Prism.highlightAll();
+                console.log('Applied Prism syntax highlighting');
+            }
+
+            console.log('Added click handlers to', messageBoxes.length, 'message boxes');
+        }, 100); // Small delay to ensure DOM is updated
+    };
+
     // Handler for message box clicks
     function handleMessageBoxClick(e) {
         // Find the message-content div inside this box
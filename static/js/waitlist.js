@@ -1,31 +1,5 @@
 // Waitlist join functionality
 
-// Helper function to add timeout to fetch requests
-function fetchWithTimeout(url, options = {}, timeoutMs = 30000) {
-    const controller = new AbortController();
-    const timeoutId = setTimeout(() => {
-        controller.abort();
-    }, timeoutMs);
-
-    const fetchOptions = {
-        ...options,
-        signal: controller.signal
-    };
-
-    return fetch(url, fetchOptions)
-        .then(response => {
-            clearTimeout(timeoutId);
-            return response;
-        })
-        .catch(error => {
-            clearTimeout(timeoutId);
-            if (error.name === 'AbortError') {
-                throw new Error(`Request timed out after ${timeoutMs / 1000} seconds`);
-            }
-            throw error;
-        });
-}
-
 document.addEventListener('DOMContentLoaded', function () {
     const joinWaitlistBtn = document.getElementById('joinWaitlistBtn');
 
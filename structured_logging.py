@@ -0,0 +1,152 @@
+"""Non-blocking, structured logging.
+
+``configure_logging`` replaces the root handlers with a QueueHandler, so
+the threads that log only redact and enqueue the record; a QueueListener
+thread formats and writes it. With LOG_FORMAT=json each record is one JSON
+line carrying the request and session ids of the request that logged it.
+Long hex runs (model data), values of sensitive fields and oversized
+messages are redacted or truncated before they leave the calling thread.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import traceback
+from datetime import datetime, timezone
+
+from json_codec import dumps
+
+DEFAULT_MAX_MESSAGE_CHARS = 4000
+# Hex encoded model data; shorter runs (digests, ids) are kept
+_HEX_RUN = re.compile(r"[0-9a-fA-F]{128,}")
+# key=value / "key": "value" pairs whose key looks sensitive
+_SENSITIVE_PAIR = re.compile(
+    r"""(['"]?(?:password|passwd|secret|token|api[_-]?key|authorization|cookie)['"]?\s*[:=]\s*)"""
+    r"""('[^']*'|"[^"]*"|[^\s,;}]+)""",
+    re.IGNORECASE,
+)
+
+_listener = None
+
+
+def redact(text, max_chars=DEFAULT_MAX_MESSAGE_CHARS):
+    """Strip model data and secrets from a log message and cap its length."""
+    text = _HEX_RUN.sub(lambda match: f"<{len(match.group())} hex chars>", text)
+    text = _SENSITIVE_PAIR.sub(r"\1[REDACTED]", text)
+    if len(text) > max_chars:
+        text = f"{text[:max_chars]}... <{len(text) - max_chars} more chars>"
+    return text
+
+
+class ContextFilter(logging.Filter):
+    """Tag records with the request and session ids of the logging thread."""
+
+    def __init__(self, context):
+        super().__init__()
+        self.context = context
+
+    def filter(self, record):
+        try:
+            record.request_id, record.session_id = self.context()
+        except Exception:
+            record.request_id, record.session_id = None, None
+        return True
+
+
+class RedactingFormatter(logging.Formatter):
+    """Render the message (and traceback) of a record in redacted form.
+
+    Used by the QueueHandler, whose prepare() stores the result as the
+    record's message before it is enqueued.
+    """
+
+    def __init__(self, max_chars):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def format(self, record):
+        message = redact(record.getMessage(), self.max_chars)
+        if record.exc_info:
+            message += "\n" + redact(
+                "".join(traceback.format_exception(*record.exc_info)),
+                self.max_chars,
+            ).rstrip()
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc)
+            .isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for field in ("request_id", "session_id"):
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        return dumps(entry)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__(
+            "%(asctime)s %(levelname)s [%(request_id)s %(session_id)s] "
+            "%(name)s: %(message)s"
+        )
+
+    def format(self, record):
+        record.request_id = getattr(record, "request_id", None) or "-"
+        record.session_id = getattr(record, "session_id", None) or "-"
+        return super().format(record)
+
+
+def configure_logging(level="INFO", log_format="json", context=None,
+                      max_chars=DEFAULT_MAX_MESSAGE_CHARS, stream=None):
+    """Route all logging through a background writer thread.
+
+    context, if given, returns (request_id, session_id) for the current
+    thread. Safe to call again (e.g. in a forked worker): the previous
+    listener is stopped first.
+    """
+    global _listener
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+
+    records = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.setFormatter(RedactingFormatter(max_chars))
+    if context is not None:
+        handler.addFilter(ContextFilter(context))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    numeric_level = logging.getLevelName(str(level).upper())
+    root.setLevel(numeric_level if isinstance(numeric_level, int) else logging.INFO)
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,66 @@
+import threading
+import time
+
+
+class TemplateCache:
+    """Starter responses for well-known design types, shared by every user.
+
+    Resetting to a design type returns the same welcome message and starter
+    geometry for everyone, so the first response for each type is kept and
+    replayed. Only known design types are cached; the cache is cleared when
+    the backend's list of design types changes and entries expire after
+    ``ttl_seconds`` in case the starter geometry changes.
+    """
+
+    def __init__(self, design_types=(), ttl_seconds=3600.0, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._design_types = frozenset(design_types)
+        # design_type -> (stored_at, response body)
+        self._entries = {}
+
+    def get(self, design_type):
+        """Return a copy of the cached response body for a design type, or None."""
+        with self._lock:
+            entry = self._entries.get(design_type)
+            if entry is None:
+                return None
+            stored_at, body = entry
+            if self._clock() - stored_at > self.ttl_seconds:
+                del self._entries[design_type]
+                return None
+            return dict(body)
+
+    def put(self, design_type, body):
+        """Cache the response body for a known design type."""
+        with self._lock:
+            if design_type in self._design_types:
+                self._entries[design_type] = (self._clock(), dict(body))
+
+    def sync_design_types(self, design_types):
+        """Update the known design types, clearing the cache if they changed.
+
+        Returns True if the list changed.
+        """
+        design_types = frozenset(design_types)
+        with self._lock:
+            if design_types == self._design_types:
+                return False
+            self._design_types = design_types
+            self._entries.clear()
+            return True
+
+    def missing(self):
+        """Return the known design types that have no cached response."""
+        with self._lock:
+            return sorted(self._design_types - set(self._entries))
+
+    def pinned_paths(self):
+        """Return the model artifact paths referenced by cached templates."""
+        with self._lock:
+            return {
+                body["model"]["path"]
+                for _, body in self._entries.values()
+                if body.get("model")
+            }
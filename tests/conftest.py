@@ -0,0 +1,98 @@
+import json
+import os
+import struct
+
+import pytest
+
+# Before the app is imported: an in-memory database and quiet logs
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def stl_bytes(triangles=1):
+    """Binary STL with the given number of (all zero) triangles."""
+    return b"\0" * 80 + struct.pack("<I", triangles) + bytes(50 * triangles)
+
+
+def cube_triangles():
+    """The 12 outward-facing triangles of the unit cube [0, 1]^3."""
+    corners = [(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)]
+    faces = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+             (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+    return [[corners[i] for i in face] for face in faces]
+
+
+def ascii_stl(triangles):
+    facets = "".join(
+        "facet normal 0 0 0\nouter loop\n"
+        + "".join(f"vertex {x} {y} {z}\n" for x, y, z in triangle)
+        + "endloop\nendfacet\n"
+        for triangle in triangles
+    )
+    return f"solid model\n{facets}endsolid model\n".encode("ascii")
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.content = json.dumps(body).encode("utf-8")
+        self.text = self.content.decode("utf-8")
+
+
+class FakeBackend:
+    """Stands in for the backend's pooled HTTP session."""
+
+    def __init__(self):
+        # The welcome model and generated models differ, so a generated
+        # step is the only reference to its file
+        self.model = stl_bytes()
+        self.generated_model = stl_bytes(2)
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls.append(("GET", endpoint))
+        if endpoint == "trajectory":
+            return FakeResponse({"html_content": "<p>trajectory</p>"})
+        return FakeResponse({
+            "design_types": ["coffee_table"],
+            "message": "Welcome",
+            "data": self.model.hex(),
+            "format": "stl",
+        })
+
+    def post(self, url, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        self.calls.append(("POST", endpoint))
+        return FakeResponse(
+            {"response": "done", "data": self.generated_model.hex()})
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    import app as app_module
+    from artifact_storage import LocalArtifactStorage
+
+    app_module.create_app()
+    monkeypatch.setattr(app_module, "artifact_storage",
+                        LocalArtifactStorage(str(tmp_path)))
+    # Thumbnails render on a background pool that could outlive the test
+    monkeypatch.setattr(app_module, "schedule_thumbnail",
+                        lambda name, data: None)
+    return app_module
+
+
+@pytest.fixture
+def backend(app_module, monkeypatch):
+    fake = FakeBackend()
+    monkeypatch.setattr(app_module, "get_backend_http", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def client(app_module, backend):
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session["authenticated"] = True
+    return client
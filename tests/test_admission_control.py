@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from admission_control import AdmissionController, AdmissionRejected
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_busy_session_is_rejected_straight_away():
+    controller = AdmissionController(max_per_session=1, max_global=4)
+
+    with controller.admit("a"):
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.admit("a")
+        with controller.admit("b"):
+            pass
+
+    assert rejected.value.reason == AdmissionController.SESSION_BUSY
+
+
+def test_full_queue_rejects_without_leaking_the_session():
+    controller = AdmissionController(max_global=1, max_queue=0)
+
+    with controller.admit("a"):
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.admit("b")
+
+    assert rejected.value.reason == AdmissionController.QUEUE_FULL
+    assert rejected.value.retry_after == 30
+    assert controller._sessions == {}
+
+
+def test_queued_call_is_told_its_position_and_admitted_in_turn():
+    controller = AdmissionController(max_global=1, max_queue=2)
+    positions = {"b": [], "c": []}
+    admitted = []
+    finish = {"b": threading.Event(), "c": threading.Event()}
+
+    def wait_in_queue(session_id):
+        with controller.admit(session_id, positions[session_id].append):
+            admitted.append(session_id)
+            finish[session_id].wait(2)
+
+    slot = controller.admit("a")
+    waiters = []
+    for session_id in ("b", "c"):
+        waiter = threading.Thread(target=wait_in_queue, args=(session_id,))
+        waiter.start()
+        waiters.append(waiter)
+        wait_for(lambda: positions[session_id])
+    slot.__exit__(None, None, None)
+    wait_for(lambda: positions["c"] == [2, 1])
+    assert admitted == ["b"]
+    finish["b"].set()
+    finish["c"].set()
+    for waiter in waiters:
+        waiter.join(2)
+
+    assert admitted == ["b", "c"]
+    assert positions == {"b": [1], "c": [2, 1]}
+    assert controller.stats()["in_flight"] == 0
+    assert controller._sessions == {}
+
+
+def test_queued_call_gives_up_after_queue_timeout():
+    controller = AdmissionController(max_global=1, queue_timeout=0.05)
+
+    with controller.admit("a"):
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.admit("b")
+
+    assert rejected.value.reason == AdmissionController.QUEUE_TIMEOUT
+    assert controller.stats()["queued"] == 0
+    assert "b" not in controller._sessions
+
+
+def test_retry_after_follows_how_long_calls_hold_their_slot():
+    clock = FakeClock()
+    controller = AdmissionController(max_global=1, max_queue=0, clock=clock)
+    with controller.admit("a"):
+        clock.now += 10
+
+    with controller.admit("a"):
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.admit("b")
+
+    # 0.8 * 30 + 0.2 * 10
+    assert rejected.value.retry_after == 26
+
+
+def test_rejected_prompt_gets_429_with_retry_after(
+        client, backend, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "heavy_calls",
+                        AdmissionController(max_global=1, max_queue=0))
+
+    with app_module.heavy_calls.admit("another session"):
+        response = client.post(
+            "/generate", json={"command": "cube", "message_index": 1})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert response.get_json()["reason"] == AdmissionController.QUEUE_FULL
+    assert backend.calls == []
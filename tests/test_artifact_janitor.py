@@ -0,0 +1,62 @@
+import os
+
+from artifact_janitor import Artifact, ArtifactJanitor
+
+NOW = 10_000.0
+
+
+def artifact(name, size, last_used, session=None, age=1_000.0):
+    return Artifact(path=f"/a/{name}", name=name, size=size,
+                    last_used=last_used, modified=NOW - age, session=session)
+
+
+def names(artifacts):
+    return sorted(a.name for a in artifacts)
+
+
+def test_evicts_least_recently_used_until_within_budget():
+    janitor = ArtifactJanitor([], max_total_bytes=250)
+    artifacts = [artifact("old", 100, 1), artifact("mid", 100, 2),
+                 artifact("new", 100, 3)]
+
+    assert names(janitor.select_evictions(artifacts, now=NOW)) == ["old"]
+
+
+def test_evicts_from_sessions_over_quota_first():
+    janitor = ArtifactJanitor([], max_total_bytes=1_000, max_session_bytes=150)
+    artifacts = [
+        artifact("a-old", 100, 5, session="a"),
+        artifact("a-new", 100, 6, session="a"),
+        artifact("b-oldest", 100, 1, session="b"),
+    ]
+
+    # Within the global budget, but session a is over its quota
+    assert names(janitor.select_evictions(artifacts, now=NOW)) == ["a-old"]
+
+
+def test_spares_young_and_protected_files():
+    janitor = ArtifactJanitor(
+        [], max_total_bytes=0, grace_seconds=60,
+        is_protected=lambda path: path.endswith("pinned"))
+    artifacts = [artifact("young", 100, 1, age=10),
+                 artifact("pinned", 100, 1), artifact("old", 100, 2)]
+
+    assert names(janitor.select_evictions(artifacts, now=NOW)) == ["old"]
+
+
+def test_run_once_removes_files_and_reports(tmp_path):
+    for name, atime in (("model-a.stl", 1_000), ("model-b.stl", 2_000),
+                        ("other.txt", 1_000)):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (atime, atime))
+    janitor = ArtifactJanitor([(str(tmp_path), "model-")],
+                              max_total_bytes=150, grace_seconds=0)
+
+    report = janitor.run_once()
+
+    assert report["evicted_files"] == 1
+    assert report["reclaimed_bytes"] == 100
+    assert report["usage_bytes"] == 100
+    assert sorted(os.listdir(tmp_path)) == ["model-b.stl", "other.txt"]
+    assert janitor.stats()["evicted_files_total"] == 1
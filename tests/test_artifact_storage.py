@@ -0,0 +1,88 @@
+import pytest
+
+from artifact_storage import (ArtifactStorage, CachedArtifactStorage,
+                              S3ArtifactStorage)
+
+
+class FakeClientError(Exception):
+    """Shaped like botocore's ClientError for a missing key."""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeBody:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class FakeS3Client:
+    """The subset of the boto3 S3 client S3ArtifactStorage uses."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = bytes(Body)
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeClientError("NoSuchKey")
+        return {"Body": FakeBody(self.objects[(Bucket, Key)])}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeClientError("404")
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+def test_storage_interface_is_abstract():
+    with pytest.raises(TypeError):
+        ArtifactStorage()
+
+
+def test_s3_round_trip():
+    client = FakeS3Client()
+    storage = S3ArtifactStorage("models", prefix="/artifacts/", client=client)
+
+    storage.save("model-a.stl", b"solid")
+    assert ("models", "artifacts/model-a.stl") in client.objects
+    assert storage.exists("model-a.stl")
+    assert storage.size("model-a.stl") == 5
+    assert storage.read("model-a.stl") == b"solid"
+    assert storage.local_path("model-a.stl") is None
+
+    storage.delete("model-a.stl")
+    storage.delete("model-a.stl")
+    assert not storage.exists("model-a.stl")
+    with pytest.raises(FileNotFoundError):
+        storage.read("model-a.stl")
+    with pytest.raises(FileNotFoundError):
+        storage.size("model-a.stl")
+
+
+def test_cached_storage_reads_through_and_evicts_locally(tmp_path):
+    client = FakeS3Client()
+    backend = S3ArtifactStorage("models", client=client)
+    storage = CachedArtifactStorage(backend, str(tmp_path))
+
+    storage.save("model-a.stl", b"solid")
+    storage.evict_local("model-a.stl")
+    assert not (tmp_path / "model-a.stl").exists()
+
+    # A miss is fetched from the bucket and kept on disk
+    assert storage.read("model-a.stl") == b"solid"
+    assert storage.local_path("model-a.stl") == str(tmp_path / "model-a.stl")
+    assert storage.local_directory() == str(tmp_path)
+
+    storage.delete("model-a.stl")
+    assert client.objects == {}
+    assert not storage.exists("model-a.stl")
+    assert storage.local_path("model-a.stl") is None
@@ -0,0 +1,17 @@
+UPGRADE = {"Connection": "Upgrade", "Upgrade": "websocket",
+           "Sec-WebSocket-Key": "dGhlIHNhbXBsZSBub25jZQ==",
+           "Sec-WebSocket-Version": "13"}
+
+
+def test_cross_site_upgrade_is_refused(client):
+    response = client.get("/ws?tab_id=t1", headers={
+        **UPGRADE, "Origin": "https://evil.example"})
+    assert response.status_code == 403
+
+
+def test_same_origin_upgrade_passes_the_check(app_module):
+    with app_module.app.test_request_context(
+            "/ws?tab_id=t1", base_url="http://morfis.example",
+            headers={**UPGRADE, "Origin": "http://morfis.example"}):
+        assert app_module.request.endpoint == "chat_channel"
+        assert app_module.check_channel_origin() is None
@@ -0,0 +1,91 @@
+import pytest
+
+from circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_breaker(clock, **kwargs):
+    options = dict(window_size=4, minimum_calls=4, open_seconds=10.0,
+                   clock=clock)
+    options.update(kwargs)
+    return CircuitBreaker("backend", **options)
+
+
+def test_opens_once_failure_rate_crosses_threshold(clock):
+    breaker = make_breaker(clock)
+    breaker.record_success()
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    clock.now = 4.0
+    assert breaker.retry_after() == 6
+
+
+def test_slow_calls_open_the_circuit(clock):
+    breaker = make_breaker(clock, slow_call_rate_threshold=0.75)
+    for _ in range(3):
+        breaker.record_success(duration=5.0, slow_call_seconds=2.0)
+    breaker.record_success(duration=1.0, slow_call_seconds=2.0)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+
+    clock.now = 10.0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    # Only one probe at a time
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+    assert breaker.snapshot()["calls"] == 0
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_after() == 10
+
+
+def test_release_gives_back_the_probe_slot(clock):
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.allow_request()
+
+    breaker.release()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
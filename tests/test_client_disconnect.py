@@ -0,0 +1,86 @@
+import socket
+import threading
+import time
+
+import pytest
+import requests
+
+from client_disconnect import (CancellableSession, ClientDisconnected,
+                               call_unless_disconnected)
+
+
+@pytest.fixture
+def silent_server():
+    """A server that accepts connections and never answers."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    accepted = []
+
+    def accept():
+        while True:
+            try:
+                accepted.append(server.accept()[0])
+            except OSError:
+                return
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}/"
+    server.close()
+    for connection in accepted:
+        connection.close()
+
+
+def test_cancel_fails_the_call_in_flight(silent_server):
+    http = CancellableSession()
+    errors = []
+
+    def call():
+        try:
+            http.get(silent_server, timeout=30)
+        except requests.RequestException as e:
+            errors.append(e)
+
+    caller = threading.Thread(target=call)
+    started = time.monotonic()
+    caller.start()
+    time.sleep(0.2)
+    http.cancel()
+    caller.join(5)
+
+    assert not caller.is_alive()
+    assert time.monotonic() - started < 5
+    assert len(errors) == 1
+    assert http.cancelled
+
+
+def test_disconnect_cancels_and_waits_for_the_call():
+    client, peer = socket.socketpair()
+    cancelled = threading.Event()
+    events = []
+
+    def func():
+        cancelled.wait(5)
+        events.append("call finished")
+
+    def cancel():
+        events.append("cancelled")
+        cancelled.set()
+
+    peer.close()
+    with pytest.raises(ClientDisconnected):
+        call_unless_disconnected(
+            func, {"werkzeug.socket": client}, cancel, poll_interval=0.01)
+    # The caller's admission slot is released only after the call ended
+    assert events == ["cancelled", "call finished"]
+    client.close()
+
+
+def test_result_is_returned_while_client_is_connected():
+    client, peer = socket.socketpair()
+    result = call_unless_disconnected(
+        lambda: 42, {"werkzeug.socket": client}, lambda: None,
+        poll_interval=0.01)
+    assert result == 42
+    client.close()
+    peer.close()
@@ -0,0 +1,29 @@
+CSS_FILE = "/static/css/style.css"
+CAD_FILE = "/static/cadmodels/994.step"
+
+
+def test_compressed_response_revalidates_with_its_etag(client):
+    first = client.get(CSS_FILE, headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["Content-Encoding"] == "gzip"
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    again = client.get(CSS_FILE, headers={
+        "Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+
+
+def test_uncompressed_response_keeps_strong_etag(client):
+    response = client.get(CSS_FILE, headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"].startswith('"')
+
+
+def test_cad_artifacts_are_not_compressed(client):
+    response = client.get(CAD_FILE, headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"].startswith('"')
@@ -0,0 +1,68 @@
+import json
+from datetime import datetime, timedelta
+
+from design_channel import DesignChannel
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+
+    def send(self, data):
+        self.sent.append(json.loads(data))
+
+    def close(self, reason=None, message=None):
+        self.closed_with = (reason, message)
+
+
+def iso(delta):
+    return (datetime.utcnow() + delta).isoformat()
+
+
+def test_channel_closes_once_its_login_expires(app_module):
+    ws = FakeWebSocket()
+    handled = []
+    channel = DesignChannel(
+        ws, "s1", {"trajectory": lambda *args: handled.append(args)},
+        authorize=app_module.channel_login_valid)
+    channel.login_time = iso(-timedelta(hours=2))
+
+    channel._dispatch(json.dumps({"id": 1, "type": "trajectory"}))
+
+    assert handled == []
+    assert ws.sent == [
+        {"type": "result", "id": 1, "status": 401,
+         "body": {"error": "Login expired"}},
+        {"type": "reauth"},
+    ]
+    assert ws.closed_with == (1008, "Login expired")
+    assert channel.closed.is_set()
+
+
+def test_ping_token_extends_channel_login(app_module, client):
+    with client.session_transaction() as session:
+        session["login_time"] = iso(-timedelta(minutes=50))
+
+    response = client.post("/api/ping")
+
+    assert response.status_code == 200
+    with client.session_transaction() as session:
+        assert not app_module.login_expired(session["login_time"])
+        assert session["login_time"] > iso(-timedelta(minutes=1))
+    channel = DesignChannel(FakeWebSocket(), "s1", {})
+    channel.login_time = iso(-timedelta(minutes=59))
+    status, _ = app_module.handle_channel_reauth(
+        channel, 1, {"token": response.get_json()["token"]})
+    assert status == 200
+    assert channel.login_time > iso(-timedelta(minutes=1))
+
+    status, _ = app_module.handle_channel_reauth(channel, 2, {"token": "forged"})
+    assert status == 401
+
+
+def test_ping_requires_a_current_login(app_module, client):
+    with client.session_transaction() as session:
+        session["login_time"] = iso(-timedelta(hours=2))
+
+    assert client.post("/api/ping").status_code == 401
@@ -0,0 +1,27 @@
+def test_open_channels_are_not_counted_as_requests(app_module):
+    upgrade = {"Connection": "Upgrade", "Upgrade": "websocket"}
+    with app_module.app.test_request_context("/ws?tab_id=t1", headers=upgrade):
+        assert app_module.request.endpoint == "chat_channel"
+        before = app_module.request_gauge.active
+        app_module.count_request()
+        assert app_module.request_gauge.active == before
+
+
+def test_readyz_saturated_only_when_free_threads_are_busy(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "WORKER_THREADS", 4)
+    client = app_module.app.test_client()
+    for _ in range(2):
+        app_module.channel_gauge.enter()
+    try:
+        response = client.get("/readyz")
+        assert response.get_json()["workers"]["open_channels"] == 2
+        assert not response.get_json()["workers"]["saturated"]
+
+        app_module.channel_gauge.enter()
+        try:
+            assert client.get("/readyz").get_json()["workers"]["saturated"]
+        finally:
+            app_module.channel_gauge.exit()
+    finally:
+        for _ in range(2):
+            app_module.channel_gauge.exit()
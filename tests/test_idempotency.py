@@ -0,0 +1,194 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from idempotency import (DONE, RUNNING, IdempotencyKeyMismatch,
+                         IdempotencyStore, SharedIdempotencyKeys)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Calls:
+    """A func that counts its calls and returns the count."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        return {"call": self.count}
+
+
+def test_retry_attaches_to_call_in_flight():
+    store = IdempotencyStore()
+    release = threading.Event()
+    calls = Calls()
+
+    def slow_call():
+        release.wait(2)
+        return calls()
+
+    first = store.submit("key", "fp", slow_call)
+    second = store.submit("key", "fp", slow_call)
+    release.set()
+
+    assert second is first
+    assert first.result(2) == {"call": 1}
+    assert calls.count == 1
+
+
+def test_result_is_stored_until_ttl():
+    clock = FakeClock()
+    store = IdempotencyStore(ttl_seconds=10, clock=clock)
+    calls = Calls()
+
+    store.submit("key", "fp", calls).result(2)
+    clock.now = 9
+    assert store.submit("key", "fp", calls).result(2) == {"call": 1}
+    clock.now = 10
+    assert store.submit("key", "fp", calls).result(2) == {"call": 2}
+
+
+def test_failed_and_unkept_calls_are_forgotten():
+    store = IdempotencyStore()
+    calls = Calls()
+
+    def failing():
+        raise RuntimeError("backend down")
+
+    with pytest.raises(RuntimeError):
+        store.submit("key", "fp", failing).result(2)
+    store.submit("key", "fp", calls, keep=lambda result: False).result(2)
+    store.submit("key", "fp", calls).result(2)
+
+    assert calls.count == 2
+    assert store.stats() == {"in_flight": 0, "stored": 1}
+
+
+def test_key_reused_for_another_request_is_rejected():
+    store = IdempotencyStore()
+    store.submit("key", "fp", Calls()).result(2)
+
+    with pytest.raises(IdempotencyKeyMismatch):
+        store.submit("key", "other fp", Calls())
+
+
+@pytest.fixture
+def records(app_module):
+    db, model = app_module.db, app_module.IdempotencyRecord
+    with app_module.app.app_context():
+        model.query.delete()
+        db.session.commit()
+        yield db, model
+        model.query.delete()
+        db.session.commit()
+
+
+def shared_keys(records, **kwargs):
+    """A process's view of the shared keys (each process has its own)."""
+    db, model = records
+    return SharedIdempotencyKeys(db, model, poll_interval=0.01, **kwargs)
+
+
+def test_stored_result_is_replayed_by_another_process(records):
+    calls = Calls()
+    assert shared_keys(records).run("key", "fp", calls) == {"call": 1}
+
+    assert shared_keys(records).run("key", "fp", calls) == {"call": 1}
+    assert calls.count == 1
+
+
+def test_retry_waits_for_call_running_in_another_process(records):
+    owner = shared_keys(records)
+    assert owner._claim("key", "fp") == (True, RUNNING, None)
+    polls = []
+
+    def finish_on_first_poll(seconds):
+        polls.append(seconds)
+        owner._finish("key", {"call": "owner"})
+
+    calls = Calls()
+    retry = shared_keys(records, sleep=finish_on_first_poll)
+
+    assert retry.run("key", "fp", calls) == {"call": "owner"}
+    assert calls.count == 0
+    assert len(polls) == 1
+
+
+def test_expired_result_and_abandoned_claim_run_again(records):
+    db, model = records
+    calls = Calls()
+    shared_keys(records, ttl_seconds=0).run("key", "fp", calls)
+    assert shared_keys(records).run("key", "fp", calls) == {"call": 2}
+
+    shared_keys(records, lease_seconds=0)._claim("dead", "fp")
+    assert shared_keys(records).run("dead", "fp", calls) == {"call": 3}
+    assert model.query.filter_by(record_key="dead").one().status == DONE
+
+
+def test_failed_call_releases_the_key(records):
+    db, model = records
+
+    def failing():
+        raise RuntimeError("backend down")
+
+    with pytest.raises(RuntimeError):
+        shared_keys(records).run("key", "fp", failing)
+
+    assert model.query.count() == 0
+
+
+def test_shared_key_reused_for_another_request_is_rejected(records):
+    shared_keys(records).run("key", "fp", Calls())
+
+    with pytest.raises(IdempotencyKeyMismatch):
+        shared_keys(records).run("key", "other fp", Calls())
+
+
+def test_expired_results_are_purged(records):
+    db, model = records
+    db.session.add(model(record_key="old", fingerprint="fp", status=DONE,
+                         result="{}",
+                         expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+    shared_keys(records).run("key", "fp", Calls())
+
+    assert [record.record_key for record in model.query.all()] == ["key"]
+
+
+def test_keyed_prompt_runs_once_across_processes(
+        client, backend, app_module, monkeypatch, records):
+    sent = []
+    post = backend.post
+
+    def recording_post(url, **kwargs):
+        sent.append(kwargs["headers"])
+        return post(url, **kwargs)
+
+    monkeypatch.setattr(backend, "post", recording_post)
+    client.get("/api/config")
+    headers = {"Idempotency-Key": "prompt-1", "X-Request-Timeout": "5000"}
+    payload = {"command": "cube", "message_index": 1}
+
+    started = time.time()
+    first = client.post("/generate", json=payload, headers=headers)
+    # A retry landing on another worker process
+    monkeypatch.setattr(app_module, "idempotency_store", IdempotencyStore())
+    retry = client.post("/generate", json=payload, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json() == first.get_json()
+    assert [call for call in backend.calls if call[1] == "process-prompt"] \
+        == [("POST", "process-prompt")]
+    # The keyed call carries the client's deadline, not the endpoint's
+    deadline = float(sent[0]["X-Request-Deadline"])
+    assert started < deadline <= time.time() + 5
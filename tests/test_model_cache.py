@@ -0,0 +1,33 @@
+from model_cache import ModelCache
+
+
+def make_cache():
+    evicted = []
+    return ModelCache(on_evict=evicted.append), evicted
+
+
+def test_put_replacing_step_with_same_path_keeps_file():
+    cache, evicted = make_cache()
+    cache.put("s", 1, {"path": "a.stl"}, 10)
+    cache.put("s", 1, {"path": "a.stl"}, 10)
+    assert evicted == []
+    assert cache.get("s", 1) == {"path": "a.stl"}
+
+
+def test_put_with_clear_keeps_file_shared_with_dropped_step():
+    cache, evicted = make_cache()
+    cache.put("s", 0, {"path": "a.stl"}, 10)
+    cache.put("s", 1, {"path": "b.stl"}, 10)
+    cache.put("s", 0, {"path": "a.stl"}, 10, clear=True)
+    assert evicted == ["b.stl"]
+    assert [index for index, _ in cache.steps("s")] == [0]
+
+
+def test_put_with_truncate_drops_later_steps():
+    cache, evicted = make_cache()
+    for index, path in enumerate(["a.stl", "b.stl", "c.stl"]):
+        cache.put("s", index, {"path": path}, 10)
+    cache.put("s", 1, {"path": "c.stl"}, 10, truncate=True)
+    assert evicted == ["b.stl"]
+    assert cache.steps("s") == [(0, {"path": "a.stl"}), (1, {"path": "c.stl"})]
+    assert cache.stats()["bytes"] == 20
@@ -0,0 +1,44 @@
+"""Model files referenced by a response must still exist afterwards."""
+
+from template_cache import TemplateCache
+
+
+def model_url(model):
+    return "/" + model["path"]
+
+
+def test_config_reload_keeps_model_file(client):
+    for _ in range(2):
+        model = client.get("/api/config").get_json()["model"]
+        assert client.get(model_url(model)).status_code == 200
+
+
+def test_regenerate_same_step_keeps_model_file(client):
+    client.get("/api/config")
+    for _ in range(2):
+        response = client.post(
+            "/generate", json={"command": "add legs", "message_index": 1})
+        model = response.get_json()["model"]
+        assert client.get(model_url(model)).status_code == 200
+
+
+def test_eviction_keeps_shared_starter_model(client, app_module, monkeypatch):
+    client.get("/api/config")
+    model = client.post("/new_design", json={"type": "coffee_table"}).get_json()["model"]
+    name = app_module.artifact_name(model["path"])
+    assert app_module.artifact_session(name) is None
+    # This worker's template entry is gone, other workers may still use it
+    monkeypatch.setattr(app_module, "template_cache", TemplateCache())
+
+    app_module.remove_model_file(model["path"])
+
+    assert app_module.artifact_storage.exists(name)
+
+
+def test_eviction_removes_session_model(client, app_module):
+    model = client.get("/api/config").get_json()["model"]
+    name = app_module.artifact_name(model["path"])
+
+    app_module.remove_model_file(model["path"])
+
+    assert not app_module.artifact_storage.exists(name)
@@ -0,0 +1,65 @@
+import struct
+
+import pytest
+
+from conftest import ascii_stl, cube_triangles
+
+np = pytest.importorskip("numpy")
+
+from model_metadata import parse_stl, stl_metadata  # noqa: E402
+
+
+def binary_stl(triangles, header=b""):
+    records = b"".join(
+        struct.pack("<3f", 0, 0, 0)
+        + b"".join(struct.pack("<3f", *vertex) for vertex in triangle)
+        + b"\0\0"
+        for triangle in triangles
+    )
+    return (header.ljust(80, b"\0") + struct.pack("<I", len(triangles))
+            + records)
+
+
+def test_closed_cube_metadata():
+    metadata = stl_metadata(binary_stl(cube_triangles()))
+
+    assert metadata["triangles"] == 12
+    assert metadata["vertices"] == 8
+    assert metadata["closed"] is True
+    assert metadata["bbox"] == {"min": [0, 0, 0], "max": [1, 1, 1],
+                                "size": [1, 1, 1]}
+    assert metadata["surface_area"] == pytest.approx(6.0)
+    assert metadata["volume"] == pytest.approx(1.0)
+    assert metadata["centroid"] == pytest.approx([0.5, 0.5, 0.5])
+
+
+def test_open_mesh_has_no_volume():
+    metadata = stl_metadata(binary_stl(cube_triangles()[:-2]))
+
+    assert metadata["closed"] is False
+    assert metadata["volume"] is None
+    assert metadata["surface_area"] == pytest.approx(5.0)
+
+
+def test_ascii_and_solid_headed_binary_parse_alike():
+    triangles = cube_triangles()
+    expected = np.array(triangles, dtype=np.float32)
+
+    assert np.array_equal(parse_stl(ascii_stl(triangles)), expected)
+    # Binary files whose header starts with "solid" are still binary
+    assert np.array_equal(
+        parse_stl(binary_stl(triangles, header=b"solid exported")), expected)
+
+
+def test_non_finite_triangles_are_ignored():
+    triangles = cube_triangles() + [[(float("nan"), 0, 0), (0, 0, 0), (1, 1, 1)]]
+
+    metadata = stl_metadata(binary_stl(triangles))
+
+    assert metadata["triangles"] == 12
+    assert metadata["volume"] == pytest.approx(1.0)
+
+
+def test_incomplete_ascii_triangle_is_rejected():
+    with pytest.raises(ValueError):
+        parse_stl(b"solid x\nvertex 0 0 0\nvertex 1 1 1\nendsolid x\n")
@@ -0,0 +1,32 @@
+def start_cached_design(client, backend):
+    """Start a design once so its starter response is in the template cache."""
+    client.get("/api/config")
+    assert client.post("/new_design", json={"type": "coffee_table"}).status_code == 200
+    backend.calls.clear()
+
+
+def test_cached_new_design_resets_backend_before_answering(
+        client, backend, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "BACKGROUND_BACKEND_SYNC", False)
+    start_cached_design(client, backend)
+    scheduled = []
+    monkeypatch.setattr(app_module, "schedule_backend_sync",
+                        lambda *args: scheduled.append(args))
+
+    response = client.post("/new_design", json={"type": "coffee_table"})
+
+    assert response.status_code == 200
+    assert response.get_json()["model"]
+    assert backend.calls == [("POST", "reset")]
+    assert scheduled == []
+
+
+def test_cached_new_design_in_background_is_awaited_by_next_call(
+        client, backend, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "BACKGROUND_BACKEND_SYNC", True)
+    start_cached_design(client, backend)
+
+    assert client.post("/new_design", json={"type": "coffee_table"}).status_code == 200
+    client.post("/generate", json={"command": "add legs", "message_index": 1})
+
+    assert backend.calls == [("POST", "reset"), ("POST", "process-prompt")]
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from outbox import DEAD, PENDING, REJECTED, SENDING, SENT, OutboxWorker, enqueue
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.text = f"status {status_code}"
+
+
+@pytest.fixture
+def outbox(app_module):
+    db, model = app_module.db, app_module.OutboxMessage
+    with app_module.app.app_context():
+        model.query.delete()
+        db.session.commit()
+        yield db, model
+        model.query.delete()
+        db.session.commit()
+
+
+def make_worker(app_module, outbox, send, **kwargs):
+    db, model = outbox
+    return OutboxWorker(app_module.app, db, model, send, base_backoff=10.0,
+                        lease_seconds=60.0, **kwargs)
+
+
+def add_message(outbox, key="feedback:1"):
+    db, model = outbox
+    assert enqueue(db, model, "feedback", key, {"rating": 1})
+    return model.query.filter_by(dedupe_key=key).one()
+
+
+def test_enqueue_dedupes_by_key(outbox):
+    db, model = outbox
+    add_message(outbox)
+    assert not enqueue(db, model, "feedback", "feedback:1", {"rating": 2})
+    assert model.query.count() == 1
+
+
+def test_claim_leases_messages_until_lease_expires(app_module, outbox):
+    message = add_message(outbox)
+    worker = make_worker(app_module, outbox, None)
+
+    assert [message_id for message_id, _ in worker._claim_batch()] == [message.id]
+    assert message.status == SENDING
+    assert message.next_attempt_at > datetime.utcnow() + timedelta(seconds=50)
+    # Leased: another worker doesn't claim it again
+    assert worker._claim_batch() == []
+
+    message.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    outbox[0].session.commit()
+    assert [message_id for message_id, _ in worker._claim_batch()] == [message.id]
+
+
+def test_sent_message_is_marked_sent(app_module, outbox):
+    message = add_message(outbox)
+    sent = []
+    worker = make_worker(
+        app_module, outbox,
+        lambda message, payload: sent.append(payload) or Response(200))
+
+    assert worker.run_once() == 1
+    assert sent == [{"rating": 1}]
+    assert message.status == SENT
+    assert worker.run_once() == 0
+
+
+def test_failed_send_backs_off_exponentially(app_module, outbox):
+    message = add_message(outbox)
+
+    def fail(message, payload):
+        raise ConnectionError("backend down")
+
+    worker = make_worker(app_module, outbox, fail)
+    for attempt, backoff in ((1, 10.0), (2, 20.0)):
+        message.next_attempt_at = datetime.utcnow()
+        outbox[0].session.commit()
+        before = datetime.utcnow()
+        worker.run_once()
+
+        assert message.status == PENDING
+        assert message.attempts == attempt
+        assert message.last_error == "backend down"
+        # Jittered between half and all of the backoff
+        delay = (message.next_attempt_at - before).total_seconds()
+        assert backoff * 0.5 - 1 <= delay <= backoff + 1
+
+
+def test_rate_limited_send_is_retried(app_module, outbox):
+    message = add_message(outbox)
+    make_worker(app_module, outbox, lambda m, p: Response(429)).run_once()
+    assert message.status == PENDING
+    assert message.attempts == 1
+
+
+def test_client_error_rejects_without_retry(app_module, outbox):
+    message = add_message(outbox)
+    make_worker(app_module, outbox, lambda m, p: Response(400)).run_once()
+    assert message.status == REJECTED
+    assert message.attempts == 0
+    assert message.last_error == "status 400"
+
+
+def test_gives_up_after_max_attempts(app_module, outbox):
+    message = add_message(outbox)
+    worker = make_worker(
+        app_module, outbox, lambda m, p: Response(503), max_attempts=2)
+    for _ in range(2):
+        message.next_attempt_at = datetime.utcnow()
+        outbox[0].session.commit()
+        worker.run_once()
+
+    assert message.status == DEAD
+    assert message.attempts == 2
+    assert worker.run_once() == 0
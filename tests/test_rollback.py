@@ -0,0 +1,30 @@
+def generate_steps(client, count):
+    client.get("/api/config")
+    for index in range(1, count + 1):
+        client.post("/generate",
+                    json={"command": f"step {index}", "message_index": index})
+
+
+def test_cached_rollback_resets_backend_before_answering(
+        client, backend, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "BACKGROUND_BACKEND_SYNC", False)
+    generate_steps(client, 2)
+    backend.calls.clear()
+
+    response = client.post("/rollback", json={"message_index": 1})
+
+    assert response.status_code == 200
+    assert response.get_json()["model"]
+    assert backend.calls == [("POST", "rollback")]
+
+
+def test_cached_rollback_in_background_is_awaited_by_next_call(
+        client, backend, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "BACKGROUND_BACKEND_SYNC", True)
+    generate_steps(client, 2)
+    backend.calls.clear()
+
+    assert client.post("/rollback", json={"message_index": 1}).status_code == 200
+    client.post("/generate", json={"command": "again", "message_index": 2})
+
+    assert backend.calls == [("POST", "rollback"), ("POST", "process-prompt")]
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_ONLY = """
+import os
+import threading
+
+# Libraries register their own hooks; only count the app's
+hooks = []
+os.register_at_fork = lambda **kwargs: hooks.extend(
+    hook for hook in kwargs.values() if hook.__module__ == "app")
+threads = threading.active_count()
+
+import app
+
+assert threading.active_count() == threads, "import started a thread"
+assert hooks == [], "import installed fork hooks"
+for name in ("artifact_storage", "artifact_janitor", "backend_breaker",
+             "background_backend_calls", "thumbnail_pool"):
+    assert getattr(app, name) is None, name
+assert "SQLALCHEMY_DATABASE_URI" not in app.app.config
+
+app.create_app()
+assert len(hooks) == 2
+assert app.artifact_storage is not None and app.artifact_janitor is not None
+assert app.app.config["SQLALCHEMY_DATABASE_URI"] == "sqlite://"
+"""
+
+
+def test_import_builds_nothing_until_create_app():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_ONLY],
+        cwd=ROOT,
+        env=dict(os.environ, DATABASE_URL="sqlite://", LOG_LEVEL="WARNING"),
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,67 @@
+import struct
+import zlib
+
+import pytest
+
+from conftest import cube_triangles
+
+np = pytest.importorskip("numpy")
+
+from thumbnail_renderer import (  # noqa: E402
+    MODEL_COLOR, encode_png, render_rgba, render_thumbnail)
+
+
+def decode_png(png):
+    """Return (width, height, pixels) of a PNG written by encode_png."""
+    assert png[:8] == b"\x89PNG\r\n\x1a\n"
+    chunks = {}
+    position = 8
+    while position < len(png):
+        length, = struct.unpack(">I", png[position:position + 4])
+        tag = png[position + 4:position + 8]
+        data = png[position + 8:position + 8 + length]
+        crc, = struct.unpack(">I", png[position + 8 + length:position + 12 + length])
+        assert crc == zlib.crc32(tag + data) & 0xFFFFFFFF
+        chunks[tag] = data
+        position += 12 + length
+    width, height, depth, color_type = struct.unpack(">IIBB", chunks[b"IHDR"][:10])
+    assert (depth, color_type) == (8, 6)
+    raw = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+    rows = raw.reshape(height, width * 4 + 1)
+    assert not rows[:, 0].any()
+    return width, height, rows[:, 1:].reshape(height, width, 4)
+
+
+def test_cube_is_centered_on_a_transparent_background():
+    image = render_rgba(cube_triangles(), size=32)
+
+    assert image.shape == (32, 32, 4)
+    assert image.dtype == np.uint8
+    for corner in (image[0, 0], image[0, -1], image[-1, 0], image[-1, -1]):
+        assert corner[3] == 0
+    center = image[16, 16]
+    assert center[3] == 255
+    # Shaded, never brighter than the model color
+    assert all(0 < channel <= limit for channel, limit in zip(center, MODEL_COLOR))
+
+
+def test_empty_and_non_finite_input_render_nothing():
+    nan_triangle = [[(float("nan"), 0, 0), (0, 0, 0), (1, 1, 1)]]
+
+    assert not render_rgba(np.zeros((0, 3, 3)), size=8).any()
+    assert not render_rgba(nan_triangle, size=8).any()
+
+
+def test_png_round_trips():
+    rgba = render_rgba(cube_triangles(), size=24)
+
+    width, height, pixels = decode_png(encode_png(rgba))
+
+    assert (width, height) == (24, 24)
+    assert np.array_equal(pixels, rgba)
+
+
+def test_render_thumbnail_uses_requested_size():
+    width, height, _ = decode_png(render_thumbnail(cube_triangles(), size=16))
+
+    assert (width, height) == (16, 16)
@@ -0,0 +1,176 @@
+"""CPU-only software rasterizer for small PNG thumbnails of STL models.
+
+Triangles are projected with a fixed three-quarter view, flat shaded and
+rasterized with a z-buffer entirely in numpy: triangles are grouped by
+their pixel footprint and each group is tested against its candidate
+pixels in one vectorized pass. The image is rendered at twice the target
+size and averaged down for anti-aliasing, then encoded as an RGBA PNG
+with a transparent background using only zlib.
+"""
+
+import struct
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # Optional: no thumbnails without it
+    np = None
+
+THUMBNAIL_SIZE = 160
+SUPERSAMPLE = 2
+# The viewer's default model color (#9146FF)
+MODEL_COLOR = (145, 70, 255)
+AMBIENT = 0.35
+# Fraction of the image left empty around the model
+MARGIN = 0.06
+# Upper bound on candidate pixels tested at once, to bound memory use
+MAX_CANDIDATES = 1 << 21
+
+
+def thumbnails_available():
+    return np is not None
+
+
+def _view_basis():
+    """Screen right, screen up and towards-camera unit vectors (Z up)."""
+    towards_camera = np.array([1.0, -1.0, 0.8])
+    towards_camera /= np.linalg.norm(towards_camera)
+    right = np.cross(-towards_camera, [0.0, 0.0, 1.0])
+    right /= np.linalg.norm(right)
+    up = np.cross(right, -towards_camera)
+    return right, up, towards_camera
+
+
+def _shading(triangles, towards_camera):
+    """Two-sided Lambert intensity per triangle, lit from above the camera."""
+    light = towards_camera + np.array([0.0, 0.0, 0.6])
+    light /= np.linalg.norm(light)
+    normals = np.cross(triangles[:, 1] - triangles[:, 0],
+                       triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    diffuse = np.abs(normals @ light) / lengths
+    return AMBIENT + (1.0 - AMBIENT) * diffuse
+
+
+def _rasterize(xs, ys, depth, size):
+    """Return, per pixel, the index of the nearest triangle (-1 if none).
+
+    xs, ys and depth are (n, 3) arrays of screen coordinates and depth
+    (larger is nearer) of each triangle's corners.
+    """
+    zbuffer = np.full(size * size, -np.inf)
+    owner = np.full(size * size, -1, dtype=np.int64)
+
+    # Pixels whose centers (i + 0.5) can fall inside each triangle
+    x_start = np.ceil(xs.min(axis=1) - 0.5).clip(0, size).astype(np.int64)
+    x_end = np.floor(xs.max(axis=1) - 0.5).clip(-1, size - 1).astype(np.int64)
+    y_start = np.ceil(ys.min(axis=1) - 0.5).clip(0, size).astype(np.int64)
+    y_end = np.floor(ys.max(axis=1) - 0.5).clip(-1, size - 1).astype(np.int64)
+    span = np.maximum(x_end - x_start, y_end - y_start) + 1
+    area = ((xs[:, 1] - xs[:, 0]) * (ys[:, 2] - ys[:, 0])
+            - (xs[:, 2] - xs[:, 0]) * (ys[:, 1] - ys[:, 0]))
+    visible = (x_end >= x_start) & (y_end >= y_start) & (area != 0)
+
+    tier = 1
+    lower = 0
+    while lower < size:
+        selected = np.nonzero(visible & (span > lower) & (span <= tier))[0]
+        offsets = np.arange(tier)
+        dx = np.tile(offsets, tier)
+        dy = np.repeat(offsets, tier)
+        chunk = max(1, MAX_CANDIDATES // (tier * tier))
+        for begin in range(0, len(selected), chunk):
+            ids = selected[begin:begin + chunk]
+            px = x_start[ids, None] + dx
+            py = y_start[ids, None] + dy
+            valid = (px <= x_end[ids, None]) & (py <= y_end[ids, None])
+            cx = px + 0.5
+            cy = py + 0.5
+            x0, x1, x2 = (xs[ids, i, None] for i in range(3))
+            y0, y1, y2 = (ys[ids, i, None] for i in range(3))
+            b0 = ((x1 - cx) * (y2 - cy) - (x2 - cx) * (y1 - cy)) / area[ids, None]
+            b1 = ((x2 - cx) * (y0 - cy) - (x0 - cx) * (y2 - cy)) / area[ids, None]
+            b2 = 1.0 - b0 - b1
+            inside = valid & (b0 >= 0) & (b1 >= 0) & (b2 >= 0)
+            if not inside.any():
+                continue
+            z = (b0 * depth[ids, 0, None] + b1 * depth[ids, 1, None]
+                 + b2 * depth[ids, 2, None])
+            pixels = (py * size + px)[inside]
+            z = z[inside]
+            triangle_ids = np.broadcast_to(ids[:, None], inside.shape)[inside]
+
+            # Nearest candidate per pixel, then merge with the z-buffer
+            order = np.lexsort((-z, pixels))
+            pixels, z, triangle_ids = pixels[order], z[order], triangle_ids[order]
+            first = np.ones(len(pixels), dtype=bool)
+            first[1:] = pixels[1:] != pixels[:-1]
+            pixels, z, triangle_ids = pixels[first], z[first], triangle_ids[first]
+            nearer = z > zbuffer[pixels]
+            zbuffer[pixels[nearer]] = z[nearer]
+            owner[pixels[nearer]] = triangle_ids[nearer]
+        lower = tier
+        tier *= 2
+    return owner.reshape(size, size)
+
+
+def render_rgba(triangles, size=THUMBNAIL_SIZE, color=MODEL_COLOR):
+    """Render an (n, 3, 3) triangle array to a (size, size, 4) uint8 image."""
+    scaled = size * SUPERSAMPLE
+    triangles = np.asarray(triangles, dtype=np.float64)
+    triangles = triangles[np.isfinite(triangles).all(axis=(1, 2))]
+    image = np.zeros((scaled, scaled, 4), dtype=np.float64)
+
+    if len(triangles):
+        right, up, towards_camera = _view_basis()
+        xs = triangles @ right
+        ys = triangles @ up
+        depth = triangles @ towards_camera
+
+        # Fit the projected model into the image, centered
+        x_min, x_max = xs.min(), xs.max()
+        y_min, y_max = ys.min(), ys.max()
+        extent = max(x_max - x_min, y_max - y_min) or 1.0
+        scale = scaled * (1.0 - 2 * MARGIN) / extent
+        xs = (xs - (x_min + x_max) / 2.0) * scale + scaled / 2.0
+        ys = scaled / 2.0 - (ys - (y_min + y_max) / 2.0) * scale
+
+        owner = _rasterize(xs, ys, depth, scaled)
+        covered = owner >= 0
+        shade = _shading(triangles, towards_camera)[owner[covered]]
+        image[covered, :3] = shade[:, None] * np.asarray(color, dtype=np.float64)
+        image[covered, 3] = 255.0
+
+    # Average SUPERSAMPLE x SUPERSAMPLE blocks; color is weighted by alpha
+    # so the transparent background doesn't darken the edges
+    blocks = image.reshape(size, SUPERSAMPLE, size, SUPERSAMPLE, 4)
+    alpha = blocks[..., 3].mean(axis=(1, 3))
+    weighted = (blocks[..., :3] * blocks[..., 3:]).sum(axis=(1, 3))
+    weights = blocks[..., 3].sum(axis=(1, 3))[..., None]
+    rgb = np.divide(weighted, weights, out=np.zeros_like(weighted),
+                    where=weights > 0)
+    result = np.concatenate([rgb, alpha[..., None]], axis=2)
+    return np.rint(result).clip(0, 255).astype(np.uint8)
+
+
+def encode_png(rgba):
+    """Encode an (h, w, 4) uint8 array as a PNG."""
+    height, width, _ = rgba.shape
+    # Each scanline is prefixed with its filter type (0: none)
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 9))
+            + chunk(b"IEND", b""))
+
+
+def render_thumbnail(triangles, size=THUMBNAIL_SIZE, color=MODEL_COLOR):
+    """Render triangles to PNG bytes."""
+    return encode_png(render_rgba(triangles, size, color))